@@ -0,0 +1,44 @@
+import json
+from typing import Any, Awaitable, Callable, Sequence
+
+from fastapi import Request, Response
+from app.api.streaming import etag_matches, json_default
+from app.services.cache import response_cache
+from app.services.executor import run_local
+from app.services.ine.data_queries import RawJSON
+
+
+def render_json(payload: Any) -> bytes:
+    """Same bytes as FastAPI's JSONResponse, without the jsonable_encoder pass"""
+    if isinstance(payload, RawJSON):
+        return payload.encode("utf-8")
+    return json.dumps(
+        payload, default=json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def _render(payload: Any) -> bytes:
+    # Thread rather than process pool: shipping the payload to another process costs about
+    # as much as encoding it
+    size = len(payload.get("data") or ()) if isinstance(payload, dict) else 0
+    return await run_local(render_json, payload, size=size)
+
+
+async def cached_json_response(request: Request, namespace: str, build: Callable[[], Awaitable[Any]], depends_on: Sequence[str] = ()) -> Response:
+    """Serve a JSON response from the response cache, building and storing it on a miss.
+
+    The ETag is a digest of the body; a matching If-None-Match gets a 304. `depends_on`
+    names further namespaces whose invalidation drops the response (see ResponseCache.get).
+    """
+    if not response_cache.enabled:
+        return Response(content=await _render(await build()), media_type="application/json")
+
+    request_key = f"{request.url.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))}"
+    key, entry = await response_cache.get(namespace, request_key, depends_on)
+    if entry is None:
+        entry = await response_cache.set(key, await _render(await build()))
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
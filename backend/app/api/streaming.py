@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import anyio
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.services.ine.data_queries import RawJSON
+
+logger = logging.getLogger(__name__)
+
+# Flush to the client once this many bytes are buffered
+FLUSH_BYTES = 64 * 1024
+
+
+def json_default(value: Any):
+    """Serialize the non-JSON types asyncpg returns"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_item(item: Dict[str, Any]) -> str:
+    """json.dumps for a flat dict, embedding RawJSON values verbatim"""
+    raw_fields = {key: value for key, value in item.items() if isinstance(value, RawJSON)}
+    if not raw_fields:
+        return json.dumps(item, default=json_default)
+    
+    plain = {key: value for key, value in item.items() if key not in raw_fields}
+    parts = [json.dumps(plain, default=json_default)[:-1]]
+    for key, raw in raw_fields.items():
+        parts.append(f"{', ' if plain or len(parts) > 1 else ''}{json.dumps(key)}: {raw}")
+    parts.append("}")
+    return "".join(parts)
+
+
+async def _buffered(pieces: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    buffer = []
+    size = 0
+    async for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def _ndjson(items: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for item in items:
+        yield dumps_item(item) + "\n"
+
+
+def _document_head(header: Dict[str, Any], items_key: str) -> str:
+    return json.dumps(header, default=json_default)[:-1] + f", {json.dumps(items_key)}: ["
+
+
+def _document_tail(count_key: str, count: int, footer: Dict[str, Any]) -> str:
+    return "], " + json.dumps({count_key: count, **footer}, default=json_default)[1:]
+
+
+def json_document(header: Dict[str, Any], items_key: str, items: List[Dict[str, Any]], count_key: str, footer: Dict[str, Any]) -> RawJSON:
+    """Render `{**header, items_key: [...], count_key: n, **footer}`, embedding RawJSON values verbatim"""
+    return RawJSON(
+        _document_head(header, items_key)
+        + ", ".join(dumps_item(item) for item in items)
+        + _document_tail(count_key, len(items), footer)
+    )
+
+
+async def _json_document(items: AsyncIterator[Dict[str, Any]], header: Dict[str, Any], items_key: str, count_key: str, footer: Dict[str, Any]) -> AsyncIterator[str]:
+    """Write `{**header, items_key: [...], count_key: n, **footer}` element by element"""
+    yield _document_head(header, items_key)
+    count = 0
+    async for item in items:
+        yield ("" if count == 0 else ", ") + dumps_item(item)
+        count += 1
+    yield _document_tail(count_key, count, footer)
+
+
+def stream_items(items: AsyncIterator[Dict[str, Any]], fmt: str, header: Dict[str, Any], items_key: str, count_key: str, footer: Dict[str, Any]) -> StreamingResponse:
+    """StreamingResponse writing items as NDJSON or as the chunked JSON envelope of the buffered endpoint"""
+    if fmt == "ndjson":
+        return StreamingResponse(_buffered(_ndjson(items)), media_type="application/x-ndjson")
+    return StreamingResponse(
+        _buffered(_json_document(items, header, items_key, count_key, footer)),
+        media_type="application/json"
+    )
+
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+FILE_CHUNK_BYTES = 256 * 1024
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single byte range; None when it can't be satisfied.
+
+    Multi-range requests are answered with the first range only.
+    """
+    match = RANGE_PATTERN.match(header.split(",")[0].strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+async def _file_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(FILE_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: a comma-separated list of tags or `*`, compared weakly (W/ ignored)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+def file_response(request: Request, path: Path, media_type: str, filename: str, etag: str) -> Response:
+    """Serve a file with ETag revalidation and single byte-range support (206 / 416)"""
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A Range against an older version of the file gets the whole new file
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+        return StreamingResponse(_file_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
+    
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,32 +1,158 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import List, Optional, Tuple
+from app.api.caching import cached_json_response
+from app.api.streaming import file_response, json_document, stream_items
+from app.models.schemas import DataFilters
+from app.services.cache import LABELS_NAMESPACE
+from app.services.export_service import EXPORT_FORMATS, ExportUnavailable, export_service
+from app.services.ine.data_queries import PROCESSED_FIELDS, SERIES_RESOLUTIONS
 from app.services.ine.database_service import database_service
+import base64
+import binascii
+import json
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+STREAM_FORMATS = "^(ndjson|json)$"
+PERIOD_PATTERN = r"^\d{4}(-\d{1,3})?$"
+MAX_PAGE_SIZE = 10000
+
+
+def _split_values(values: Optional[List[str]]) -> Optional[List[str]]:
+    """Accept both ?codes=A&codes=B and ?codes=A,B"""
+    if not values:
+        return None
+    return [value.strip() for item in values for value in item.split(",") if value.strip()]
+
+
+def _parse_period(value: Optional[str]) -> Optional[List[int]]:
+    """'2020' -> [2020], '2020-3' -> [2020, 3]"""
+    if not value:
+        return None
+    return [int(part) for part in value.split("-")]
+
+
+def encode_cursor(key: Optional[Tuple]) -> Optional[str]:
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def _series_filters(
+    codes: Optional[List[str]], start: Optional[str], end: Optional[str],
+    last_n: Optional[int], limit: Optional[int], cursor: Optional[str], cursor_size: int
+) -> DataFilters:
+    return DataFilters(
+        codes=_split_values(codes),
+        start=_parse_period(start),
+        end=_parse_period(end),
+        last_n=last_n,
+        limit=limit,
+        after=decode_cursor(cursor, cursor_size),
+    )
+
+
+def raw_data_filters(
+    codes: Optional[List[str]] = Query(None, description="Series codes (repeat or comma-separate)"),
+    start: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="First period as YYYY or YYYY-<period_id>"),
+    end: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="Last period as YYYY or YYYY-<period_id>"),
+    last_n: Optional[int] = Query(None, ge=1, description="Only the latest N periods of each series"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Series per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> DataFilters:
+    return _series_filters(codes, start, end, last_n, limit, cursor, cursor_size=1)
+
+
+def processed_data_filters(
+    codes: Optional[List[str]] = Query(None, description="Series codes (repeat or comma-separate)"),
+    start: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="First period as YYYY or YYYY-<period_id>"),
+    end: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="Last period as YYYY or YYYY-<period_id>"),
+    last_n: Optional[int] = Query(None, ge=1, description="Only the latest N periods of each series"),
+    fields: Optional[List[str]] = Query(None, description=f"Columns to return: {', '.join(PROCESSED_FIELDS)}"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Rows per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+) -> DataFilters:
+    filters = _series_filters(codes, start, end, last_n, limit, cursor, cursor_size=4)
+    return _with_fields(filters, fields)
+
+
+def export_data_filters(
+    codes: Optional[List[str]] = Query(None, description="Series codes (repeat or comma-separate)"),
+    start: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="First period as YYYY or YYYY-<period_id>"),
+    end: Optional[str] = Query(None, pattern=PERIOD_PATTERN, description="Last period as YYYY or YYYY-<period_id>"),
+    last_n: Optional[int] = Query(None, ge=1, description="Only the latest N periods of each series"),
+    fields: Optional[List[str]] = Query(None, description=f"Columns to export: {', '.join(PROCESSED_FIELDS)}")
+) -> DataFilters:
+    filters = _series_filters(codes, start, end, last_n, None, None, cursor_size=4)
+    return _with_fields(filters, fields)
+
+
+def _with_fields(filters: DataFilters, fields: Optional[List[str]]) -> DataFilters:
+    fields = _split_values(fields)
+    if fields:
+        unknown = [name for name in fields if name not in PROCESSED_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        filters.fields = fields
+    return filters
+
+
+async def _ensure_dataset_exists(dataset_code: str, detail: str):
+    if not await database_service.dataset_has_series(dataset_code):
+        raise HTTPException(status_code=404, detail=detail)
+
+
 @router.get("/raw/{dataset_code}")
-async def get_raw_data(dataset_code: str):
+async def get_raw_data(
+    request: Request,
+    dataset_code: str,
+    stream: Optional[str] = Query(None, pattern=STREAM_FORMATS, description="Stream the response as NDJSON or a chunked JSON document"),
+    filters: DataFilters = Depends(raw_data_filters)
+):
     """Get raw data from database (original INE format)"""
     try:
         logger.info(f"Getting raw data for dataset: {dataset_code}")
         
-        # DB'den raw data çek (orijinal INE formatında)
-        data = await database_service.get_dataset_raw_data(dataset_code)
+        if stream:
+            await _ensure_dataset_exists(dataset_code, f"No data found for dataset '{dataset_code}'")
+            return stream_items(
+                database_service.iter_dataset_raw_data(dataset_code, filters), stream,
+                header={"status": "success", "dataset_code": dataset_code},
+                items_key="data", count_key="total_series", footer={"source": "database"}
+            )
         
-        if not data:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No data found for dataset '{dataset_code}'"
+        async def build():
+            # DB'den raw data çek (orijinal INE formatında)
+            data, next_key = await database_service.get_dataset_raw_page(dataset_code, filters, decode=False)
+        
+            if not data:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No data found for dataset '{dataset_code}'"
+                )
+        
+            # data_points are spliced in as stored, without a decode/encode round trip
+            return json_document(
+                {"status": "success", "dataset_code": dataset_code},
+                "data", data, "total_series",
+                {"next_cursor": encode_cursor(next_key), "source": "database"}
             )
         
-        return {
-            "status": "success",
-            "dataset_code": dataset_code,
-            "data": data,
-            "total_series": len(data),
-            "source": "database"
-        }
+        return await cached_json_response(request, dataset_code, build)
         
     except HTTPException:
         raise
@@ -38,59 +164,149 @@ async def get_raw_data(dataset_code: str):
         )
 
 @router.get("/processed/{dataset_code}")
-async def get_processed_data(dataset_code: str):
+async def get_processed_data(
+    request: Request,
+    dataset_code: str,
+    stream: Optional[str] = Query(None, pattern=STREAM_FORMATS, description="Stream the response as NDJSON or a chunked JSON document"),
+    filters: DataFilters = Depends(processed_data_filters)
+):
     """Get processed/summarized data from database"""
     try:
         logger.info(f"Getting processed data for dataset: {dataset_code}")
         
-        # DB'den processed data çek (summary format)
-        data = await database_service.get_dataset_processed_data(dataset_code)
+        if stream:
+            await _ensure_dataset_exists(dataset_code, f"No processed data found for dataset '{dataset_code}'")
+            return stream_items(
+                database_service.iter_dataset_processed_data(dataset_code, filters), stream,
+                header={"status": "success", "dataset_code": dataset_code},
+                items_key="summary", count_key="total_series", footer={"source": "database"}
+            )
+        
+        async def build():
+            # DB'den processed data çek (summary format)
+            data, next_key = await database_service.get_dataset_processed_page(dataset_code, filters)
+        
+            if not data:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No processed data found for dataset '{dataset_code}'"
+                )
+        
+            return {
+                "status": "success",
+                "dataset_code": dataset_code,
+                "summary": data,
+                "total_series": len(data),
+                "next_cursor": encode_cursor(next_key),
+                "source": "database"
+            }
+        
+        # Processed rows carry unit, scale and frequency labels
+        return await cached_json_response(request, dataset_code, build, depends_on=(LABELS_NAMESPACE,))
         
-        if not data:
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error for dataset {dataset_code}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@router.get("/series/{dataset_code}")
+async def get_series_data(
+    request: Request,
+    dataset_code: str,
+    resolution: str = Query("lttb", pattern=f"^({'|'.join(SERIES_RESOLUTIONS)})$", description="annual or quarterly averages, or lttb downsampling"),
+    points: int = Query(500, ge=3, le=MAX_PAGE_SIZE, description="Points per series for lttb"),
+    filters: DataFilters = Depends(raw_data_filters)
+):
+    """Get series reduced for charts, each point with the min/max of the points it stands for"""
+    try:
+        logger.info(f"Getting {resolution} series for dataset: {dataset_code}")
+        
+        async def build():
+            data, next_key = await database_service.get_dataset_series_page(dataset_code, filters, resolution, points)
+        
+            if not data:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No data found for dataset '{dataset_code}'"
+                )
+        
+            return json_document(
+                {"status": "success", "dataset_code": dataset_code, "resolution": resolution},
+                "data", data, "total_series",
+                {"next_cursor": encode_cursor(next_key), "source": "database"}
+            )
+        
+        return await cached_json_response(request, dataset_code, build)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error for dataset {dataset_code}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@router.get("/export/{dataset_code}")
+async def export_dataset(
+    request: Request,
+    dataset_code: str,
+    format: str = Query("parquet", pattern=f"^({'|'.join(EXPORT_FORMATS)})$", description="parquet or arrow (Arrow IPC file)"),
+    filters: DataFilters = Depends(export_data_filters)
+):
+    """Download processed data as a Parquet or Arrow IPC file (supports Range requests)"""
+    try:
+        logger.info(f"Exporting dataset {dataset_code} as {format}")
+        
+        export = await export_service.get_export(dataset_code, filters, format)
+        if export is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"No processed data found for dataset '{dataset_code}'"
             )
         
-        return {
-            "status": "success",
-            "dataset_code": dataset_code,
-            "summary": data,
-            "total_series": len(data),
-            "source": "database"
-        }
+        return file_response(request, export.path, export.media_type, export.filename, export.etag)
         
     except HTTPException:
         raise
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
-        logger.error(f"Unexpected error for dataset {dataset_code}: {e}", exc_info=True)
+        logger.error(f"Unexpected error exporting dataset {dataset_code}: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
 @router.get("/metadata/{dataset_code}")
-async def get_dataset_metadata(dataset_code: str):
+async def get_dataset_metadata(request: Request, dataset_code: str):
     """Get dataset metadata from database"""
     try:
         logger.info(f"Getting metadata for dataset: {dataset_code}")
         
-        # DB'den metadata çek
-        metadata = await database_service.get_dataset_metadata(dataset_code)
+        async def build():
+            # DB'den metadata çek
+            metadata = await database_service.get_dataset_metadata(dataset_code)
         
-        if not metadata:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No metadata found for dataset '{dataset_code}'"
-            )
+            if not metadata:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No metadata found for dataset '{dataset_code}'"
+                )
+        
+            return {
+                "status": "success",
+                "dataset_code": dataset_code,
+                "metadata": metadata,
+                "total_series": len(metadata),
+                "source": "database"
+            }
         
-        return {
-            "status": "success",
-            "dataset_code": dataset_code,
-            "metadata": metadata,
-            "total_series": len(metadata),
-            "source": "database"
-        }
+        return await cached_json_response(request, dataset_code, build)
         
     except HTTPException:
         raise
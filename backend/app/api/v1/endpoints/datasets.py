@@ -1,25 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Optional
-from app.models.schemas import DatasetInfo, ErrorResponse
+from app.api.caching import cached_json_response
+from app.models.schemas import DatasetInfo, ErrorResponse, SeriesSearchResult
+from app.services.cache import CATALOGUE_NAMESPACE, SEARCH_NAMESPACE
 from app.services.ine.database_service import database_service
+from app.services.ine.search_index import catalogue_search
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DatasetInfo])
-async def get_datasets():
+async def get_datasets(request: Request):
     """Get all available datasets from database"""
     try:
-        datasets = await database_service.get_ine_datasets()
+        async def build():
+            datasets = await database_service.get_ine_datasets()
+            
+            return [
+                DatasetInfo(
+                    external_id=dataset.get('external_id', ''),
+                    name=dataset.get('name', ''),
+                    id=str(dataset.get('id', '')),
+                    dataset_name=str(dataset.get('dataset_name', '')),
+                ).model_dump()
+                for dataset in datasets
+            ]
         
-        return [
-            DatasetInfo(
-                external_id=dataset.get('external_id', ''),
-                name=dataset.get('name', ''),
-                id=str(dataset.get('id', '')),
-                dataset_name=str(dataset.get('dataset_name', '')),
-            )
-            for dataset in datasets
-        ]
+        return await cached_json_response(request, CATALOGUE_NAMESPACE, build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -28,23 +34,47 @@ async def get_datasets():
 
 @router.get("/search", response_model=List[DatasetInfo])
 async def search_datasets(
-    q: str = Query(..., min_length=2, description="Search query"),
+    request: Request,
+    q: str = Query(..., min_length=2, description="Search query; the last word may be partial"),
     limit: int = Query(20, ge=1, le=100, description="Number of results to return")
 ):
-    """Search datasets by name or code in database"""
+    """Search datasets by name or code, best matches first (accent-insensitive)"""
     try:
-        # Database service'e search metodu ekleyelim
-        datasets = await database_service.search_ine_datasets(q, limit)
+        async def build():
+            datasets = await catalogue_search.search_datasets(q, limit)
+            
+            return [
+                DatasetInfo(
+                    external_id=dataset.get('external_id', ''),
+                    name=dataset.get('name', ''),
+                    id=str(dataset.get('id', '')),
+                    dataset_name=str(dataset.get('dataset_name', '')),
+                ).model_dump()
+                for dataset in datasets
+            ]
         
-        return [
-            DatasetInfo(
-                external_id=dataset.get('external_id', ''),
-                name=dataset.get('name', ''),
-                id=str(dataset.get('id', '')),
-                dataset_name=str(dataset.get('dataset_name', '')),
-            )
-            for dataset in datasets
-        ]
+        return await cached_json_response(request, SEARCH_NAMESPACE, build)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Search failed: {str(e)}"
+        )
+
+@router.get("/search/series", response_model=List[SeriesSearchResult])
+async def search_series(
+    request: Request,
+    q: str = Query(..., min_length=2, description="Search query; the last word may be partial"),
+    dataset: Optional[str] = Query(None, description="Only series of this dataset"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return")
+):
+    """Search series by name or code, best matches first (accent-insensitive)"""
+    try:
+        async def build():
+            series = await catalogue_search.search_series(q, limit, dataset)
+            
+            return [SeriesSearchResult(**item).model_dump() for item in series]
+        
+        return await cached_json_response(request, SEARCH_NAMESPACE, build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
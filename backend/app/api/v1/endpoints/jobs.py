@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from app.services.ine.data_collector_service import data_collector_service
+from app.services.job_service import job_service
 import logging
 
 router = APIRouter()
@@ -8,6 +8,7 @@ logger = logging.getLogger(__name__)
 @router.get("/test-ine-connection")
 async def test_ine_connection():
     """Test connection to INE API"""
+    from app.services.ine.data_collector_service import data_collector_service
     try:
         connected = await data_collector_service.test_ine_connection()
         return {
@@ -23,15 +24,20 @@ async def test_ine_connection():
             "error": str(error)
         }
 
-@router.post("/run-ine-data-collection")
+@router.post("/run-ine-data-collection", status_code=202)
 async def run_ine_data_collection_job():
-    """Run INE data collection job"""
+    """Queue an INE data collection job; poll GET /jobs/{job_id} for progress.
+
+    While a collection is queued or running, the existing job is returned instead of starting another.
+    """
     try:
-        result = await data_collector_service.collect_ine_data()
+        job, created = await job_service.submit_collection()
         return {
             "success": True,
-            "message": "INE data collection completed successfully",
-            "data": result
+            "message": "INE data collection queued" if created else "INE data collection already in progress",
+            "job_id": job['id'],
+            "deduplicated": not created,
+            "data": job
         }
     except Exception as error:
         logger.error(f"INE data collection error: {error}")
@@ -39,7 +45,7 @@ async def run_ine_data_collection_job():
             status_code=500,
             detail={
                 "success": False,
-                "message": "INE data collection failed",
+                "message": "INE data collection could not be queued",
                 "error": str(error)
             }
         )
@@ -47,4 +53,37 @@ async def run_ine_data_collection_job():
 @router.get("/health")
 async def job_health_check():
     """Health check for job services"""
-    return {"status": "healthy", "service": "job-service"}
\ No newline at end of file
+    return {"status": "healthy", "service": "job-service"}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status and per-dataset progress of a background job"""
+    try:
+        job = await job_service.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+        return {"success": True, "data": job}
+    except HTTPException:
+        raise
+    except Exception as error:
+        logger.error(f"Error getting job {job_id}: {error}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.delete("/{job_id}", status_code=202)
+async def cancel_job(job_id: str):
+    """Cancel a background job; datasets already being written are finished first"""
+    try:
+        job = await job_service.cancel_job(job_id)
+        if not job:
+            existing = await job_service.get_job(job_id)
+            if not existing:
+                raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+            raise HTTPException(status_code=409, detail=f"Job '{job_id}' already {existing['status']}")
+        return {"success": True, "message": "Cancellation requested", "data": job}
+    except HTTPException:
+        raise
+    except Exception as error:
+        logger.error(f"Error cancelling job {job_id}: {error}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import datasets, data, jobs
+from app.services.cache import response_cache
+from app.services.ine.database_service import database_service
 
 api_router = APIRouter()
 
@@ -25,3 +27,15 @@ api_router.include_router(
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "data-collector"}
+
+
+@api_router.get("/health/db")
+async def database_health_check():
+    """Database pool utilization"""
+    return {"status": "healthy", "pool": database_service.get_pool_stats()}
+
+
+@api_router.get("/health/cache")
+async def cache_health_check():
+    """Response cache hit/miss metrics"""
+    return {"status": "healthy", "cache": response_cache.get_stats()}
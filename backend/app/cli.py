@@ -0,0 +1,210 @@
+"""
+Command line tools. From backend/:
+    python -m app.cli collect [CODE|GLOB ...] [--concurrency N] [--write-concurrency N] [--rate-limit R]
+                              [--dry-run fetch|parse] [--replay DIR | --from-archive] [--save-payloads DIR] [--no-resume]
+    python -m app.cli export <dataset_code> [--format parquet|arrow] [--codes A,B] [--start 2020] [--end 2023-6]
+                                            [--last-n N] [--fields code,year,value] [--output FILE]
+
+export builds (or reuses) the cached file under STORAGE_PATH/exports, as the
+/data/export endpoint does, and copies it to --output when given.
+
+collect runs an INE collection in this process, without the API or a job row, and
+prints a throughput summary. Without dataset codes it is the regular sweep (resumable
+unless --no-resume); with codes, a dry run, a replay or --save-payloads only the chosen
+datasets are collected and no checkpoint is kept. --from-archive rebuilds datasets from
+the payload archive (STORAGE_PATH/payloads) and --replay from files saved with
+--save-payloads, without contacting INE; a dry run over replayed payloads does not need
+the database either, which makes it a parser benchmark on recorded responses.
+
+Modules only one command needs (the collector and httpx, pyarrow) are imported when
+that command runs.
+"""
+import argparse
+import asyncio
+import logging
+import shutil
+import sys
+from collections import Counter
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from app.models.schemas import DataFilters
+from app.services.executor import shutdown_executor
+from app.services.export_service import EXPORT_FORMATS, ExportUnavailable, export_service
+from app.services.ine.data_queries import PROCESSED_FIELDS
+from app.services.ine.database_service import database_service
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else None
+
+
+def _period(value):
+    return [int(part) for part in value.split("-")] if value else None
+
+
+async def export(args) -> int:
+    fields = _split(args.fields)
+    unknown = [name for name in fields or [] if name not in PROCESSED_FIELDS]
+    if unknown:
+        print(f"Unknown fields: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    filters = DataFilters(
+        codes=_split(args.codes),
+        start=_period(args.start),
+        end=_period(args.end),
+        last_n=args.last_n,
+        fields=fields,
+    )
+
+    await database_service.connect()
+    try:
+        result = await export_service.get_export(args.dataset_code, filters, args.format)
+    except ExportUnavailable as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        await database_service.close()
+        shutdown_executor()
+
+    if result is None:
+        print(f"No processed data found for dataset '{args.dataset_code}'", file=sys.stderr)
+        return 1
+    if args.output:
+        shutil.copyfile(result.path, args.output)
+        print(args.output)
+    else:
+        print(result.path)
+    return 0
+
+
+def _select_datasets(datasets, patterns):
+    """Datasets whose code matches one of the patterns (shell-style globs, case-insensitive); unmatched patterns"""
+    selected = [dataset for dataset in datasets if any(fnmatchcase(dataset['external_id'].upper(), pattern.upper()) for pattern in patterns)]
+    unmatched = [pattern for pattern in patterns if not any(fnmatchcase(dataset['external_id'].upper(), pattern.upper()) for dataset in datasets)]
+    return selected, unmatched
+
+
+def _replayed_datasets(replay):
+    """Stand-in dataset rows for the saved payloads, for dry runs without a database"""
+    return [{"id": None, "name": code, "external_id": code} for code in replay.codes()]
+
+
+def _print_collect_summary(result, parse_in_write: bool):
+    results = result['results']
+    elapsed = result['elapsed_seconds'] or 1e-9
+    statuses = Counter(item['status'] for item in results)
+    points = sum(item.get('points', 0) for item in results)
+    megabytes = sum(item.get('bytes', 0) for item in results) / 1e6
+    resumed = f" ({result['resumed_datasets']} already done by an interrupted run)" if result['resumed_datasets'] else ""
+    print(f"{result['total_datasets']} datasets{resumed} in {result['elapsed_seconds']}s: "
+          + ", ".join(f"{status}={n}" for status, n in sorted(statuses.items())))
+    print(f"{len(results) / elapsed:.1f} datasets/s, {points / elapsed:,.0f} points/s ({points:,} points), "
+          f"{megabytes / elapsed:.2f} MB/s ({megabytes:.1f} MB)")
+
+    # Stage times summed over datasets; stages overlap, so the sum exceeds the wall time
+    phases = Counter()
+    for item in results:
+        timings = item.get('timings') or {}
+        parse = item.get('parse_ms') or 0.0
+        phases["fetch"] += timings.get('fetch_ms', 0.0) - (0.0 if parse_in_write else parse)
+        phases["parse"] += parse
+        phases["queue wait"] += timings.get('queue_wait_ms', 0.0)
+        phases["store"] += timings.get('write_ms', 0.0) - (parse if parse_in_write else 0.0)
+    total = sum(phases.values()) or 1e-9
+    print("phases: " + ", ".join(f"{phase} {ms / 1000:.2f}s ({ms / total:.0%})" for phase, ms in phases.items()))
+
+    for item in results:
+        if item['status'] in ("error", "timeout_error"):
+            print(f"  {item.get('external_id')}: {item['status']} {item.get('error', '')}", file=sys.stderr)
+
+
+async def collect(args) -> int:
+    from app.core.config import settings
+    from app.services.ine.data_collector_service import DEFAULT_CHECKPOINT, data_collector_service
+    from app.services.ine.payload_archive import PayloadDirectory, payload_archive
+
+    if args.concurrency:
+        settings.COLLECTOR_FETCH_CONCURRENCY = args.concurrency
+    if args.write_concurrency:
+        settings.COLLECTOR_WRITE_CONCURRENCY = args.write_concurrency
+    if args.rate_limit is not None:
+        settings.INE_RATE_LIMIT_PER_SECOND = args.rate_limit
+    mode = args.dry_run or "write"
+    replay = None
+    if args.replay:
+        if not Path(args.replay).is_dir():
+            print(f"Not a directory: {args.replay}", file=sys.stderr)
+            return 2
+        replay = PayloadDirectory(args.replay)
+    elif args.from_archive:
+        replay = payload_archive
+
+    # A dry run over replayed payloads touches neither INE nor the database
+    offline = replay is not None and mode != "write"
+    if not offline:
+        await database_service.connect()
+    try:
+        if not offline:
+            await database_service.ensure_schema()
+        if not args.datasets and mode == "write" and replay is None and not args.save_payloads:
+            result = await data_collector_service.collect_ine_data(checkpoint=None if args.no_resume else DEFAULT_CHECKPOINT)
+        else:
+            datasets = _replayed_datasets(replay) if offline else await database_service.get_ine_datasets()
+            if args.datasets:
+                datasets, unmatched = _select_datasets(datasets, args.datasets)
+                if unmatched:
+                    print(f"No datasets match: {', '.join(unmatched)}", file=sys.stderr)
+                    return 2
+            result = await data_collector_service.collect_datasets(
+                datasets, mode=mode, replay=replay,
+                save_dir=Path(args.save_payloads) if args.save_payloads else None
+            )
+    finally:
+        if not offline:
+            await database_service.close()
+        shutdown_executor()
+
+    _print_collect_summary(result, parse_in_write=settings.INE_STREAMING_PARSE or replay is not None)
+    statuses = Counter(item['status'] for item in result['results'])
+    return 1 if statuses.get("error") or statuses.get("timeout_error") else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Data collector command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    collect_parser = commands.add_parser("collect", help="Collect INE datasets in this process and print a throughput summary")
+    collect_parser.add_argument("datasets", nargs="*", metavar="CODE",
+                                help="Dataset codes or glob patterns (e.g. 'IPC*'); all datasets when omitted")
+    collect_parser.add_argument("--concurrency", type=int, help="Concurrent downloads (COLLECTOR_FETCH_CONCURRENCY)")
+    collect_parser.add_argument("--write-concurrency", type=int, help="Concurrent DB writers (COLLECTOR_WRITE_CONCURRENCY)")
+    collect_parser.add_argument("--rate-limit", type=float, help="Requests per second to INE, 0 for no limit (INE_RATE_LIMIT_PER_SECOND)")
+    collect_parser.add_argument("--dry-run", choices=["fetch", "parse"],
+                                help="Download (fetch) or download and parse (parse) without writing anything")
+    replay_source = collect_parser.add_mutually_exclusive_group()
+    replay_source.add_argument("--replay", metavar="DIR", help="Read payloads from DIR/<code>.json instead of INE")
+    replay_source.add_argument("--from-archive", action="store_true",
+                               help="Rebuild each dataset from the payload archive instead of INE: its latest full payload, then the partial ones archived after it")
+    collect_parser.add_argument("--save-payloads", metavar="DIR", help="Keep every downloaded payload as DIR/<code>.json")
+    collect_parser.add_argument("--no-resume", action="store_true",
+                                help="Sweep every dataset, ignoring (and not recording) the sweep checkpoint")
+    collect_parser.set_defaults(handler=collect)
+
+    export_parser = commands.add_parser("export", help="Write a dataset (or a slice) as a Parquet or Arrow IPC file")
+    export_parser.add_argument("dataset_code")
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    export_parser.add_argument("--codes", help="Series codes, comma-separated")
+    export_parser.add_argument("--start", help="First period as YYYY or YYYY-<period_id>")
+    export_parser.add_argument("--end", help="Last period as YYYY or YYYY-<period_id>")
+    export_parser.add_argument("--last-n", type=int, help="Only the latest N periods of each series")
+    export_parser.add_argument("--fields", help=f"Columns, comma-separated: {', '.join(PROCESSED_FIELDS)}")
+    export_parser.add_argument("--output", "-o", help="Copy the export here instead of printing the cached path")
+    export_parser.set_defaults(handler=export)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(args.handler(args)))
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -18,13 +18,78 @@ class Settings(BaseSettings):
     
     # INE API Configuration
     INE_API_BASE_URL: str = "https://servicios.ine.es/wstempus/js/ES"
+    INE_RATE_LIMIT_PER_SECOND: float = 2.0
+    INE_RATE_LIMIT_BURST: int = 4
+    INE_INCREMENTAL_PERIODS: int = 0  # >0 refreshes collected tables with ?nult=N instead of a full download
+    INE_FULL_REFRESH_MAX_AGE: float = 7 * 24 * 3600  # seconds; with ?nult refreshes, a table is downloaded in full again after this
+    INE_RETRY_ATTEMPTS: int = 4  # downloads per dataset on 429/5xx and connection errors, the first one included
+    INE_RETRY_BASE_DELAY: float = 1.0  # seconds; doubles with each attempt, with full jitter
+    INE_RETRY_MAX_DELAY: float = 60.0  # backoff cap; a longer Retry-After fails the dataset instead
+    INE_CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive failed requests that open a host's circuit
+    INE_CIRCUIT_RESET_SECONDS: float = 30.0  # open time before a single probe request is let through
+    INE_CIRCUIT_MAX_WAIT: float = 300.0  # a download waiting longer than this for an open circuit fails
+    
+    # Collector Configuration
+    COLLECTOR_FETCH_CONCURRENCY: int = 4
+    COLLECTOR_WRITE_CONCURRENCY: int = 2
+    COLLECTOR_QUEUE_SIZE: int = 4
+    INE_STREAMING_PARSE: bool = True  # parse payloads series by series instead of response.json()
+    INE_STREAM_CHUNK_BYTES: int = 1024 * 1024  # payload bytes parsed and prepared per executor call
+    INE_SPOOL_MAX_BYTES: int = 8 * 1024 * 1024
+    INGEST_MODE: str = "diff"  # "diff" writes only changed points, "replace" rewrites every series
+    COLLECTOR_WORKERS: int = 1  # >1 shards a collection job over this many processes that lease datasets
+    COLLECTOR_LEASE_SECONDS: float = 300.0
+    COLLECTOR_LEASE_MAX_ATTEMPTS: int = 3
+    COLLECTOR_CHECKPOINT_MAX_AGE: float = 24 * 3600.0  # seconds a crashed sweep can be resumed; 0 disables checkpoints
+    PAYLOAD_ARCHIVE_ENABLED: bool = True  # keep every downloaded payload under STORAGE_PATH/payloads for replays
+    PAYLOAD_ARCHIVE_CODEC: str = "zstd"  # "zstd" (gzip when zstandard is not installed), "gzip" or "none"
+    PAYLOAD_ARCHIVE_LEVEL: int = 0  # compression level; 0 = the codec's default
+    
+    # Background Jobs Configuration
+    JOB_RUNNER: str = "asyncio"  # "asyncio" runs jobs inside the API process, "celery" hands them to workers
+    JOB_STALE_AFTER: int = 2 * 3600  # an active job without progress for this long no longer blocks new runs
+    CELERY_BROKER_URL: Optional[str] = None  # defaults to REDIS_URL
+    
+    # CPU Executor Configuration
+    CPU_EXECUTOR: str = "thread"  # "thread", "process" or "inline" (on the event loop)
+    CPU_EXECUTOR_WORKERS: int = 0  # 0 = min(4, CPU count)
+    CPU_OFFLOAD_MIN_ITEMS: int = 2000  # smaller batches are cheaper to handle inline
     
     # File Paths
     SHARED_DATA_PATH: str = "../shared/data"
     STORAGE_PATH: str = "./storage"
     
+    # Reference Data
+    REFERENCE_DATA_TTL: float = 3600.0  # seconds; changes are also picked up at once via LISTEN/NOTIFY
+    
+    # Search
+    SEARCH_INDEX_MAX_AGE: float = 600.0  # seconds before the in-memory search indexes are rebuilt anyway
+    
+    # Exports
+    EXPORT_BATCH_ROWS: int = 50000  # rows per Parquet row group / Arrow record batch
+    
     # Database Configuration
     DB_CONNECTION_STRING: str = os.getenv("DB_CONNECTION_STRING")
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 30.0
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = 300.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_MAX_CACHED_STATEMENT_LIFETIME: int = 300
+    DB_CURSOR_PREFETCH: int = 500
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    RESPONSE_CACHE_TTL: int = 24 * 3600  # seconds, in-process and Redis entries alike
+    REDIS_URL: Optional[str] = None
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # Prometheus text format at /metrics
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5  # seconds between event loop lag probes; 0 disables them
+    PROFILER: str = ""  # "cprofile" or "py-spy" profiles collection sweeps (and sampled requests) to STORAGE_PATH/profiles
+    PROFILE_REQUEST_SAMPLE_RATE: float = 0.0  # fraction of API requests profiled when PROFILER is set
+    PROFILE_PY_SPY_RATE: int = 100  # py-spy samples per second
     
     class Config:
         env_file = ".env"
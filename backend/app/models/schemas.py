@@ -8,6 +8,22 @@ class DatasetInfo(BaseModel):
     id: Optional[str] = Field(None, description="INE internal code")
     dataset_name: Optional[str] = Field(None, description="Dataset description")
 
+class SeriesSearchResult(BaseModel):
+    code: str = Field(..., description="Series code")
+    name: Optional[str] = Field(None, description="Series name")
+    dataset_code: str = Field(..., description="Dataset the series belongs to")
+    score: float = Field(..., description="Relevance, higher is better")
+
+class DataFilters(BaseModel):
+    """Row selection, projection and paging pushed down into the data queries"""
+    codes: Optional[List[str]] = Field(None, description="Series codes to include")
+    start: Optional[List[int]] = Field(None, description="Lower bound as [year] or [year, period_id]")
+    end: Optional[List[int]] = Field(None, description="Upper bound as [year] or [year, period_id]")
+    last_n: Optional[int] = Field(None, description="Only the latest N periods of each series")
+    fields: Optional[List[str]] = Field(None, description="Columns to return")
+    limit: Optional[int] = Field(None, description="Page size")
+    after: Optional[List[Any]] = Field(None, description="Keyset position to continue after")
+
 class DataResponse(BaseModel):
     code: str
     dataset_name: str
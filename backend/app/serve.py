@@ -0,0 +1,26 @@
+"""
+Production entry point for the API. From backend/:
+    python -m app.serve [--workers N]
+
+Unlike `python main.py` it never runs uvicorn's reloader (whose file watcher is a
+second process importing the app), and the app is imported only in the processes
+that serve it.
+"""
+import argparse
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description="Serve the API with uvicorn")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+import asyncpg
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_NAMESPACE = "catalogue"
+# Invalidated when dataset or series codes and names change: the search indexes and results
+SEARCH_NAMESPACE = "search"
+# Invalidated when the reference data (unit, scale, frequency labels) changes; responses
+# embedding labels depend on it
+LABELS_NAMESPACE = "labels"
+
+# Invalidated namespaces are notified here by the process that wrote them (see invalidate)
+CACHE_CHANNEL = "response_cache"
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.expires_at = time.monotonic() + settings.RESPONSE_CACHE_TTL
+
+
+class ResponseCache:
+    """Serialized responses keyed by namespace (dataset code) and request.
+
+    Tier 1 is an in-process LRU bounded by total body size; tier 2 is Redis when
+    REDIS_URL is set. Invalidation bumps a per-namespace generation that is part of every
+    key, so stale entries are never read again and simply age out of both tiers. With
+    Redis the generations live there too, which keeps processes in agreement. Without it,
+    writers NOTIFY the namespaces they invalidate on CACHE_CHANNEL and processes running
+    the listener bump their own generations; entries of both tiers expire after
+    RESPONSE_CACHE_TTL whatever happens.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._generations: Dict[str, int] = {}
+        self._redis = None
+        self._redis_checked = False
+        self._listener: Optional[asyncpg.Connection] = None
+        self.stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "redis_errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RESPONSE_CACHE_ENABLED
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            self._redis_checked = True
+            if settings.REDIS_URL:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    async def generation(self, namespace: str) -> int:
+        """Current generation of a namespace; it changes on every invalidation"""
+        client = self._get_redis()
+        if client is not None:
+            try:
+                value = await client.get(f"cache:gen:{namespace}")
+                return int(value or 0)
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Redis cache generation lookup failed: {e}")
+        return self._generations.get(namespace, 0)
+
+    async def _key(self, namespace: str, request_key: str, depends_on: Sequence[str] = ()) -> str:
+        generations = [str(await self.generation(name)) for name in (namespace, *depends_on)]
+        return f"cache:{namespace}:{'.'.join(generations)}:{request_key}"
+
+    async def get(self, namespace: str, request_key: str, depends_on: Sequence[str] = ()) -> Tuple[str, Optional[CachedResponse]]:
+        """Look a response up in both tiers; returns the resolved key for a later set().
+
+        The response is also dropped when a namespace in `depends_on` is invalidated.
+        """
+        key = await self._key(namespace, request_key, depends_on)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._drop_local(key)
+            self.stats["expirations"] += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["local_hits"] += 1
+            return key, entry
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                body = await client.get(key)
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Redis cache read failed: {e}")
+                body = None
+            if body is not None:
+                self.stats["redis_hits"] += 1
+                entry = CachedResponse(body)
+                self._store_local(key, entry)
+                return key, entry
+
+        self.stats["misses"] += 1
+        return key, None
+
+    async def set(self, key: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body)
+        self._store_local(key, entry)
+        self.stats["stores"] += 1
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.set(key, body, ex=settings.RESPONSE_CACHE_TTL)
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Redis cache write failed: {e}")
+        return entry
+
+    def _store_local(self, key: str, entry: CachedResponse):
+        size = len(entry.body)
+        if size > settings.RESPONSE_CACHE_MAX_BYTES // 4:
+            return
+        self._drop_local(key)
+        self._entries[key] = entry
+        self._size += size
+        while self._size > settings.RESPONSE_CACHE_MAX_BYTES:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.body)
+            self.stats["evictions"] += 1
+
+    def _drop_local(self, key: str):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous.body)
+
+    def _bump(self, namespace: str):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self.stats["invalidations"] += 1
+
+    async def invalidate(self, namespace: str, conn: Optional[asyncpg.Connection] = None):
+        """Drop every cached response of a namespace.
+
+        With `conn` the other processes are told through a NOTIFY, sent when its
+        transaction (if any) commits.
+        """
+        self._bump(namespace)
+        if conn is not None:
+            await conn.execute("SELECT pg_notify($1, $2)", CACHE_CHANNEL, namespace)
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.incr(f"cache:gen:{namespace}")
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"Redis cache invalidation failed: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._bump(payload)
+
+    async def start_listener(self, dsn: str):
+        """Follow invalidations made by other processes; without the listener (and without
+        Redis) local entries may be served stale for up to RESPONSE_CACHE_TTL"""
+        if self._listener is not None:
+            return
+        try:
+            self._listener = await asyncpg.connect(dsn)
+            await self._listener.add_listener(CACHE_CHANNEL, self._on_notify)
+        except Exception as e:
+            logger.warning(f"Response cache listener unavailable, writes by other processes show after RESPONSE_CACHE_TTL: {e}")
+            await self.stop_listener()
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            if not listener.is_closed():
+                await listener.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["local_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["local_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "redis": self._redis is not None,
+            "listening": self._listener is not None,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": settings.RESPONSE_CACHE_MAX_BYTES,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
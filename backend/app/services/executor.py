@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTOR_MODES = ("thread", "process", "inline")
+
+_cpu_executor: Optional[Executor] = None
+_thread_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _worker_count() -> int:
+    return settings.CPU_EXECUTOR_WORKERS or min(4, os.cpu_count() or 1)
+
+
+def _mode() -> str:
+    if settings.CPU_EXECUTOR not in EXECUTOR_MODES:
+        raise ValueError(f"Unknown CPU_EXECUTOR '{settings.CPU_EXECUTOR}', expected one of {EXECUTOR_MODES}")
+    return settings.CPU_EXECUTOR
+
+
+def _get_thread_executor() -> ThreadPoolExecutor:
+    global _thread_executor
+    if _thread_executor is None:
+        _thread_executor = ThreadPoolExecutor(max_workers=_worker_count(), thread_name_prefix="cpu")
+    return _thread_executor
+
+
+def _get_cpu_executor() -> Executor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        if _mode() == "process":
+            # spawn: forking a process that runs an event loop and DB connections is unsafe
+            _cpu_executor = ProcessPoolExecutor(
+                max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"CPU executor: process pool with {_worker_count()} workers")
+        else:
+            _cpu_executor = _get_thread_executor()
+            logger.info(f"CPU executor: thread pool with {_worker_count()} workers")
+    return _cpu_executor
+
+
+def _inline(size: Optional[int]) -> bool:
+    return _mode() == "inline" or (size is not None and size < settings.CPU_OFFLOAD_MIN_ITEMS)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, size: Optional[int] = None) -> T:
+    """Run CPU-bound `func(*args)` off the event loop, in the configured pool.
+
+    func must be a module-level function and args/result picklable for the process pool.
+    `size` (items, rows, points...) below CPU_OFFLOAD_MIN_ITEMS runs inline, where the
+    hand-off would cost more than it saves.
+    """
+    if _inline(size):
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(_get_cpu_executor(), partial(func, *args))
+
+
+async def run_local(func: Callable[..., T], *args: Any, size: Optional[int] = None) -> T:
+    """Like run_cpu, but always in a thread: for work on objects that can't leave the process (e.g. DB records)"""
+    if _inline(size):
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(_get_thread_executor(), partial(func, *args))
+
+
+def shutdown_executor():
+    """Stop the pools; they are recreated on next use"""
+    global _cpu_executor, _thread_executor
+    for executor in {id(e): e for e in (_cpu_executor, _thread_executor) if e is not None}.values():
+        executor.shutdown(wait=True, cancel_futures=True)
+    _cpu_executor = None
+    _thread_executor = None
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from app.core.config import settings
+from app.models.schemas import DataFilters
+from app.services.executor import run_local
+from app.services.ine.data_queries import PROCESSED_FIELDS
+from app.services.ine.database_service import database_service
+
+logger = logging.getLogger(__name__)
+
+# format -> (file extension, media type)
+EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+DATASET_CODE_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class ExportUnavailable(Exception):
+    """pyarrow is not installed"""
+
+
+class DatasetExport(NamedTuple):
+    path: Path
+    filename: str
+    media_type: str
+    etag: str
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailable("Dataset export requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _export_schema(pa, fields: Optional[List[str]]):
+    types = {
+        'year': pa.int32(),
+        'period_id': pa.int32(),
+        'value': pa.float64(),
+    }
+    # period_id (from the sort key) orders periods within a year; frequency_name alone doesn't
+    columns = list(fields or PROCESSED_FIELDS) + ['period_id']
+    return pa.schema([(name, types.get(name, pa.string())) for name in columns])
+
+
+def _record_batch(pa, schema, rows, labels):
+    arrays = []
+    for field in schema:
+        source = '_key_period_id' if field.name == 'period_id' else field.name
+        values = [row[source] for row in rows]
+        lookup = PROCESSED_FIELDS[field.name][1] if field.name in PROCESSED_FIELDS else None
+        if lookup:
+            values = [labels[lookup].get(value) for value in values]
+        elif field.name == 'value':
+            values = [None if value is None else float(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _open_writer(pa, fmt: str, path: Path, schema):
+    if fmt == "parquet":
+        return pa.parquet.ParquetWriter(str(path), schema, compression="zstd")
+    return pa.ipc.new_file(str(path), schema)
+
+
+def _write_rows(pa, writer, schema, rows, labels):
+    writer.write_batch(_record_batch(pa, schema, rows, labels))
+
+
+class ExportService:
+    """Parquet / Arrow IPC files of processed dataset rows, cached under STORAGE_PATH/exports.
+
+    A file is keyed by dataset, format and filters, and named after the dataset version
+    (ine_datasets.last_modified) and the digest of the labels it embeds, so it is rebuilt
+    only once the dataset or a unit, scale or frequency name has changed.
+    Files are written from a server-side cursor in record batches, never holding the
+    whole dataset in memory.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Path, asyncio.Lock] = {}
+
+    @property
+    def export_dir(self) -> Path:
+        return Path(settings.STORAGE_PATH) / "exports"
+
+    def _filters_key(self, filters: DataFilters) -> str:
+        spec = filters.model_dump(include={"codes", "start", "end", "last_n", "fields"})
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    async def get_export(self, dataset_code: str, filters: Optional[DataFilters] = None, fmt: str = "parquet") -> Optional[DatasetExport]:
+        """Path of an up-to-date export file, building it if needed; None when the dataset has no data"""
+        if not DATASET_CODE_PATTERN.match(dataset_code):
+            return None
+        pa = _arrow()
+        # Exports are always whole: paging does not apply
+        filters = (filters or DataFilters()).model_copy(update={"limit": None, "after": None})
+
+        version = await database_service.get_dataset_version(dataset_code)
+        if version is None:
+            return None
+        version = f"{version}.{await database_service.get_reference_labels_digest()}"
+
+        extension, media_type = EXPORT_FORMATS[fmt]
+        key = self._filters_key(filters)
+        directory = self.export_dir / dataset_code
+        path = directory / f"{key}-{version}{extension}"
+
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            if not path.exists():
+                rows = await self._write_export(pa, fmt, path, dataset_code, filters)
+                if rows == 0:
+                    path.unlink(missing_ok=True)
+                    return None
+                # Exports of older versions of the dataset or labels, whatever their filters
+                for stale in directory.glob("*-*.*"):
+                    # Dot-files are exports still being written
+                    if not stale.name.startswith(".") and stale.stem.rsplit("-", 1)[-1] != version:
+                        stale.unlink(missing_ok=True)
+        if not lock.locked():
+            self._locks.pop(path, None)
+
+        return DatasetExport(path, f"{dataset_code}{extension}", media_type, f'"{key}-{version}.{fmt}"')
+
+    async def _write_export(self, pa, fmt: str, path: Path, dataset_code: str, filters: DataFilters) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        schema = _export_schema(pa, filters.fields)
+        labels = await database_service.get_reference_labels()
+
+        total = 0
+        writer = await run_local(_open_writer, pa, fmt, temp_path, schema)
+        try:
+            batch = []
+            async for row in database_service.iter_dataset_processed_records(dataset_code, filters):
+                batch.append(row)
+                if len(batch) >= settings.EXPORT_BATCH_ROWS:
+                    await run_local(_write_rows, pa, writer, schema, batch, labels)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                await run_local(_write_rows, pa, writer, schema, batch, labels)
+                total += len(batch)
+            await run_local(writer.close)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Exported {total} rows of dataset {dataset_code} to {path}")
+        return total
+
+
+export_service = ExportService()
@@ -0,0 +1,139 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.services.metrics import COLLECTOR_FETCHES_IN_PROGRESS, COLLECTOR_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# fetch(dataset) -> (payload, None) to hand the payload to a writer, or (None, result) when finished early
+FetchStage = Callable[[Dict[str, Any]], Awaitable[Tuple[Any, Optional[Dict[str, Any]]]]]
+# write(dataset, payload) -> result
+WriteStage = Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]]
+# on_result(dataset, result), awaited as each dataset finishes
+ResultHook = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class CollectionScheduler:
+    """Two-stage pipeline: concurrent fetchers feed a bounded queue drained by DB writers.
+
+    The queue bound is the backpressure: once `queue_size` parsed payloads are waiting
+    for a writer, fetchers block instead of downloading more. Once `should_stop()` turns
+    true no further datasets are fetched; those already fetched are still written.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchStage,
+        write: WriteStage,
+        fetch_concurrency: int,
+        write_concurrency: int,
+        queue_size: int,
+        on_result: Optional[ResultHook] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ):
+        self.fetch = fetch
+        self.write = write
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.write_concurrency = max(1, write_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.on_result = on_result
+        self.should_stop = should_stop or (lambda: False)
+
+    async def run(self, datasets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process all datasets and return one result per dataset, in input order"""
+        pending = iter(enumerate(datasets))
+
+        async def next_dataset():
+            return next(pending, None)
+
+        results = await self._pipeline(next_dataset)
+
+        # Datasets never started because of should_stop()
+        return [
+            results.get(index) or {"dataset_id": dataset.get('id'), "external_id": dataset.get('external_id'), "status": "cancelled"}
+            for index, dataset in enumerate(datasets)
+        ]
+
+    async def run_claimed(self, claim: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Process datasets handed out by `claim()` until it returns None; results in completion order"""
+        counter = itertools.count()
+
+        async def next_dataset():
+            dataset = await claim()
+            return None if dataset is None else (next(counter), dataset)
+
+        results = await self._pipeline(next_dataset)
+        return [results[index] for index in sorted(results)]
+
+    async def _pipeline(self, next_dataset: Callable[[], Awaitable[Optional[Tuple[int, Dict[str, Any]]]]]) -> Dict[int, Dict[str, Any]]:
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: Dict[int, Dict[str, Any]] = {}
+
+        async def finish(index, dataset, result):
+            results[index] = result
+            if self.on_result is not None:
+                try:
+                    await self.on_result(dataset, result)
+                except Exception as error:
+                    logger.error(f"Result hook failed for dataset {dataset.get('external_id')}: {error}")
+
+        async def fetch_worker():
+            while not self.should_stop():
+                item = await next_dataset()
+                if item is None:
+                    return
+                index, dataset = item
+
+                started = time.perf_counter()
+                COLLECTOR_FETCHES_IN_PROGRESS.inc()
+                try:
+                    payload, result = await self.fetch(dataset)
+                except Exception as error:
+                    logger.error(f"Unhandled fetch error for dataset {dataset.get('external_id')}: {error}")
+                    payload, result = None, {"dataset_id": dataset.get('id'), "status": "error", "error": str(error)}
+                finally:
+                    COLLECTOR_FETCHES_IN_PROGRESS.dec()
+
+                timings = {"fetch_ms": _elapsed_ms(started)}
+                if result is not None:
+                    await finish(index, dataset, {**result, "timings": timings})
+                    continue
+
+                await ready.put((index, dataset, payload, timings, time.perf_counter()))
+                COLLECTOR_QUEUE_DEPTH.set(ready.qsize())
+
+        async def write_worker():
+            while True:
+                item = await ready.get()
+                COLLECTOR_QUEUE_DEPTH.set(ready.qsize())
+                if item is None:
+                    return
+
+                index, dataset, payload, timings, queued_at = item
+                timings["queue_wait_ms"] = _elapsed_ms(queued_at)
+                started = time.perf_counter()
+                try:
+                    result = await self.write(dataset, payload)
+                except Exception as error:
+                    logger.error(f"Unhandled write error for dataset {dataset.get('external_id')}: {error}")
+                    result = {"dataset_id": dataset.get('id'), "status": "error", "error": str(error)}
+                timings["write_ms"] = _elapsed_ms(started)
+                await finish(index, dataset, {**result, "timings": timings})
+
+        writers = [asyncio.create_task(write_worker()) for _ in range(self.write_concurrency)]
+        try:
+            await asyncio.gather(*(fetch_worker() for _ in range(self.fetch_concurrency)))
+            for _ in writers:
+                await ready.put(None)
+            await asyncio.gather(*writers)
+        finally:
+            for task in writers:
+                task.cancel()
+
+        return results
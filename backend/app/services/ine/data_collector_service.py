@@ -1,105 +1,589 @@
+import hashlib
 import httpx
+import json
 import logging
 import asyncio
-from typing import List, Dict, Any
-from app.services.ine.database_service import database_service
+import functools
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, List, Dict, Any, Optional, Tuple, Union
+from app.core.config import settings
+from app.services.ine.collection_scheduler import CollectionScheduler, ResultHook
+from app.services.ine.database_service import SAVE_COUNTERS, database_service
+from app.services.executor import run_cpu
+from app.services.metrics import COLLECTOR_BYTES, COLLECTOR_DATASETS, COLLECTOR_PAYLOAD_BYTES, COLLECTOR_RETRIES, COLLECTOR_STAGE_SECONDS
+from app.services.profiling import profiled
+from app.services.ine.payload_archive import PayloadArchive, PayloadDirectory, payload_archive
+from app.services.ine.payload_prep import PreparedChunk, decode_series, new_parser, parse_and_prepare, point_count, prepare_series
+from app.services.ine.rate_limiter import HostRateLimiter
+from app.services.ine.retry import RETRYABLE_STATUS, HostCircuitBreakers, RetryableHTTPError, RetryPolicy, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# Checkpoint of the regular sweep over all INE datasets
+DEFAULT_CHECKPOINT = "ine_collection"
+# Outcomes a resumed sweep does not need to repeat
+CHECKPOINT_STATUSES = frozenset({"success", "not_modified", "unchanged", "no_data"})
+# "write" stores what is collected; the dry runs stop after downloading ("fetch") or parsing ("parse")
+COLLECT_MODES = ("write", "parse", "fetch")
+# Fetch state a dry run ignores, so every table is downloaded in full
+FETCH_STATE_KEYS = ("fetch_etag", "fetch_last_modified", "fetch_body_hash")
+# Saved payloads to replay: the payload archive or a PayloadDirectory
+PayloadSource = Union[PayloadArchive, PayloadDirectory]
+
 class DataCollectorService:
+    # httpx transport of the INE requests; None sends them over the network (tests route them to the stand-in)
+    transport: Optional[httpx.AsyncBaseTransport] = None
     
-    async def collect_ine_data(self):
-        """Collect all INE data based on ine_datasets table"""
+    async def collect_ine_data(
+        self,
+        on_start: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+        on_result: Optional[ResultHook] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        checkpoint: Optional[str] = DEFAULT_CHECKPOINT,
+    ):
+        """Collect all INE data based on ine_datasets table.
+
+        on_start is awaited with the datasets to collect, on_result after each dataset; once
+        should_stop() returns True the remaining datasets are skipped as "cancelled".
+        Datasets finished under `checkpoint` by an interrupted earlier run are not collected
+        again; the checkpoint is cleared once a run gets through every dataset.
+        """
         try:
             logger.info("Starting INE data collection...")
+            started = time.perf_counter()
             
-            ine_source = await database_service.get_ine_data_source()
-            if not ine_source:
-                raise Exception("INE data source not found")
-            
-            datasets = await database_service.get_ine_datasets()
-            logger.info(f"Found {len(datasets)} datasets to collect")
+            async with profiled("collect_ine_data"), self._pipeline(on_result, should_stop, checkpoint=checkpoint) as scheduler:
+                datasets = await database_service.get_ine_datasets()
+                logger.info(f"Found {len(datasets)} datasets to collect")
+                pending = await self.pending_datasets(datasets, checkpoint)
+                if on_start is not None:
+                    await on_start(pending)
+                results = await scheduler.run(pending)
             
-            results = []
-            async with httpx.AsyncClient(
-                timeout=httpx.Timeout(120.0, connect=30.0),
-                follow_redirects=True,
-                limits=httpx.Limits(max_connections=5)
-            ) as client:
-                for dataset in datasets:
-                    result = await self._process_dataset(client, ine_source['base_url'], dataset)
-                    results.append(result)
-                    await asyncio.sleep(0.5)
+            if checkpoint and not any(result['status'] == "cancelled" for result in results):
+                await database_service.clear_collection_checkpoint(checkpoint)
             
-            logger.info("INE data collection completed")
-            return {"success": True, "total_datasets": len(datasets), "results": results}
+            elapsed = round(time.perf_counter() - started, 2)
+            logger.info(f"INE data collection completed in {elapsed}s")
+            return {
+                "success": True,
+                "total_datasets": len(datasets),
+                "resumed_datasets": len(datasets) - len(pending),
+                "elapsed_seconds": elapsed,
+                "results": results
+            }
             
         except Exception as error:
             logger.error(f"INE data collection failed: {error}")
             raise
     
-    async def _process_dataset(self, client: httpx.AsyncClient, base_url: str, dataset: Dict[str, Any]) -> Dict[str, Any]:
-        """Process a single dataset"""
-        base_result = {
+    async def collect_datasets(
+        self,
+        datasets: List[Dict[str, Any]],
+        mode: str = "write",
+        replay: Optional[PayloadSource] = None,
+        save_dir: Optional[Path] = None,
+        on_result: Optional[ResultHook] = None,
+    ) -> Dict[str, Any]:
+        """Collect the given datasets only, outside of any sweep checkpoint (targeted refreshes, benchmarks).
+
+        mode "fetch" downloads and "parse" also parses the payloads, both without writing
+        anything and ignoring the stored ETags and body hashes. With `replay` (the payload
+        archive or a PayloadDirectory) payloads are read from disk instead of INE; save_dir
+        keeps a copy of every downloaded payload as <external_id>.json.
+        """
+        if mode not in COLLECT_MODES:
+            raise ValueError(f"Unknown collection mode '{mode}', expected one of {COLLECT_MODES}")
+        if mode != "write":
+            datasets = [{**dataset, **dict.fromkeys(FETCH_STATE_KEYS)} for dataset in datasets]
+        
+        logger.info(f"Collecting {len(datasets)} datasets ({mode}{', replayed' if replay is not None else ''})")
+        started = time.perf_counter()
+        async with profiled("collect_datasets"), self._pipeline(on_result, mode=mode, replay=replay, save_dir=save_dir) as scheduler:
+            results = await scheduler.run(datasets)
+        elapsed = round(time.perf_counter() - started, 2)
+        return {
+            "success": True,
+            "total_datasets": len(datasets),
+            "resumed_datasets": 0,
+            "elapsed_seconds": elapsed,
+            "results": results
+        }
+    
+    async def collect_claimed(
+        self,
+        claim: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+        on_result: Optional[ResultHook] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        can_write: Optional[Callable[[Dict[str, Any]], Awaitable[bool]]] = None,
+        rate_share: float = 1.0,
+        checkpoint: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Collect the datasets handed out by `claim()` until it returns None (see SweepWorker).
+
+        can_write is checked right before a fetched dataset is written; rate_share is this
+        process' fraction of the INE rate limit when several workers share it. Finished
+        datasets are recorded under `checkpoint`, which the coordinator clears.
+        """
+        async with profiled("collect_claimed"), self._pipeline(on_result, should_stop, can_write, rate_share, checkpoint) as scheduler:
+            return await scheduler.run_claimed(claim)
+    
+    async def pending_datasets(self, datasets: List[Dict[str, Any]], checkpoint: Optional[str]) -> List[Dict[str, Any]]:
+        """The datasets an interrupted sweep recorded under `checkpoint` has not finished yet"""
+        if not checkpoint or settings.COLLECTOR_CHECKPOINT_MAX_AGE <= 0:
+            return datasets
+        finished = await database_service.get_collection_checkpoint(checkpoint, settings.COLLECTOR_CHECKPOINT_MAX_AGE)
+        if not finished:
+            return datasets
+        pending = [dataset for dataset in datasets if dataset['id'] not in finished]
+        logger.info(f"Resuming sweep '{checkpoint}': {len(datasets) - len(pending)} datasets already collected, {len(pending)} left")
+        return pending
+    
+    def _observe(self, result: Dict[str, Any]):
+        """Record a dataset's outcome, timings and download size in the collector metrics"""
+        COLLECTOR_DATASETS.inc(status=result.get('status'))
+        timings = result.get('timings') or {}
+        for stage, key in (("fetch", "fetch_ms"), ("queue_wait", "queue_wait_ms"), ("write", "write_ms")):
+            if key in timings:
+                COLLECTOR_STAGE_SECONDS.observe(timings[key] / 1000, stage=stage)
+        if result.get('parse_ms') is not None:
+            COLLECTOR_STAGE_SECONDS.observe(result['parse_ms'] / 1000, stage="parse")
+        if result.get('bytes'):
+            COLLECTOR_BYTES.inc(result['bytes'])
+            COLLECTOR_PAYLOAD_BYTES.observe(result['bytes'])
+    
+    def _result_hook(self, checkpoint: Optional[str], on_result: Optional[ResultHook]) -> ResultHook:
+        """Wrap a result hook so finished datasets are observed and recorded in the checkpoint first"""
+        checkpointing = bool(checkpoint) and settings.COLLECTOR_CHECKPOINT_MAX_AGE > 0
+        
+        async def record(dataset: Dict[str, Any], result: Dict[str, Any]):
+            self._observe(result)
+            if checkpointing and result.get('status') in CHECKPOINT_STATUSES:
+                try:
+                    await database_service.record_collection_checkpoint(checkpoint, dataset['id'], result['status'])
+                except Exception as error:
+                    logger.error(f"Could not checkpoint dataset {dataset['external_id']}: {error}")
+            if on_result is not None:
+                await on_result(dataset, result)
+        
+        return record
+    
+    @asynccontextmanager
+    async def _pipeline(
+        self, on_result=None, should_stop=None, can_write=None, rate_share: float = 1.0, checkpoint: Optional[str] = None,
+        mode: str = "write", replay: Optional[PayloadSource] = None, save_dir: Optional[Path] = None
+    ) -> AsyncIterator[CollectionScheduler]:
+        """Scheduler wired to a shared HTTP client, rate limiter and circuit breakers for one collection run"""
+        ine_source = None
+        if replay is None:
+            ine_source = await database_service.get_ine_data_source()
+            if not ine_source:
+                raise Exception("INE data source not found")
+        
+        rate_limiter = HostRateLimiter(
+            settings.INE_RATE_LIMIT_PER_SECOND * rate_share,
+            max(1, round(settings.INE_RATE_LIMIT_BURST * rate_share))
+        )
+        breakers = HostCircuitBreakers(settings.INE_CIRCUIT_FAILURE_THRESHOLD, settings.INE_CIRCUIT_RESET_SECONDS)
+        async with httpx.AsyncClient(
+            transport=self.transport,
+            timeout=httpx.Timeout(120.0, connect=30.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max(5, settings.COLLECTOR_FETCH_CONCURRENCY))
+        ) as client:
+            async def fetch(dataset):
+                if replay is not None:
+                    return await asyncio.to_thread(self._replay_stage, replay, dataset)
+                fetched, result = await self._fetch_stage(client, rate_limiter, breakers, ine_source['base_url'], dataset)
+                if fetched is not None and save_dir is not None:
+                    await asyncio.to_thread(self._save_payload, save_dir, dataset, fetched)
+                if fetched is not None and mode == "write" and settings.PAYLOAD_ARCHIVE_ENABLED:
+                    await self._archive_payload(dataset, fetched)
+                return fetched, result
+            
+            async def write(dataset, fetched):
+                if mode == "write":
+                    return await self._write_stage(dataset, fetched, can_write)
+                return await self._dry_run_stage(dataset, fetched, mode)
+            
+            yield CollectionScheduler(
+                fetch=fetch,
+                write=write,
+                fetch_concurrency=settings.COLLECTOR_FETCH_CONCURRENCY,
+                write_concurrency=settings.COLLECTOR_WRITE_CONCURRENCY,
+                queue_size=settings.COLLECTOR_QUEUE_SIZE,
+                on_result=self._result_hook(checkpoint, on_result),
+                should_stop=should_stop,
+            )
+    
+    def _base_result(self, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "dataset_id": dataset['id'],
             "dataset_name": dataset['name'],
             "external_id": dataset['external_id'],
             "record_count": 0
         }
-        
+    
+    async def _fetch_stage(self, client: httpx.AsyncClient, rate_limiter: HostRateLimiter, breakers: HostCircuitBreakers, base_url: str, dataset: Dict[str, Any]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Download a dataset; returns (fetched, None) to be written or (None, result) when there is nothing to write"""
         try:
             logger.info(f"Processing dataset: {dataset['name']} ({dataset['external_id']})")
             
             api_url = f"{base_url}/DATOS_TABLA/{dataset['external_id']}"
-            data = await self._fetch_dataset_data(client, api_url, dataset)
+            params = {}
+            # Once a table has been collected in full, refresh only its latest periods
+            if settings.INE_INCREMENTAL_PERIODS > 0 and dataset.get('fetch_body_hash'):
+                if self._full_refresh_due(dataset):
+                    # Revisions of older periods only arrive with a full download; the validators
+                    # of the last ?nult response would turn it into a 304
+                    dataset = {**dataset, **dict.fromkeys(FETCH_STATE_KEYS)}
+                else:
+                    params['nult'] = settings.INE_INCREMENTAL_PERIODS
             
-            if not data:
-                return {**base_result, "status": "no_data"}
+            fetched = await self._fetch_with_retries(client, rate_limiter, breakers, api_url, dataset, params)
             
-            try:
-                result = await asyncio.wait_for(
-                    database_service.save_dataset_data(dataset['external_id'], data),
-                    timeout=300.0
+            if fetched['status'] in ("not_modified", "unchanged"):
+                logger.info(f"Dataset {dataset['external_id']} unchanged ({fetched['status']}), skipping")
+                await database_service.update_dataset_fetch_state(
+                    dataset['id'], fetched['etag'], fetched['last_modified'], fetched['body_hash'], full=not fetched['partial']
                 )
-                await database_service.update_dataset_last_collected(dataset['id'])
-                
-                return {
-                    **base_result,
-                    "record_count": result.get('records_inserted', 0),
-                    "status": "success"
-                }
-                
-            except asyncio.TimeoutError:
-                logger.error(f"Database timeout for dataset {dataset['name']}")
-                return {**base_result, "status": "timeout_error"}
-                
+                return None, {**self._base_result(dataset), "status": fetched['status'], "bytes": fetched['bytes']}
+            
+            if not fetched['data'] and fetched.get('payload_file') is None:
+                return None, {**self._base_result(dataset), "status": "no_data"}
+            return fetched, None
+            
+        except Exception as error:
+            logger.error(f"Error processing dataset {dataset['name']}: {error}")
+            return None, {**self._base_result(dataset), "status": "error", "error": str(error)}
+    
+    def _full_refresh_due(self, dataset: Dict[str, Any]) -> bool:
+        """Whether an incrementally refreshed table is due a full download (INE_FULL_REFRESH_MAX_AGE)"""
+        full_at = dataset.get('fetch_full_at')
+        return full_at is None or (datetime.now(timezone.utc) - full_at).total_seconds() > settings.INE_FULL_REFRESH_MAX_AGE
+    
+    async def _write_stage(self, dataset: Dict[str, Any], fetched: Dict[str, Any], can_write=None) -> Dict[str, Any]:
+        """Persist a fetched dataset"""
+        base_result = self._base_result(dataset)
+        
+        try:
+            if can_write is not None and not await can_write(dataset):
+                logger.warning(f"Lease on dataset {dataset['external_id']} lost before writing, dropping it")
+                return {**base_result, "status": "lease_lost"}
+            
+            if fetched.get('payload_file') is not None:
+                save = database_service.save_dataset_chunks(
+                    dataset['external_id'],
+                    self._iter_prepared_chunks(fetched['payload_file'], fetched['partial'], fetched),
+                    partial=fetched['partial']
+                )
+            else:
+                fetched['points'] = sum(point_count(series) for series in fetched['data'])
+                save = database_service.save_dataset_data(dataset['external_id'], fetched['data'], partial=fetched['partial'])
+            result = await asyncio.wait_for(save, timeout=300.0)
+            async for payload_file in self._replayed_partials(fetched):
+                save = database_service.save_dataset_chunks(
+                    dataset['external_id'], self._iter_prepared_chunks(payload_file, True, fetched), partial=True
+                )
+                partial_result = await asyncio.wait_for(save, timeout=300.0)
+                for key in SAVE_COUNTERS:
+                    result[key] = result.get(key, 0) + partial_result.get(key, 0)
+            if not result.get('series_changed') and not result.get('series_unchanged'):
+                return {**base_result, "status": "no_data"}
+            await database_service.update_dataset_last_collected(dataset['id'])
+            await database_service.update_dataset_fetch_state(
+                dataset['id'], fetched['etag'], fetched['last_modified'], fetched['body_hash'], full=not fetched['partial']
+            )
+            
+            return {
+                **base_result,
+                "record_count": result.get('records_inserted', 0),
+                "bytes": fetched['bytes'],
+                "points": fetched.get('points', 0),
+                "changes": {key: result.get(key, 0) for key in SAVE_COUNTERS},
+                "parse_ms": round(fetched.get('parse_seconds', 0.0) * 1000, 1),
+                "status": "success"
+            }
+            
+        except asyncio.TimeoutError:
+            logger.error(f"Database timeout for dataset {dataset['name']}")
+            return {**base_result, "status": "timeout_error"}
         except Exception as error:
             logger.error(f"Error processing dataset {dataset['name']}: {error}")
             return {**base_result, "status": "error", "error": str(error)}
+        finally:
+            if fetched.get('payload_file') is not None:
+                fetched['payload_file'].close()
+    
+    async def _dry_run_stage(self, dataset: Dict[str, Any], fetched: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        """Stand-in for the write stage in the dry runs: parse (mode "parse") and drop the payload"""
+        base_result = self._base_result(dataset)
+        series = 0
+        try:
+            if mode == "parse":
+                if fetched.get('payload_file') is not None:
+                    async for chunk in self._iter_prepared_chunks(fetched['payload_file'], fetched['partial'], fetched):
+                        series += len(chunk.codes)
+                    async for payload_file in self._replayed_partials(fetched):
+                        async for chunk in self._iter_prepared_chunks(payload_file, True, fetched):
+                            series += len(chunk.codes)
+                else:
+                    parse_started = time.perf_counter()
+                    chunk = await run_cpu(prepare_series, fetched['data'], fetched['partial'])
+                    fetched['parse_seconds'] = fetched.get('parse_seconds', 0.0) + time.perf_counter() - parse_started
+                    fetched['points'] = sum(chunk.point_counts)
+                    series = len(chunk.codes)
+            return {
+                **base_result,
+                "bytes": fetched['bytes'],
+                "series": series,
+                "points": fetched.get('points', 0),
+                "parse_ms": round(fetched.get('parse_seconds', 0.0) * 1000, 1),
+                "status": "parsed" if mode == "parse" else "fetched"
+            }
+        except Exception as error:
+            logger.error(f"Error parsing dataset {dataset['name']}: {error}")
+            return {**base_result, "status": "error", "error": str(error)}
+        finally:
+            if fetched.get('payload_file') is not None:
+                fetched['payload_file'].close()
+    
+    def _replay_stage(self, replay: PayloadSource, dataset: Dict[str, Any]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Fetch stage reading a saved payload, memory-mapped, instead of downloading it.
+
+        The latest full payload is written first, then the partial ones archived after it
+        (fetched['replay_partials']), so periods only those brought in are kept. The stored
+        fetch state is carried over unchanged, so a replayed write does not make the next
+        download look like a change.
+        """
+        try:
+            entries = replay.replay_entries(dataset['external_id'])
+            opened = replay.open_entry(entries[0]) if entries else None
+        except Exception as error:
+            return None, {**self._base_result(dataset), "status": "error", "error": str(error)}
+        if opened is None:
+            return None, {**self._base_result(dataset), "status": "error", "error": "No saved payload"}
+        payload_file, entry = opened
+        return {
+            "status": "ok",
+            "data": [],
+            "partial": entry['partial'],
+            "etag": dataset.get('fetch_etag'),
+            "last_modified": dataset.get('fetch_last_modified'),
+            "body_hash": dataset.get('fetch_body_hash'),
+            "bytes": sum(entry['bytes'] for entry in entries),
+            "payload_file": payload_file,
+            "replay_partials": [functools.partial(replay.open_entry, entry) for entry in entries[1:]],
+        }, None
     
-    async def _fetch_dataset_data(self, client: httpx.AsyncClient, api_url: str, dataset: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Fetch data for a specific INE dataset"""
+    async def _replayed_partials(self, fetched: Dict[str, Any]) -> AsyncIterator[BinaryIO]:
+        """Open the partial payloads to replay after the full one, in order; each is closed once consumed"""
+        for open_entry in fetched.get('replay_partials', ()):
+            opened = await asyncio.to_thread(open_entry)
+            if opened is None:
+                # Rebuilding without it would silently drop the periods it brought in
+                raise RuntimeError("An archived partial payload is missing")
+            payload_file, _ = opened
+            try:
+                yield payload_file
+            finally:
+                payload_file.close()
+    
+    async def _archive_payload(self, dataset: Dict[str, Any], fetched: Dict[str, Any]):
+        """Add a downloaded payload to the archive; a failure is logged, the dataset still gets written"""
+        source = fetched.get('payload_file')
+        if source is None:
+            source = fetched.pop('body', None)
+        if source is None:
+            return
         try:
-            response = await client.get(api_url)
+            await asyncio.to_thread(payload_archive.store, dataset['external_id'], source, fetched)
+        except Exception as error:
+            logger.error(f"Could not archive the payload of dataset {dataset['external_id']}: {error}")
+    
+    def _save_payload(self, save_dir: Path, dataset: Dict[str, Any], fetched: Dict[str, Any]):
+        """Keep a copy of a downloaded payload as <external_id>.json, for replaying it later"""
+        save_dir = Path(save_dir)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        with open(save_dir / f"{dataset['external_id']}.json", 'wb') as target:
+            if fetched.get('payload_file') is not None:
+                shutil.copyfileobj(fetched['payload_file'], target)
+                fetched['payload_file'].seek(0)
+            else:
+                target.write(fetched.get('body') or json.dumps([series.to_item() for series in fetched['data']]).encode())
+    
+    async def _fetch_with_retries(self, client: httpx.AsyncClient, rate_limiter: HostRateLimiter, breakers: HostCircuitBreakers, api_url: str, dataset: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """_fetch_dataset_data behind the host's circuit breaker, retrying 429/5xx and connection errors.
+
+        Retries back off exponentially with jitter, and never before a Retry-After, which
+        also pauses the host's rate limiter so the other fetchers hold back as well.
+        """
+        policy = RetryPolicy(settings.INE_RETRY_ATTEMPTS, settings.INE_RETRY_BASE_DELAY, settings.INE_RETRY_MAX_DELAY)
+        breaker = breakers.breaker_for(api_url)
+        attempt = 0
+        while True:
+            attempt += 1
+            await breaker.wait(settings.INE_CIRCUIT_MAX_WAIT)
+            try:
+                await rate_limiter.acquire(api_url)
+                fetched = await self._fetch_dataset_data(client, api_url, dataset, params)
+            except (RetryableHTTPError, httpx.TransportError) as error:
+                retry_after = getattr(error, 'retry_after', None)
+                if getattr(error, 'status_code', None) == 429:
+                    # Throttled, not failing: the pause below is the remedy
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+                delay = policy.delay(attempt, retry_after)
+                if delay is None:
+                    raise
+                if retry_after:
+                    rate_limiter.pause(api_url, retry_after)
+                COLLECTOR_RETRIES.inc(reason=getattr(error, 'status_code', None) or type(error).__name__)
+                logger.warning(f"Attempt {attempt} for dataset {dataset['external_id']} failed ({error!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return fetched
+    
+    def _raise_for_status(self, response: httpx.Response, dataset: Dict[str, Any]):
+        """Raise for a response that is neither 200 nor 304; RetryableHTTPError when it is worth retrying"""
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableHTTPError(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        raise Exception(f"HTTP {response.status_code} for dataset {dataset['external_id']}")
+    
+    async def _fetch_dataset_data(self, client: httpx.AsyncClient, api_url: str, dataset: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fetch data for a specific INE dataset.
+
+        Sends the stored ETag / Last-Modified as conditional headers and compares the body
+        hash with the previous download, so unchanged tables are neither parsed nor written.
+        """
+        params = params or {}
+        headers = {}
+        if dataset.get('fetch_etag'):
+            headers['If-None-Match'] = dataset['fetch_etag']
+        if dataset.get('fetch_last_modified'):
+            headers['If-Modified-Since'] = dataset['fetch_last_modified']
+        
+        fetched = {
+            "status": "ok",
+            "data": [],
+            "partial": 'nult' in params,
+            "etag": dataset.get('fetch_etag'),
+            "last_modified": dataset.get('fetch_last_modified'),
+            "body_hash": dataset.get('fetch_body_hash'),
+            "bytes": 0,
+        }
+        
+        try:
+            if settings.INE_STREAMING_PARSE:
+                return await self._fetch_to_spool(client, api_url, dataset, params, headers, fetched)
+            
+            response = await client.get(api_url, params=params, headers=headers)
+            
+            if response.status_code == 304:
+                return {**fetched, "status": "not_modified"}
             
             if response.status_code != 200:
-                logger.error(f"HTTP {response.status_code} for dataset {dataset['external_id']}")
-                return []
+                self._raise_for_status(response, dataset)
             
-            data = response.json()
+            body = response.content
+            fetched.update({
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "body_hash": hashlib.sha256(body).hexdigest(),
+                "bytes": len(body),
+            })
+            if fetched['body_hash'] == dataset.get('fetch_body_hash'):
+                return {**fetched, "status": "unchanged"}
             
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                return data.get('Data', data.get('datos', [data]))
-            else:
-                logger.warning(f"Unexpected data type for dataset {dataset['external_id']}: {type(data)}")
-                return []
-                
+            parse_started = time.perf_counter()
+            # Packed into columns in the executor: the decoded point objects never reach the write stage
+            series = await run_cpu(decode_series, body)
+            if series is None:
+                logger.warning(f"Unexpected payload for dataset {dataset['external_id']}")
+            fetched['data'] = series or []
+            fetched['parse_seconds'] = time.perf_counter() - parse_started
+            if settings.PAYLOAD_ARCHIVE_ENABLED:
+                # Kept for the payload archive, which only gets to it once parsed
+                fetched['body'] = body
+            return fetched
+        
+        except (RetryableHTTPError, httpx.TransportError):
+            # Logged by _fetch_with_retries
+            raise
         except Exception as error:
             logger.error(f"Error fetching data for dataset {dataset['external_id']}: {error}")
             raise
     
+    async def _fetch_to_spool(self, client: httpx.AsyncClient, api_url: str, dataset: Dict[str, Any], params: Dict[str, Any], headers: Dict[str, str], fetched: Dict[str, Any]) -> Dict[str, Any]:
+        """Stream the response body into a spooled temp file, hashing it on the way.
+
+        Parsing is deferred to the write stage, which reads the file series by series, so
+        neither the body nor the parsed table is ever held in memory as a whole.
+        """
+        async with client.stream("GET", api_url, params=params, headers=headers) as response:
+            if response.status_code == 304:
+                return {**fetched, "status": "not_modified"}
+            
+            if response.status_code != 200:
+                self._raise_for_status(response, dataset)
+            
+            spool = tempfile.SpooledTemporaryFile(max_size=settings.INE_SPOOL_MAX_BYTES)
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async for block in response.aiter_bytes():
+                    digest.update(block)
+                    spool.write(block)
+                    size += len(block)
+            except BaseException:
+                spool.close()
+                raise
+            
+            fetched.update({
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "body_hash": digest.hexdigest(),
+                "bytes": size,
+            })
+        
+        if fetched['body_hash'] == dataset.get('fetch_body_hash'):
+            spool.close()
+            return {**fetched, "status": "unchanged"}
+        
+        spool.seek(0)
+        return {**fetched, "payload_file": spool}
+    
+    async def _iter_prepared_chunks(self, payload_file: BinaryIO, partial: bool, fetched: Optional[Dict[str, Any]] = None) -> AsyncIterator[PreparedChunk]:
+        """Parse a payload file and prepare its series for the DB writer, a slice at a time in the CPU executor.
+
+        Slices are read in a thread: the file is a spool that may have rolled over to disk, or an
+        archived payload. The time spent parsing and the data points seen are added up in fetched['parse_seconds']
+        and fetched['points'].
+        """
+        parser = new_parser()
+        while True:
+            data = await asyncio.to_thread(payload_file.read, settings.INE_STREAM_CHUNK_BYTES)
+            final = len(data) < settings.INE_STREAM_CHUNK_BYTES
+            parse_started = time.perf_counter()
+            parser, chunk = await run_cpu(parse_and_prepare, parser, data, final, partial)
+            if fetched is not None:
+                fetched['parse_seconds'] = fetched.get('parse_seconds', 0.0) + time.perf_counter() - parse_started
+                fetched['points'] = fetched.get('points', 0) + sum(chunk.point_counts)
+            if chunk.codes:
+                yield chunk
+            if final:
+                return
+    
     async def test_ine_connection(self) -> bool:
         """Test connection to INE API"""
         try:
@@ -0,0 +1,354 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.schemas import DataFilters
+
+# Output field -> (SQL expression, reference_data lookup resolving the selected id to its label)
+PROCESSED_FIELDS: Dict[str, Tuple[str, Optional[str]]] = {
+    'code': ("m.code", None),
+    'indicator_name': ("m.name", None),
+    'unit_description': ("m.unit_id", "units"),
+    'scale_description': ("m.scale_id", "scales"),
+    'frequency_name': ("dp.period_id", "frequencies"),
+    'year': ("dp.year", None),
+    'value': ("ROUND(dp.value::numeric, 2)", None),
+    'data_confidentiality': ("""CASE 
+            WHEN dp.is_secret = true THEN 'Confidential — not publicly shown'
+            ELSE 'Public data — freely available'
+        END""", None),
+}
+
+
+SERIES_RESOLUTIONS = ("annual", "quarterly", "lttb")
+
+# Stands for a NULL year or period_id in the processed keyset, sorting before every period
+NULL_PERIOD = -2147483648
+
+# Time zone of the INE period dates (Fecha)
+INE_TIMEZONE = "Europe/Madrid"
+
+
+class RawJSON(str):
+    """JSON text to be embedded verbatim when serializing a response"""
+
+
+class _Params:
+    """Collects query arguments and hands out their $n placeholders"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def add(self, value) -> str:
+        self.values.append(value)
+        return f"${len(self.values)}"
+
+
+def _period_bound(alias: str, bound: List[int], operator: str, params: _Params) -> str:
+    """(year) or (year, period_id) comparison for a start/end bound"""
+    if len(bound) == 1:
+        return f"{alias}.year {operator} {params.add(bound[0])}"
+    return f"({alias}.year, {alias}.period_id) {operator} ({params.add(bound[0])}, {params.add(bound[1])})"
+
+
+def _points_join(filters: DataFilters, params: _Params, outer: bool, plottable: bool = False) -> str:
+    """Join from ine_metadata m to its (filtered) data points as dp.
+
+    The last-N restriction is a LATERAL subquery reading each series' newest periods
+    from the (metadata_id, year, period_id) index. plottable keeps only public points
+    with a value and a date.
+    """
+    alias = "p" if filters.last_n else "dp"
+    conditions = [f"{alias}.metadata_id = m.id"]
+    if plottable:
+        conditions.append(
+            f"{alias}.value IS NOT NULL AND NOT {alias}.is_secret AND {alias}.timestamp_ms IS NOT NULL"
+        )
+    if filters.start:
+        conditions.append(_period_bound(alias, filters.start, ">=", params))
+    if filters.end:
+        conditions.append(_period_bound(alias, filters.end, "<=", params))
+    where = " AND ".join(conditions)
+    join = "LEFT JOIN" if outer else "JOIN"
+
+    if filters.last_n:
+        return f"""{join} LATERAL (
+            SELECT * FROM ine_data_points p
+            WHERE {where}
+            ORDER BY p.year DESC, p.period_id DESC
+            LIMIT {params.add(filters.last_n)}
+        ) dp ON true"""
+    return f"{join} ine_data_points dp ON {where}"
+
+
+def build_raw_data_query(dataset_code: str, filters: Optional[DataFilters] = None) -> Tuple[str, List[Any]]:
+    """Series with their data points as JSON, keyset-paginated by code.
+
+    Without period filters this is an indexed lookup of the JSON precomputed in
+    ine_series_store; period filters aggregate the selected points on the fly. Every path
+    emits jsonb text, so a series reads the same (and keeps its ETag) whichever one served it.
+    """
+    filters = filters or DataFilters()
+    params = _Params(dataset_code)
+
+    conditions = ["m.dataset_external_id = $1"]
+    if filters.codes:
+        conditions.append(f"m.code = ANY({params.add(filters.codes)}::text[])")
+    if filters.after:
+        conditions.append(f"m.code > {params.add(filters.after[0])}")
+
+    if not (filters.start or filters.end or filters.last_n):
+        limit = f"LIMIT {params.add(filters.limit)}" if filters.limit else ""
+        # Series not yet in the store (e.g. before a backfill) fall back to aggregation
+        sql = f"""
+            SELECT 
+                m.code,
+                m.name,
+                COALESCE(m.unit_id::text, '') AS unit_id,
+                COALESCE(m.scale_id::text, '') AS scale_id,
+                COALESCE(
+                    s.data_points::text,
+                    (
+                        SELECT jsonb_agg(
+                            jsonb_build_object(
+                                'value', ROUND(dp.value::numeric, 2),
+                                'is_secret', dp.is_secret,
+                                'period_id', dp.period_id,
+                                'year', dp.year,
+                                'data_type_id', dp.data_type_id,
+                                'timestamp_ms', dp.timestamp_ms
+                            ) ORDER BY dp.period_index
+                        )::text
+                        FROM ine_data_points dp
+                        WHERE dp.metadata_id = m.id
+                    ),
+                    '[]'
+                ) as data_points
+            FROM ine_metadata m
+            LEFT JOIN ine_series_store s ON s.metadata_id = m.id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY m.code
+            {limit}
+        """
+        return sql, params.values
+
+    points_join = _points_join(filters, params, outer=True)
+    limit = f"LIMIT {params.add(filters.limit)}" if filters.limit else ""
+
+    sql = f"""
+        SELECT 
+            m.code,
+            m.name,
+            COALESCE(m.unit_id::text, '') AS unit_id,
+            COALESCE(m.scale_id::text, '') AS scale_id,
+            COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'value', ROUND(dp.value::numeric, 2),
+                        'is_secret', dp.is_secret,
+                        'period_id', dp.period_id,
+                        'year', dp.year,
+                        'data_type_id', dp.data_type_id,
+                        'timestamp_ms', dp.timestamp_ms
+                    ) ORDER BY dp.period_index
+                ) FILTER (WHERE dp.metadata_id IS NOT NULL),
+                '[]'::jsonb
+            )::text as data_points
+        FROM ine_metadata m
+        {points_join}
+        WHERE {" AND ".join(conditions)}
+        GROUP BY m.id, m.code, m.name, m.unit_id, m.scale_id
+        ORDER BY m.code
+        {limit}
+    """
+    return sql, params.values
+
+
+def build_processed_data_query(dataset_code: str, filters: Optional[DataFilters] = None) -> Tuple[str, List[Any]]:
+    """One row per data point, keyset-paginated on (code, year, period_id, period_index).
+
+    year and period_id may be NULL: the key orders them first as NULL_PERIOD, so row
+    comparisons never see a NULL, and period_index breaks ties. Only the requested fields
+    are selected. Dimension fields select the raw ids, which processed_row_to_dict resolves
+    from the reference data cache instead of joining the lookup tables.
+    """
+    filters = filters or DataFilters()
+    fields = filters.fields or list(PROCESSED_FIELDS)
+    params = _Params(dataset_code)
+    points_join = _points_join(filters, params, outer=False)
+
+    select = [f"{PROCESSED_FIELDS[name][0]} AS {name}" for name in fields]
+    select += [
+        "m.code AS _key_code", "dp.year AS _key_year", "dp.period_id AS _key_period_id",
+        "dp.period_index AS _key_period_index",
+    ]
+    key = f"m.code, COALESCE(dp.year, {NULL_PERIOD}), COALESCE(dp.period_id, {NULL_PERIOD}), dp.period_index"
+
+    conditions = ["m.dataset_external_id = $1"]
+    if filters.codes:
+        conditions.append(f"m.code = ANY({params.add(filters.codes)}::text[])")
+    if filters.after:
+        code, year, period_id, period_index = filters.after
+        conditions.append(
+            f"({key}) > ({params.add(code)}, {params.add(year)}::int, {params.add(period_id)}::int, {params.add(period_index)}::int)"
+        )
+    limit = f"LIMIT {params.add(filters.limit)}" if filters.limit else ""
+
+    sql = f"""
+        SELECT {", ".join(select)}
+        FROM ine_metadata m
+        {points_join}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {key}
+        {limit}
+    """
+    return sql, params.values
+
+
+def _series_page(filters: DataFilters, params: _Params) -> str:
+    """CTE selecting one keyset page of series as `page`"""
+    conditions = ["m.dataset_external_id = $1"]
+    if filters.codes:
+        conditions.append(f"m.code = ANY({params.add(filters.codes)}::text[])")
+    if filters.after:
+        conditions.append(f"m.code > {params.add(filters.after[0])}")
+    limit = f"LIMIT {params.add(filters.limit)}" if filters.limit else ""
+    return f"""page AS (
+            SELECT m.id, m.code, m.name, m.unit_id, m.scale_id
+            FROM ine_metadata m
+            WHERE {" AND ".join(conditions)}
+            ORDER BY m.code
+            {limit}
+        )"""
+
+
+def build_series_aggregate_query(dataset_code: str, filters: Optional[DataFilters], resolution: str) -> Tuple[str, List[Any]]:
+    """Series with their points averaged per year or quarter, with min/max envelopes, as JSON.
+
+    Secret and empty points are left out. Quarters follow the INE date (Fecha) in Spanish
+    local time, where a period starts at midnight.
+    """
+    filters = filters or DataFilters()
+    params = _Params(dataset_code)
+    page = _series_page(filters, params)
+    points_join = _points_join(filters, params, outer=False, plottable=True)
+    quarter = (
+        f"EXTRACT(QUARTER FROM to_timestamp(dp.timestamp_ms / 1000.0) AT TIME ZONE '{INE_TIMEZONE}')::int"
+        if resolution == "quarterly" else "NULL::int"
+    )
+
+    sql = f"""
+        WITH {page},
+        buckets AS (
+            SELECT 
+                m.id AS metadata_id,
+                dp.year,
+                {quarter} AS quarter,
+                MIN(dp.timestamp_ms) AS timestamp_ms,
+                ROUND(AVG(dp.value)::numeric, 2) AS value,
+                ROUND(MIN(dp.value)::numeric, 2) AS min,
+                ROUND(MAX(dp.value)::numeric, 2) AS max,
+                COUNT(*) AS count
+            FROM page m
+            {points_join}
+            GROUP BY m.id, dp.year, 3
+        )
+        SELECT 
+            m.code,
+            m.name,
+            COALESCE(m.unit_id::text, '') AS unit_id,
+            COALESCE(m.scale_id::text, '') AS scale_id,
+            COALESCE(
+                json_agg(
+                    json_strip_nulls(json_build_object(
+                        'timestamp_ms', b.timestamp_ms,
+                        'year', b.year,
+                        'quarter', b.quarter,
+                        'value', b.value,
+                        'min', b.min,
+                        'max', b.max,
+                        'count', b.count
+                    )) ORDER BY b.year, b.quarter
+                ) FILTER (WHERE b.metadata_id IS NOT NULL),
+                '[]'
+            )::text as data_points
+        FROM page m
+        LEFT JOIN buckets b ON b.metadata_id = m.id
+        GROUP BY m.id, m.code, m.name, m.unit_id, m.scale_id
+        ORDER BY m.code
+    """
+    return sql, params.values
+
+
+def build_series_points_query(dataset_code: str, filters: Optional[DataFilters] = None) -> Tuple[str, List[Any]]:
+    """Series with the dates and values of their plottable points as arrays, for downsampling"""
+    filters = filters or DataFilters()
+    params = _Params(dataset_code)
+    page = _series_page(filters, params)
+    points_join = _points_join(filters, params, outer=True, plottable=True)
+
+    sql = f"""
+        WITH {page}
+        SELECT 
+            m.code,
+            m.name,
+            COALESCE(m.unit_id::text, '') AS unit_id,
+            COALESCE(m.scale_id::text, '') AS scale_id,
+            array_agg(dp.timestamp_ms ORDER BY dp.timestamp_ms) FILTER (WHERE dp.metadata_id IS NOT NULL) AS timestamps,
+            array_agg(ROUND(dp.value::numeric, 2)::float8 ORDER BY dp.timestamp_ms) FILTER (WHERE dp.metadata_id IS NOT NULL) AS "values"
+        FROM page m
+        {points_join}
+        GROUP BY m.id, m.code, m.name, m.unit_id, m.scale_id
+        ORDER BY m.code
+    """
+    return sql, params.values
+
+
+def series_points_row_to_tuple(row) -> Tuple:
+    """Plain-tuple form of a series points row, which can be shipped to a process pool"""
+    return (row['code'], row['name'], row['unit_id'], row['scale_id'], row['timestamps'] or [], row['values'] or [])
+
+
+def raw_row_to_dict(row, decode: bool = True) -> Dict[str, Any]:
+    data_points = row['data_points']
+    
+    if not data_points or data_points == [None]:
+        parsed_data_points = []
+    elif not decode and isinstance(data_points, str):
+        parsed_data_points = RawJSON(data_points)
+    else:
+        try:
+            if isinstance(data_points, str):
+                parsed_data_points = json.loads(data_points)
+            else:
+                parsed_data_points = data_points
+        except (json.JSONDecodeError, TypeError):
+            parsed_data_points = []
+    
+    return {
+        'code': row['code'],
+        'name': row['name'],
+        'unit_id': row['unit_id'],
+        'scale_id': row['scale_id'],
+        'data_points': parsed_data_points  
+    }
+
+
+def processed_row_to_dict(row, fields: Optional[List[str]], labels: Dict[str, Dict[Any, str]]) -> Dict[str, Any]:
+    """Output dict of a processed row, dimension ids replaced by their labels"""
+    item = {}
+    for name in fields or PROCESSED_FIELDS:
+        lookup = PROCESSED_FIELDS[name][1]
+        item[name] = labels[lookup].get(row[name]) if lookup else row[name]
+    return item
+
+
+def raw_row_key(row) -> Tuple:
+    return (row['code'],)
+
+
+def processed_row_key(row) -> Tuple:
+    return (
+        row['_key_code'],
+        NULL_PERIOD if row['_key_year'] is None else row['_key_year'],
+        NULL_PERIOD if row['_key_period_id'] is None else row['_key_period_id'],
+        row['_key_period_index'],
+    )
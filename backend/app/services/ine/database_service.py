@@ -1,274 +1,1184 @@
 import asyncpg
+import asyncio
 import logging
 import json
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Set, Tuple, Union
 from app.core.config import settings
+from app.models.schemas import DataFilters
+from app.services.cache import CATALOGUE_NAMESPACE, SEARCH_NAMESPACE, response_cache
+from app.services.executor import run_cpu, run_local
+from app.services.metrics import DB_ACQUIRE_SECONDS, instrument_methods, registry
+from app.services.ine.payload_prep import PreparedChunk, point_count, prepare_series
+from app.services.ine.series_columns import SeriesColumns
+from app.services.ine.reference_data import REFERENCE_CHANNEL, REFERENCE_TABLES, Labels, reference_data
+from app.services.ine.data_queries import (
+    build_processed_data_query,
+    build_raw_data_query,
+    build_series_aggregate_query,
+    build_series_points_query,
+    processed_row_key,
+    processed_row_to_dict,
+    raw_row_key,
+    raw_row_to_dict,
+    series_points_row_to_tuple,
+)
 
 logger = logging.getLogger(__name__)
 
+SAVE_COUNTERS = (
+    'records_inserted', 'records_updated', 'records_deleted', 'records_unchanged',
+    'records_skipped', 'series_changed', 'series_unchanged', 'series_named'
+)
+
+# First key of the per-dataset advisory lock taken by every save transaction
+DATASET_WRITE_LOCK = 4863
+# Advisory lock serializing schema bootstraps of concurrently starting processes
+SCHEMA_LOCK = 4864
+# Alembic revision (migrations/versions) this code expects; bump it with every migration
+SCHEMA_VERSION = "0002"
+
+STAGING_COLUMNS = [
+    'metadata_id', 'period_index', 'value', 'is_secret',
+    'period_id', 'year', 'data_type_id', 'timestamp_ms'
+]
+
+
+# Chronological order of the points of one series; points without a timestamp or period sort last
+PARTIAL_ORDER = "COALESCE({0}.timestamp_ms, 9223372036854775807), COALESCE({0}.year, 2147483647), COALESCE({0}.period_id, 2147483647)"
+
+# Per-series JSON written at ingestion time, in the shape the raw endpoint used to
+# aggregate with json_agg on every request
+SERIES_STORE_UPSERT = """
+    INSERT INTO ine_series_store (metadata_id, data_points, point_count, updated_at)
+    SELECT
+        m.id,
+        COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'value', ROUND(dp.value::numeric, 2),
+                    'is_secret', dp.is_secret,
+                    'period_id', dp.period_id,
+                    'year', dp.year,
+                    'data_type_id', dp.data_type_id,
+                    'timestamp_ms', dp.timestamp_ms
+                ) ORDER BY dp.period_index
+            ) FILTER (WHERE dp.metadata_id IS NOT NULL),
+            '[]'::jsonb
+        ),
+        COUNT(dp.metadata_id),
+        CURRENT_TIMESTAMP
+    FROM ine_metadata m
+    LEFT JOIN ine_data_points dp ON dp.metadata_id = m.id
+"""
+
+SERIES_STORE_CONFLICT = """
+    ON CONFLICT (metadata_id) DO UPDATE
+    SET data_points = EXCLUDED.data_points, point_count = EXCLUDED.point_count, updated_at = EXCLUDED.updated_at
+"""
+
+
+def _affected_rows(status: str) -> int:
+    """Row count from a command status such as 'UPDATE 3' or 'INSERT 0 3'"""
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def _job_to_dict(row: asyncpg.Record) -> Dict[str, Any]:
+    job = dict(row)
+    for key in ('progress', 'result'):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+    return job
+
+
+def _rows_to_dicts(to_dict, rows: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    return [to_dict(row) for row in rows]
+
+
+@instrument_methods
 class DatabaseService:
     def __init__(self):
         self.connection_url = settings.DB_CONNECTION_STRING
+        self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self._acquire_count = 0
+        self._acquire_timeouts = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
     
-    async def get_connection(self):
-        return await asyncpg.connect(self.connection_url)
+    async def connect(self) -> asyncpg.Pool:
+        """Create the shared connection pool (called from the app lifespan)"""
+        async with self._pool_lock:
+            if self.pool is None:
+                self.pool = await asyncpg.create_pool(
+                    self.connection_url,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+                    # Set DB_STATEMENT_CACHE_SIZE=0 behind pgbouncer in transaction mode
+                    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                    max_cached_statement_lifetime=settings.DB_MAX_CACHED_STATEMENT_LIFETIME,
+                )
+                logger.info(
+                    f"Database pool created (min={settings.DB_POOL_MIN_SIZE}, max={settings.DB_POOL_MAX_SIZE})"
+                )
+            return self.pool
     
-    async def initialize_tables(self):
-        """Create metadata and data tables if they don't exist"""
-        conn = await self.get_connection()
+    async def close(self):
+        """Close the shared connection pool"""
+        async with self._pool_lock:
+            if self.pool is not None:
+                await self.pool.close()
+                self.pool = None
+                logger.info("Database pool closed")
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection from the pool, creating the pool on first use"""
+        pool = self.pool or await self.connect()
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._acquire_timeouts += 1
+            logger.error(f"Timed out after {settings.DB_POOL_ACQUIRE_TIMEOUT}s waiting for a database connection")
+            raise
+        waited = time.perf_counter() - started
+        DB_ACQUIRE_SECONDS.observe(waited)
+        self._acquire_count += 1
+        self._acquire_wait_total += waited
+        self._acquire_wait_max = max(self._acquire_wait_max, waited)
         try:
+            yield conn
+        finally:
+            await pool.release(conn)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Pool utilization metrics"""
+        stats = {
+            "initialized": self.pool is not None,
+            "acquire_count": self._acquire_count,
+            "acquire_timeouts": self._acquire_timeouts,
+            "acquire_wait_avg_ms": round(self._acquire_wait_total / self._acquire_count * 1000, 3) if self._acquire_count else 0.0,
+            "acquire_wait_max_ms": round(self._acquire_wait_max * 1000, 3),
+        }
+        if self.pool is not None:
+            size = self.pool.get_size()
+            idle = self.pool.get_idle_size()
+            stats.update({
+                "size": size,
+                "idle": idle,
+                "in_use": size - idle,
+                "min_size": self.pool.get_min_size(),
+                "max_size": self.pool.get_max_size(),
+                "utilization": round((size - idle) / self.pool.get_max_size(), 3),
+            })
+        return stats
+    
+    @asynccontextmanager
+    async def _advisory_lock(self, conn, key: int):
+        """Session-level advisory lock held for the duration of the block"""
+        await conn.execute("SELECT pg_advisory_lock($1)", key)
+        try:
+            yield
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", key)
+    
+    def _pool_gauge(self) -> Dict[Tuple[str, ...], float]:
+        if self.pool is None:
+            return {}
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {("in_use",): size - idle, ("idle",): idle, ("max",): self.pool.get_max_size()}
+    
+    async def ensure_schema(self):
+        """Bootstrap the schema once per process: called at startup, a no-op afterwards.
+
+        Raises when the database is at another migration than SCHEMA_VERSION, so a
+        process never runs against a schema it was not written for.
+        """
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if self._schema_ready:
+                return
+            started = time.perf_counter()
+            await self.initialize_tables()
+            self._schema_ready = True
+            logger.info(f"Database schema {SCHEMA_VERSION} ready in {(time.perf_counter() - started) * 1000:.1f}ms")
+    
+    async def initialize_tables(self):
+        """Create metadata and data tables if they don't exist (see ensure_schema).
+
+        Holds SCHEMA_LOCK, so concurrently starting processes don't run the DDL against
+        each other; each statement still commits on its own, keeping the catalog locks
+        it takes short. A database not managed by Alembic yet is stamped with SCHEMA_VERSION.
+        """
+        async with self.acquire() as conn, self._advisory_lock(conn, SCHEMA_LOCK):
+            version = None
+            if await conn.fetchval("SELECT to_regclass('alembic_version') IS NOT NULL"):
+                version = await conn.fetchval("SELECT version_num FROM alembic_version")
+            if version is not None and version != SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema is at revision {version}, this code expects {SCHEMA_VERSION}; "
+                    f"run `alembic upgrade head` (or deploy the matching code)"
+                )
+            
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS ine_metadata (
                     id SERIAL PRIMARY KEY,
                     dataset_external_id TEXT NOT NULL,
                     code TEXT NOT NULL,
                     name TEXT,
-                    unit_id TEXT,
-                    scale_id TEXT,
+                    unit_id INTEGER,
+                    scale_id INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     UNIQUE(dataset_external_id, code)
                 );
             """)
             
+            legacy = await conn.fetchval("""
+                SELECT data_type = 'numeric' FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'ine_data_points' AND column_name = 'value'
+            """)
+            if legacy:
+                raise RuntimeError(
+                    "ine_data_points still has the NUMERIC layout; migrate it with `alembic upgrade head`"
+                )
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS ine_data_points (
-                    id SERIAL PRIMARY KEY,
-                    metadata_id INTEGER REFERENCES ine_metadata(id) ON DELETE CASCADE,
-                    period_index INTEGER,
-                    value NUMERIC,
+                    metadata_id INTEGER NOT NULL REFERENCES ine_metadata(id) ON DELETE CASCADE,
+                    period_index INTEGER NOT NULL,
+                    value DOUBLE PRECISION,
                     is_secret BOOLEAN DEFAULT FALSE,
                     period_id INTEGER,
                     year INTEGER,
                     data_type_id INTEGER,
                     timestamp_ms BIGINT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    PRIMARY KEY (metadata_id, period_index)
                 );
             """)
             
-            await conn.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_metadata_id ON ine_data_points(metadata_id);")
-            await conn.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_year_period ON ine_data_points(year, period_id);")
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_series_year_period ON ine_data_points(metadata_id, year, period_id) INCLUDE (value, is_secret);")
+            await conn.execute("ALTER TABLE ine_metadata ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS ine_series_store (
+                    metadata_id INTEGER PRIMARY KEY REFERENCES ine_metadata(id) ON DELETE CASCADE,
+                    data_points JSONB NOT NULL,
+                    point_count INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            await conn.execute("""
+                ALTER TABLE IF EXISTS ine_datasets
+                    ADD COLUMN IF NOT EXISTS fetch_etag TEXT,
+                    ADD COLUMN IF NOT EXISTS fetch_last_modified TEXT,
+                    ADD COLUMN IF NOT EXISTS fetch_body_hash TEXT,
+                    ADD COLUMN IF NOT EXISTS fetch_full_at TIMESTAMPTZ;
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS collection_jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    runner TEXT,
+                    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+                    total_datasets INTEGER,
+                    completed_datasets INTEGER NOT NULL DEFAULT 0,
+                    progress JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    result JSONB,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            # At most one queued/running job per type: concurrent submissions collapse onto it
+            await conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_collection_jobs_active
+                ON collection_jobs(job_type) WHERE status IN ('queued', 'running');
+            """)
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_collection_jobs_created_at ON collection_jobs(created_at DESC);")
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS collection_sweep_items (
+                    job_id TEXT NOT NULL REFERENCES collection_jobs(id) ON DELETE CASCADE,
+                    dataset_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires_at TIMESTAMP,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result JSONB,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (job_id, dataset_id)
+                );
+            """)
+            # Datasets finished by the current sweep of a collector, so a restarted sweep resumes after them
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS collection_checkpoints (
+                    name TEXT NOT NULL,
+                    dataset_id INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (name, dataset_id)
+                );
+            """)
+            # Dimension table changes reach the reference data cache of every API process
+            await conn.execute(f"""
+                CREATE OR REPLACE FUNCTION notify_ine_reference_data() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify('{REFERENCE_CHANNEL}', TG_TABLE_NAME);
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql;
+            """)
+            await conn.execute(f"""
+                DO $$
+                DECLARE
+                    name TEXT;
+                BEGIN
+                    FOREACH name IN ARRAY ARRAY[{", ".join(f"'{table}'" for table, _ in REFERENCE_TABLES.values())}] LOOP
+                        IF to_regclass(name) IS NOT NULL AND NOT EXISTS (
+                            SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(name) AND tgname = name || '_notify'
+                        ) THEN
+                            EXECUTE format(
+                                'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                                'FOR EACH STATEMENT EXECUTE FUNCTION notify_ine_reference_data()',
+                                name || '_notify', name
+                            );
+                        END IF;
+                    END LOOP;
+                END
+                $$;
+            """)
             
-        finally:
-            await conn.close()
+            if version is None:
+                # Same table `alembic stamp` creates, so later migrations start from here
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS alembic_version (
+                        version_num VARCHAR(32) NOT NULL,
+                        CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+                    );
+                """)
+                await conn.execute("INSERT INTO alembic_version (version_num) VALUES ($1)", SCHEMA_VERSION)
     
     async def get_ine_data_source(self) -> Optional[Dict[str, Any]]:
         """Get INE data source configuration"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             row = await conn.fetchrow("SELECT * FROM data_sources WHERE adapter = $1", "ine")
             return dict(row) if row else None
-        finally:
-            await conn.close()
     
     async def get_ine_datasets(self) -> List[Dict[str, Any]]:
         """Get all INE datasets to collect"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             rows = await conn.fetch("SELECT d.*, ds.name as dataset_name FROM ine_datasets d left join data_sources ds ON CAST( d.data_source_id  AS INTEGER)= ds.id ORDER BY d.id")
             return [dict(row) for row in rows]
-        finally:
-            await conn.close()
     
-    async def save_dataset_data(self, dataset_external_id: str, data: List[Dict[str, Any]]):
-        """Save dataset data with metadata and data points separation"""
+    async def save_dataset_data(self, dataset_external_id: str, data: List[Union[Dict[str, Any], SeriesColumns]], mode: Optional[str] = None, partial: bool = False):
+        """Save dataset data with metadata and data points separation.
+
+        Bulk path: one upsert for the series metadata and a COPY of the data points into a
+        staging table that is applied with set-based SQL. In "replace" mode every series is
+        rewritten; in "diff" mode series whose content hash is unchanged are skipped and
+        only inserted, updated or removed points are written for the others.
+
+        `partial` marks a payload holding only the latest periods (INE `nult`): points are
+        merged by period (or timestamp) into the stored series and nothing is deleted.
+        """
         if not data:
             return {"records_inserted": 0}
         
-        await self.initialize_tables()
-        conn = await self.get_connection()
+        async def single_chunk():
+            yield data
         
-        try:
-            total_records = 0
-            
-            async with conn.transaction():
-                for item in data:
-                    cod = item.get('COD')
-                    if not cod:
-                        continue
-                    
-                    # Upsert metadata
-                    metadata_id = await conn.fetchval("""
-                        INSERT INTO ine_metadata (dataset_external_id, code, name, unit_id, scale_id, updated_at)
-                        VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP)
-                        ON CONFLICT (dataset_external_id, code) 
-                        DO UPDATE SET name = EXCLUDED.name, unit_id = EXCLUDED.unit_id, 
-                                     scale_id = EXCLUDED.scale_id, updated_at = CURRENT_TIMESTAMP
-                        RETURNING id
-                    """, 
-                    dataset_external_id, cod, item.get('Nombre'), 
-                    str(item.get('FK_Unidad', '')), str(item.get('FK_Escala', ''))
-                    )
-                    
-                    # Clear existing data points
-                    await conn.execute("DELETE FROM ine_data_points WHERE metadata_id = $1", metadata_id)
-                    
-                    # Insert new data points
-                    data_array = item.get('Data', [])
-                    if data_array:
-                        batch_data = [
-                            (metadata_id, index, dp.get('Valor'), dp.get('Secreto', False),
-                             dp.get('FK_Periodo'), dp.get('Anyo'), dp.get('FK_TipoDato'), dp.get('Fecha'))
-                            for index, dp in enumerate(data_array)
-                        ]
-                        
-                        await conn.executemany("""
-                            INSERT INTO ine_data_points 
-                            (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                        """, batch_data)
+        return await self.save_dataset_chunks(dataset_external_id, single_chunk(), mode, partial)
+    
+    async def save_dataset_chunks(self, dataset_external_id: str, chunks: AsyncIterator[Union[List[Union[Dict[str, Any], SeriesColumns]], PreparedChunk]], mode: Optional[str] = None, partial: bool = False):
+        """Save a dataset arriving as successive lists of series, in a single transaction.
+
+        Chunks may come already prepared (see payload_prep); plain lists of series (decoded,
+        or packed into SeriesColumns) are packed and hashed in the CPU executor, not on the
+        event loop.
+        """
+        mode = "diff" if partial else (mode or settings.INGEST_MODE)
+        
+        await self.ensure_schema()
+        
+        async with self.acquire() as conn:
+            try:
+                totals = {key: 0 for key in SAVE_COUNTERS}
+                async with conn.transaction():
+                    # Writers of the same dataset (e.g. a worker whose lease expired mid-write
+                    # and its successor) queue up here instead of interleaving
+                    await conn.execute("SELECT pg_advisory_xact_lock($1, hashtext($2))", DATASET_WRITE_LOCK, dataset_external_id)
+                    async for chunk in chunks:
+                        if not isinstance(chunk, PreparedChunk):
+                            points = sum(point_count(item) for item in chunk)
+                            chunk = await run_cpu(prepare_series, chunk, partial, size=points)
+                        if not chunk.codes:
+                            continue
                         
-                        total_records += len(batch_data)
+                        if mode == "diff":
+                            result = await self._apply_diff(conn, dataset_external_id, chunk, partial)
+                        else:
+                            result = await self._apply_replace(conn, dataset_external_id, chunk)
+                        for key, value in result.items():
+                            totals[key] += value
                 
-                logger.info(f"Saved {total_records} data points for dataset {dataset_external_id}")
-                return {"records_inserted": total_records, "code": dataset_external_id}
+                await response_cache.invalidate(dataset_external_id, conn)
+                if totals['series_named']:
+                    await response_cache.invalidate(SEARCH_NAMESPACE, conn)
+                logger.info(
+                    f"Saved dataset {dataset_external_id} ({mode}): {totals['records_inserted']} inserted, "
+                    f"{totals['records_updated']} updated, {totals['records_deleted']} deleted, "
+                    f"{totals['series_unchanged']} series unchanged"
+                )
+                return {**totals, "code": dataset_external_id, "mode": mode}
             
-        except Exception as e:
-            logger.error(f"Error saving data for dataset {dataset_external_id}: {e}")
-            raise
-        finally:
-            await conn.close()
+            except Exception as e:
+                logger.error(f"Error saving data for dataset {dataset_external_id}: {e}")
+                raise
+    
+    async def _upsert_metadata(self, conn, dataset_external_id: str, chunk: PreparedChunk, positions: Sequence[int], clear_hashes: bool = False) -> Tuple[Dict[str, int], int]:
+        """Upsert ine_metadata rows for the series at `positions` in one statement.
+
+        Returns code -> id and how many of the series are new or renamed (what the search
+        index holds).
+        """
+        rows = await conn.fetch("""
+            WITH previous AS (
+                SELECT code, name FROM ine_metadata WHERE dataset_external_id = $1 AND code = ANY($2::text[])
+            ), upserted AS (
+                INSERT INTO ine_metadata (dataset_external_id, code, name, unit_id, scale_id, content_hash, updated_at)
+                SELECT $1, s.code, s.name, s.unit_id, s.scale_id, s.content_hash, CURRENT_TIMESTAMP
+                FROM unnest($2::text[], $3::text[], $4::int[], $5::int[], $6::text[])
+                    AS s(code, name, unit_id, scale_id, content_hash)
+                ON CONFLICT (dataset_external_id, code) 
+                DO UPDATE SET name = EXCLUDED.name, unit_id = EXCLUDED.unit_id, 
+                             scale_id = EXCLUDED.scale_id, content_hash = EXCLUDED.content_hash,
+                             updated_at = CURRENT_TIMESTAMP
+                RETURNING id, code, name
+            )
+            SELECT u.id, u.code, p.code IS NULL OR p.name IS DISTINCT FROM u.name AS named
+            FROM upserted u LEFT JOIN previous p ON p.code = u.code
+        """,
+        dataset_external_id,
+        [chunk.codes[i] for i in positions],
+        [chunk.names[i] for i in positions],
+        [chunk.unit_ids[i] for i in positions],
+        [chunk.scale_ids[i] for i in positions],
+        [None if clear_hashes else chunk.hashes[i] for i in positions]
+        )
+        return {row['code']: row['id'] for row in rows}, sum(row['named'] for row in rows)
+    
+    async def _apply_replace(self, conn, dataset_external_id: str, chunk: PreparedChunk) -> Dict[str, Any]:
+        """Rewrite every data point of every series in the payload"""
+        positions = range(len(chunk.codes))
+        metadata_ids, named = await self._upsert_metadata(conn, dataset_external_id, chunk, positions)
+        
+        status = await conn.execute(
+            "DELETE FROM ine_data_points WHERE metadata_id = ANY($1::int[])",
+            list(metadata_ids.values())
+        )
+        
+        total_records = await self._copy_to_staging(conn, chunk, positions, metadata_ids)
+        
+        # Argument-less statements go through the simple query protocol, so no
+        # prepared statement ends up cached against the per-transaction temp table
+        await conn.execute("""
+            INSERT INTO ine_data_points 
+            (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+            SELECT metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms
+            FROM ine_data_points_staging
+            ORDER BY metadata_id, period_index
+        """)
+        await self._refresh_series_store(conn, list(metadata_ids.values()))
+        
+        return {
+            "records_inserted": total_records,
+            "records_deleted": _affected_rows(status),
+            "series_changed": len(chunk.codes),
+            "series_named": named,
+        }
+    
+    async def _apply_diff(self, conn, dataset_external_id: str, chunk: PreparedChunk, partial: bool = False) -> Dict[str, Any]:
+        """Write only the data points that differ from what is stored"""
+        codes = chunk.codes
+        existing = {
+            row['code']: row
+            for row in await conn.fetch("""
+                SELECT id, code, name, unit_id, scale_id, content_hash
+                FROM ine_metadata
+                WHERE dataset_external_id = $1 AND code = ANY($2::text[])
+            """, dataset_external_id, codes)
+        }
+        
+        if partial:
+            # The hash of a partial payload says nothing about the full series: it is cleared
+            # so the next full download is compared point by point
+            changed = list(range(len(codes)))
+        else:
+            changed = [
+                i for i, cod in enumerate(codes)
+                if cod not in existing or existing[cod]['content_hash'] != chunk.hashes[i]
+            ]
+        changed_set = set(changed)
+        metadata_changed = [
+            i for i, cod in enumerate(codes)
+            if i in changed_set
+            or existing[cod]['name'] != chunk.names[i]
+            or existing[cod]['unit_id'] != chunk.unit_ids[i]
+            or existing[cod]['scale_id'] != chunk.scale_ids[i]
+        ]
+        
+        result = {
+            "records_inserted": 0,
+            "records_updated": 0,
+            "records_deleted": 0,
+            "records_unchanged": sum(count for i, count in enumerate(chunk.point_counts) if i not in changed_set),
+            "series_changed": len(changed),
+            "series_unchanged": len(codes) - len(changed),
+        }
+        metadata_ids = {cod: row['id'] for cod, row in existing.items()}
+        if metadata_changed:
+            upserted, result["series_named"] = await self._upsert_metadata(conn, dataset_external_id, chunk, metadata_changed, clear_hashes=partial)
+            metadata_ids.update(upserted)
+        if not changed:
+            return result
+        
+        changed_ids = [metadata_ids[codes[i]] for i in changed]
+        staged = await self._copy_to_staging(conn, chunk, changed, metadata_ids)
+        if partial:
+            result["records_skipped"] = await self._align_partial_staging(conn)
+            staged -= result["records_skipped"]
+        
+        updated = await conn.execute("""
+            UPDATE ine_data_points d
+            SET value = s.value, is_secret = s.is_secret, period_id = s.period_id, year = s.year,
+                data_type_id = s.data_type_id, timestamp_ms = s.timestamp_ms
+            FROM ine_data_points_staging s
+            WHERE d.metadata_id = s.metadata_id AND d.period_index = s.period_index
+            AND (d.value, d.is_secret, d.period_id, d.year, d.data_type_id, d.timestamp_ms)
+                IS DISTINCT FROM (s.value, s.is_secret, s.period_id, s.year, s.data_type_id, s.timestamp_ms)
+        """)
+        inserted = await conn.execute("""
+            INSERT INTO ine_data_points 
+            (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+            SELECT s.metadata_id, s.period_index, s.value, s.is_secret, s.period_id, s.year, s.data_type_id, s.timestamp_ms
+            FROM ine_data_points_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM ine_data_points d
+                WHERE d.metadata_id = s.metadata_id AND d.period_index = s.period_index
+            )
+            ORDER BY s.metadata_id, s.period_index
+        """)
+        if partial:
+            await self._refresh_series_store(conn, changed_ids)
+            result["records_inserted"] = _affected_rows(inserted)
+            result["records_updated"] = _affected_rows(updated)
+            result["records_unchanged"] += staged - result["records_inserted"] - result["records_updated"]
+            return result
+        
+        deleted = await conn.execute("""
+            DELETE FROM ine_data_points d
+            WHERE d.metadata_id IN (SELECT DISTINCT metadata_id FROM ine_data_points_staging)
+            AND NOT EXISTS (
+                SELECT 1 FROM ine_data_points_staging s
+                WHERE s.metadata_id = d.metadata_id AND s.period_index = d.period_index
+            )
+        """)
+        
+        # Changed series that no longer carry any points
+        emptied = [metadata_ids[codes[i]] for i in changed if not chunk.point_counts[i]]
+        if emptied:
+            emptied_status = await conn.execute(
+                "DELETE FROM ine_data_points WHERE metadata_id = ANY($1::int[])", emptied
+            )
+            deleted_count = _affected_rows(deleted) + _affected_rows(emptied_status)
+        else:
+            deleted_count = _affected_rows(deleted)
+        
+        await self._refresh_series_store(conn, changed_ids)
+        result["records_inserted"] = _affected_rows(inserted)
+        result["records_updated"] = _affected_rows(updated)
+        result["records_deleted"] = deleted_count
+        result["records_unchanged"] += staged - result["records_inserted"] - result["records_updated"]
+        return result
+    
+    async def _refresh_series_store(self, conn, metadata_ids: List[int]):
+        """Rebuild the precomputed JSON of the given series from ine_data_points"""
+        if metadata_ids:
+            await conn.execute(SERIES_STORE_UPSERT + "WHERE m.id = ANY($1::int[]) GROUP BY m.id" + SERIES_STORE_CONFLICT, metadata_ids)
+    
+    async def rebuild_series_store(self, dataset_code: Optional[str] = None, missing_only: bool = True) -> int:
+        """Backfill ine_series_store for one dataset or all of them; returns the number of series written"""
+        conditions = []
+        args = []
+        if dataset_code:
+            args.append(dataset_code)
+            conditions.append("m.dataset_external_id = $1")
+        if missing_only:
+            conditions.append("NOT EXISTS (SELECT 1 FROM ine_series_store s WHERE s.metadata_id = m.id)")
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        
+        async with self.acquire() as conn:
+            status = await conn.execute(SERIES_STORE_UPSERT + where + "GROUP BY m.id" + SERIES_STORE_CONFLICT, *args)
+            if dataset_code:
+                await response_cache.invalidate(dataset_code, conn)
+        return _affected_rows(status)
+    
+    async def _align_partial_staging(self, conn) -> int:
+        """Give staged points of a partial payload their stored period_index; returns the points dropped.
+
+        Staged indexes are negative placeholders. A point takes the index of the stored point
+        of the same year and period, or of the same timestamp when it has no period; points
+        with neither can't be matched and are dropped. New points are appended after the
+        series' last index, unless one sorts before a stored point: that series is then
+        renumbered in chronological order.
+        """
+        await conn.execute("""
+            UPDATE ine_data_points_staging s
+            SET period_index = d.period_index
+            FROM ine_data_points d
+            WHERE d.metadata_id = s.metadata_id AND d.year = s.year AND d.period_id = s.period_id
+        """)
+        await conn.execute("""
+            UPDATE ine_data_points_staging s
+            SET period_index = d.period_index
+            FROM ine_data_points d
+            WHERE s.period_index < 0 AND (s.year IS NULL OR s.period_id IS NULL)
+            AND d.metadata_id = s.metadata_id AND d.timestamp_ms = s.timestamp_ms
+        """)
+        dropped = _affected_rows(await conn.execute("""
+            DELETE FROM ine_data_points_staging
+            WHERE period_index < 0 AND timestamp_ms IS NULL AND (year IS NULL OR period_id IS NULL)
+        """))
+        if dropped:
+            logger.warning(f"Skipped {dropped} points of a partial payload without a timestamp or period")
+        
+        await conn.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS ine_partial_reindex (
+                metadata_id INTEGER,
+                old_index INTEGER,
+                new_index INTEGER
+            ) ON COMMIT DROP;
+            TRUNCATE ine_partial_reindex;
+            INSERT INTO ine_partial_reindex
+            WITH late AS (
+                SELECT DISTINCT st.metadata_id
+                FROM ine_data_points_staging st
+                WHERE st.period_index < 0 AND EXISTS (
+                    SELECT 1 FROM ine_data_points d
+                    WHERE d.metadata_id = st.metadata_id AND ({PARTIAL_ORDER.format("d")}) > ({PARTIAL_ORDER.format("st")})
+                )
+            ), merged AS (
+                SELECT d.metadata_id, d.period_index, d.timestamp_ms, d.year, d.period_id
+                FROM ine_data_points d JOIN late USING (metadata_id)
+                UNION ALL
+                SELECT st.metadata_id, st.period_index, st.timestamp_ms, st.year, st.period_id
+                FROM ine_data_points_staging st JOIN late USING (metadata_id)
+                WHERE st.period_index < 0
+            )
+            SELECT
+                m.metadata_id, m.period_index,
+                ROW_NUMBER() OVER (
+                    PARTITION BY m.metadata_id
+                    ORDER BY {PARTIAL_ORDER.format("m")}, m.period_index < 0, ABS(m.period_index)
+                ) - 1
+            FROM merged m;
+        """)
+        # Stored points move through negative indexes so the primary key holds at every row
+        await conn.execute("""
+            UPDATE ine_data_points d
+            SET period_index = -1 - r.new_index
+            FROM ine_partial_reindex r
+            WHERE d.metadata_id = r.metadata_id AND d.period_index = r.old_index
+            AND r.old_index >= 0 AND r.old_index <> r.new_index;
+            UPDATE ine_data_points
+            SET period_index = -1 - period_index
+            WHERE metadata_id IN (SELECT metadata_id FROM ine_partial_reindex) AND period_index < 0;
+            UPDATE ine_data_points_staging s
+            SET period_index = r.new_index
+            FROM ine_partial_reindex r
+            WHERE s.metadata_id = r.metadata_id AND s.period_index = r.old_index;
+        """)
+        
+        await conn.execute(f"""
+            UPDATE ine_data_points_staging s
+            SET period_index = n.new_index
+            FROM (
+                SELECT
+                    st.ctid AS row_ref,
+                    COALESCE(mx.max_index, -1)
+                        + ROW_NUMBER() OVER (PARTITION BY st.metadata_id ORDER BY {PARTIAL_ORDER.format("st")}, st.period_index DESC) AS new_index
+                FROM ine_data_points_staging st
+                LEFT JOIN (
+                    SELECT metadata_id, MAX(period_index) AS max_index
+                    FROM ine_data_points
+                    WHERE metadata_id IN (SELECT DISTINCT metadata_id FROM ine_data_points_staging)
+                    GROUP BY metadata_id
+                ) mx ON mx.metadata_id = st.metadata_id
+                WHERE st.period_index < 0
+            ) n
+            WHERE s.ctid = n.row_ref
+        """)
+        return dropped
+    
+    async def _copy_to_staging(self, conn, chunk: PreparedChunk, positions: Sequence[int], metadata_ids: Dict[str, int]) -> int:
+        """COPY the data points of the series at `positions` into a transaction-scoped staging table"""
+        await conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS ine_data_points_staging (
+                metadata_id INTEGER,
+                period_index INTEGER,
+                value DOUBLE PRECISION,
+                is_secret BOOLEAN,
+                period_id INTEGER,
+                year INTEGER,
+                data_type_id INTEGER,
+                timestamp_ms BIGINT
+            ) ON COMMIT DROP;
+            TRUNCATE ine_data_points_staging;
+        """)
+        
+        positions = [i for i in positions if chunk.point_counts[i]]
+        points = sum(chunk.point_counts[i] for i in positions)
+        if not points:
+            return 0
+        data = await run_local(chunk.copy_data_for, positions, [metadata_ids[chunk.codes[i]] for i in positions], size=points)
+        await conn.copy_to_table(
+            'ine_data_points_staging',
+            # A memoryview: asyncpg would take bytes for a file path
+            source=memoryview(data),
+            columns=STAGING_COLUMNS,
+            format='binary'
+        )
+        return points
+    
+    async def update_dataset_fetch_state(self, dataset_id: int, etag: Optional[str], last_modified: Optional[str], body_hash: Optional[str], full: bool = False):
+        """Remember the validators of the last INE download for conditional requests.
+
+        `full` marks a download of the whole table (not ?nult), which resets the age that
+        INE_FULL_REFRESH_MAX_AGE is measured from.
+        """
+        async with self.acquire() as conn:
+            await conn.execute("""
+                UPDATE ine_datasets
+                SET fetch_etag = $1, fetch_last_modified = $2, fetch_body_hash = $3,
+                    fetch_full_at = CASE WHEN $5 THEN CURRENT_TIMESTAMP ELSE fetch_full_at END
+                WHERE id = $4
+            """, etag, last_modified, body_hash, dataset_id, full)
     
     async def update_dataset_last_collected(self, dataset_id: int):
         """Update last collection timestamp for a dataset"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             timestamp = int(datetime.now().timestamp() * 1000)
             await conn.execute("UPDATE ine_datasets SET last_modified = $1 WHERE id = $2", timestamp, dataset_id)
-        finally:
-            await conn.close()
-            
-    async def search_ine_datasets(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Search INE datasets by name or external_id"""
-        conn = await self.get_connection()
-        try:
-            sql = """
-            SELECT * FROM ine_datasets 
-            WHERE (name ILIKE $1 OR external_id ILIKE $1) 
-            AND active = true
-            ORDER BY name
-            LIMIT $2
-            """
-            rows = await conn.fetch(sql, f"%{query}%", limit)
-            return [dict(row) for row in rows]
-        finally:
-            await conn.close()
+            await response_cache.invalidate(CATALOGUE_NAMESPACE, conn)
+    
+    async def create_collection_job(self, job_id: str, job_type: str, runner: str) -> Tuple[Dict[str, Any], bool]:
+        """Insert a queued job, or return the job of this type that is already queued/running (created=False).
 
-    async def get_dataset_raw_data(self, dataset_code: str) -> List[Dict[str, Any]]:
-        """Get raw data for a dataset from ine_metadata and ine_data_points tables"""
-        conn = await self.get_connection()
-        try:
-            rows = await conn.fetch("""
-                SELECT 
-                    m.code,
-                    m.name,
-                    m.unit_id,
-                    m.scale_id,
-                    json_agg(
-                        json_build_object(
-                            'value', ROUND(dp.value,2),
-                            'is_secret', dp.is_secret,
-                            'period_id', dp.period_id,
-                            'year', dp.year,
-                            'data_type_id', dp.data_type_id,
-                            'timestamp_ms', dp.timestamp_ms
-                        ) ORDER BY dp.period_index
-                    ) as data_points
-                FROM ine_metadata m
-                LEFT JOIN ine_data_points dp ON m.id = dp.metadata_id
-                WHERE m.dataset_external_id = $1
-                GROUP BY m.id, m.code, m.name, m.unit_id, m.scale_id
-                ORDER BY m.code
-            """, dataset_code)
+        Active jobs that have not reported progress for JOB_STALE_AFTER seconds (their process
+        died) are failed first so they no longer block new runs.
+        """
+        async with self.acquire() as conn:
+            await conn.execute("""
+                UPDATE collection_jobs
+                SET status = 'failed', error = 'No progress reported, job abandoned',
+                    finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE job_type = $1 AND status IN ('queued', 'running')
+                AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => $2)
+            """, job_type, float(settings.JOB_STALE_AFTER))
             
-            result = []
-            for row in rows:
-                data_points = row['data_points']
+            while True:
+                row = await conn.fetchrow("""
+                    INSERT INTO collection_jobs (id, job_type, runner)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (job_type) WHERE status IN ('queued', 'running') DO NOTHING
+                    RETURNING *
+                """, job_id, job_type, runner)
+                if row is not None:
+                    return _job_to_dict(row), True
                 
-                if not data_points or data_points == [None]:
-                    parsed_data_points = []
-                else:
-                    try:
-                        if isinstance(data_points, str):
-                            parsed_data_points = json.loads(data_points)
-                        else:
-                            parsed_data_points = data_points
-                    except (json.JSONDecodeError, TypeError):
-                        parsed_data_points = []
+                row = await conn.fetchrow("""
+                    SELECT * FROM collection_jobs WHERE job_type = $1 AND status IN ('queued', 'running')
+                """, job_type)
+                # The active job may have finished between the two statements; try again
+                if row is not None:
+                    return _job_to_dict(row), False
+    
+    async def start_collection_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Move a queued job to running; None when it was cancelled or picked up already"""
+        async with self.acquire() as conn:
+            row = await conn.fetchrow("""
+                UPDATE collection_jobs
+                SET status = 'running', started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1 AND status = 'queued' AND NOT cancel_requested
+                RETURNING *
+            """, job_id)
+            return _job_to_dict(row) if row else None
+    
+    async def touch_collection_job(self, job_id: str):
+        """Heartbeat of a running job, so a long dataset doesn't make it look abandoned"""
+        async with self.acquire() as conn:
+            await conn.execute(
+                "UPDATE collection_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = $1 AND status = 'running'", job_id
+            )
+    
+    async def set_collection_job_total(self, job_id: str, total_datasets: int):
+        """Record how many datasets the job will process"""
+        async with self.acquire() as conn:
+            await conn.execute("""
+                UPDATE collection_jobs SET total_datasets = $2, updated_at = CURRENT_TIMESTAMP WHERE id = $1
+            """, job_id, total_datasets)
+    
+    async def record_collection_job_progress(self, job_id: str, dataset_external_id: str, result: Dict[str, Any]) -> bool:
+        """Store the outcome of one dataset; returns whether cancellation has been requested"""
+        entry = {key: result[key] for key in ('status', 'record_count', 'error') if result.get(key) is not None}
+        async with self.acquire() as conn:
+            return bool(await conn.fetchval("""
+                UPDATE collection_jobs
+                SET progress = progress || jsonb_build_object($2::text, $3::jsonb),
+                    completed_datasets = completed_datasets + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                RETURNING cancel_requested
+            """, job_id, dataset_external_id, json.dumps(entry, default=str)))
+    
+    async def finish_collection_job(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Store the final status of a job"""
+        async with self.acquire() as conn:
+            await conn.execute("""
+                UPDATE collection_jobs
+                SET status = $2, result = $3::jsonb, error = $4,
+                    finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+            """, job_id, status, json.dumps(result, default=str) if result is not None else None, error)
+    
+    async def cancel_collection_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Flag an active job for cancellation; a job that has not started yet is cancelled at once.
+
+        Returns None when the job does not exist or has already finished.
+        """
+        async with self.acquire() as conn:
+            row = await conn.fetchrow("""
+                UPDATE collection_jobs
+                SET cancel_requested = TRUE,
+                    status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                    finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1 AND status IN ('queued', 'running')
+                RETURNING *
+            """, job_id)
+            return _job_to_dict(row) if row else None
+    
+    async def create_sweep_items(self, job_id: str, datasets: List[Dict[str, Any]]):
+        """Register the datasets of a sharded sweep as pending work items"""
+        async with self.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO collection_sweep_items (job_id, dataset_id, position)
+                SELECT $1, dataset_id, position
+                FROM unnest($2::int[]) WITH ORDINALITY AS t(dataset_id, position)
+                ON CONFLICT (job_id, dataset_id) DO NOTHING
+            """, job_id, [dataset['id'] for dataset in datasets])
+    
+    async def claim_sweep_item(self, job_id: str, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """Lease the next pending (or expired) dataset of a sweep; None when nothing is claimable.
+
+        SKIP LOCKED lets concurrent workers claim different rows without waiting on each
+        other. Nothing is handed out once the job has been cancelled.
+        """
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                # A dataset whose lease keeps expiring is taking its workers down with it
+                await conn.execute("""
+                    UPDATE collection_sweep_items
+                    SET status = 'failed', lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP,
+                        result = jsonb_build_object('dataset_id', dataset_id, 'status', 'error', 'error', 'Lease expired ' || attempts || ' times')
+                    WHERE job_id = $1 AND status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP AND attempts >= $2
+                """, job_id, max_attempts)
                 
-                data_item = {
-                    'code': row['code'],
-                    'name': row['name'],
-                    'unit_id': row['unit_id'],
-                    'scale_id': row['scale_id'],
-                    'data_points': parsed_data_points  
+                dataset_id = await conn.fetchval("""
+                    WITH candidate AS (
+                        SELECT i.job_id, i.dataset_id
+                        FROM collection_sweep_items i
+                        JOIN collection_jobs j ON j.id = i.job_id
+                        WHERE i.job_id = $1
+                        AND j.status = 'running' AND NOT j.cancel_requested
+                        AND (i.status = 'pending' OR (i.status = 'leased' AND i.lease_expires_at < CURRENT_TIMESTAMP))
+                        ORDER BY i.position
+                        LIMIT 1
+                        FOR UPDATE OF i SKIP LOCKED
+                    )
+                    UPDATE collection_sweep_items i
+                    SET status = 'leased', lease_owner = $2, attempts = i.attempts + 1, updated_at = CURRENT_TIMESTAMP,
+                        lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => $3)
+                    FROM candidate c
+                    WHERE i.job_id = c.job_id AND i.dataset_id = c.dataset_id
+                    RETURNING i.dataset_id
+                """, job_id, worker_id, float(lease_seconds))
+                if dataset_id is None:
+                    return None
+                
+                row = await conn.fetchrow("SELECT * FROM ine_datasets WHERE id = $1", dataset_id)
+                return dict(row) if row else None
+    
+    async def renew_sweep_leases(self, job_id: str, worker_id: str, dataset_ids: List[int], lease_seconds: float) -> List[int]:
+        """Extend the leases a worker still holds; returns the ids it still owns"""
+        async with self.acquire() as conn:
+            rows = await conn.fetch("""
+                UPDATE collection_sweep_items
+                SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => $4), updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = $1 AND lease_owner = $2 AND status = 'leased' AND dataset_id = ANY($3::int[])
+                RETURNING dataset_id
+            """, job_id, worker_id, dataset_ids, float(lease_seconds))
+            # Long datasets must not make the job look abandoned
+            await conn.execute("UPDATE collection_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = $1", job_id)
+            return [row['dataset_id'] for row in rows]
+    
+    async def complete_sweep_item(self, job_id: str, dataset_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store the result of a leased dataset; False when the lease had already been lost"""
+        async with self.acquire() as conn:
+            status = await conn.execute("""
+                UPDATE collection_sweep_items
+                SET status = 'done', result = $4::jsonb, lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = $1 AND dataset_id = $2 AND lease_owner = $3 AND status = 'leased'
+            """, job_id, dataset_id, worker_id, json.dumps(result, default=str))
+            return _affected_rows(status) == 1
+    
+    async def get_sweep_status(self, job_id: str) -> Dict[str, Any]:
+        """Claimable and actively leased item counts of a sweep, and whether it was cancelled"""
+        async with self.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT
+                    COUNT(*) FILTER (WHERE i.status = 'pending' OR (i.status = 'leased' AND i.lease_expires_at < CURRENT_TIMESTAMP)) AS claimable,
+                    COUNT(*) FILTER (WHERE i.status = 'leased' AND i.lease_expires_at >= CURRENT_TIMESTAMP) AS leased,
+                    bool_or(j.cancel_requested) AS cancel_requested
+                FROM collection_jobs j
+                LEFT JOIN collection_sweep_items i ON i.job_id = j.id
+                WHERE j.id = $1
+            """, job_id)
+            return dict(row)
+    
+    async def get_sweep_results(self, job_id: str) -> List[Dict[str, Any]]:
+        """Per-dataset results of a sweep in dataset order; unfinished items report 'cancelled'"""
+        async with self.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT i.dataset_id, i.status, i.result, d.name, d.external_id
+                FROM collection_sweep_items i
+                LEFT JOIN ine_datasets d ON d.id = i.dataset_id
+                WHERE i.job_id = $1
+                ORDER BY i.position
+            """, job_id)
+            return [
+                json.loads(row['result']) if row['result'] is not None else {
+                    "dataset_id": row['dataset_id'],
+                    "dataset_name": row['name'],
+                    "external_id": row['external_id'],
+                    "status": "cancelled"
                 }
-                result.append(data_item)
+                for row in rows
+            ]
+    
+    async def get_collection_checkpoint(self, name: str, max_age: float) -> Set[int]:
+        """Ids of the datasets a sweep finished during the last `max_age` seconds; older entries are dropped"""
+        async with self.acquire() as conn:
+            await conn.execute("""
+                DELETE FROM collection_checkpoints
+                WHERE name = $1 AND finished_at < CURRENT_TIMESTAMP - make_interval(secs => $2)
+            """, name, float(max_age))
+            rows = await conn.fetch("SELECT dataset_id FROM collection_checkpoints WHERE name = $1", name)
+            return {row['dataset_id'] for row in rows}
+    
+    async def record_collection_checkpoint(self, name: str, dataset_id: int, status: str):
+        """Mark a dataset as finished by the current sweep"""
+        async with self.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO collection_checkpoints (name, dataset_id, status)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (name, dataset_id) DO UPDATE
+                SET status = EXCLUDED.status, finished_at = CURRENT_TIMESTAMP
+            """, name, dataset_id, status)
+    
+    async def clear_collection_checkpoint(self, name: str):
+        """Forget a completed sweep, so the next one starts from the first dataset"""
+        async with self.acquire() as conn:
+            await conn.execute("DELETE FROM collection_checkpoints WHERE name = $1", name)
+    
+    async def get_collection_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job with its per-dataset progress"""
+        async with self.acquire() as conn:
+            row = await conn.fetchrow("SELECT * FROM collection_jobs WHERE id = $1", job_id)
+            return _job_to_dict(row) if row else None
             
-            return result
-        finally:
-            await conn.close()
+    async def get_search_datasets(self) -> List[Tuple]:
+        """(external_id, name, id, dataset_name) of the active datasets, for the search index"""
+        async with self.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT d.external_id, d.name, d.id::text, ds.name
+                FROM ine_datasets d
+                LEFT JOIN data_sources ds ON CAST(d.data_source_id AS INTEGER) = ds.id
+                WHERE d.active = true
+            """)
+            return [tuple(row) for row in rows]
+
+    async def get_search_series(self) -> List[Tuple]:
+        """(code, name, dataset_external_id) of every stored series, for the search index"""
+        async with self.acquire() as conn:
+            rows = await conn.fetch("SELECT code, name, dataset_external_id FROM ine_metadata")
+            return [tuple(row) for row in rows]
+
+    async def get_dataset_raw_data(self, dataset_code: str, filters: Optional[DataFilters] = None) -> List[Dict[str, Any]]:
+        """Get raw data for a dataset from ine_metadata and ine_data_points tables"""
+        items, _ = await self.get_dataset_raw_page(dataset_code, filters)
+        return items
 
-    async def get_dataset_processed_data(self, dataset_code: str) -> List[Dict[str, Any]]:
+    async def get_dataset_processed_data(self, dataset_code: str, filters: Optional[DataFilters] = None) -> List[Dict[str, Any]]:
         """Get processed data for a dataset - simplified format"""
-        conn = await self.get_connection()
-        try:
-            rows = await conn.fetch("""
-                SELECT 
-                    m.code,
-                    m.name as indicator_name,
-                    u.name as unit_description,
-                    e.name as scale_description,
-                    f.name period,
-                    dp.year,
-                    ROUND(dp.value,2) as value,
-                    CASE 
-                        WHEN dp.is_secret = true THEN 'Confidential — not publicly shown'
-                        ELSE 'Public data — freely available'
-                    END as data_confidentiality
-                FROM ine_data_points dp
-                INNER JOIN ine_metadata m ON dp.metadata_id = m.id
-                LEFT JOIN ine_def_frequencies f ON CAST (dp.period_id AS INTEGER) = f.ref_id
-                LEFT JOIN ine_def_units u ON CAST(m.unit_id AS INTEGER) = u.ref_id
-                LEFT JOIN ine_def_scales e ON CAST(m.scale_id AS INTEGER) = e.ref_id
+        items, _ = await self.get_dataset_processed_page(dataset_code, filters)
+        return items
+
+    async def get_dataset_raw_page(self, dataset_code: str, filters: Optional[DataFilters] = None, decode: bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple]]:
+        """One page of raw series and the keyset position of the next page (None on the last one).
+
+        With decode=False data_points stays the JSON text read from the database (RawJSON).
+        """
+        # A raw row is a whole series: decoding it weighs like many processed rows
+        return await self._fetch_page(
+            build_raw_data_query, lambda row: raw_row_to_dict(row, decode), raw_row_key, dataset_code, filters,
+            row_cost=100 if decode else 0
+        )
+
+    async def get_dataset_processed_page(self, dataset_code: str, filters: Optional[DataFilters] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple]]:
+        """One page of processed rows and the keyset position of the next page (None on the last one)"""
+        fields = filters.fields if filters else None
+        labels = await self.get_reference_labels()
+        return await self._fetch_page(
+            build_processed_data_query, lambda row: processed_row_to_dict(row, fields, labels), processed_row_key,
+            dataset_code, filters
+        )
+
+    async def get_dataset_series_page(self, dataset_code: str, filters: Optional[DataFilters], resolution: str, points: int = 500) -> Tuple[List[Dict[str, Any]], Optional[Tuple]]:
+        """One page of series reduced for charting, and the keyset position of the next page.
+
+        annual / quarterly average the points per period in SQL (data_points stays the JSON
+        text from the database); lttb downsamples each series to `points` points with NumPy.
+        """
+        if resolution == "lttb":
+            # Imported here: NumPy is only needed for LTTB
+            from app.services.ine.downsampling import downsample_series
+            series, next_key = await self._fetch_page(
+                build_series_points_query, series_points_row_to_tuple, raw_row_key, dataset_code, filters
+            )
+            size = sum(len(item[4]) for item in series)
+            return await run_cpu(downsample_series, series, points, size=size), next_key
+        
+        return await self._fetch_page(
+            lambda code, query_filters: build_series_aggregate_query(code, query_filters, resolution),
+            lambda row: raw_row_to_dict(row, decode=False), raw_row_key, dataset_code, filters, row_cost=0
+        )
+
+    async def _fetch_page(self, build_query, to_dict, row_key, dataset_code: str, filters: Optional[DataFilters], row_cost: int = 1):
+        filters = filters or DataFilters()
+        # Read one row past the page to know whether another page follows
+        query_filters = filters.model_copy(update={"limit": filters.limit + 1}) if filters.limit else filters
+        sql, args = build_query(dataset_code, query_filters)
+        
+        async with self.acquire() as conn:
+            rows = await conn.fetch(sql, *args)
+        
+        next_key = None
+        if filters.limit and len(rows) > filters.limit:
+            rows = rows[:filters.limit]
+            next_key = row_key(rows[-1])
+        # Records can't be pickled, so large pages are converted in a thread
+        items = await run_local(_rows_to_dicts, to_dict, rows, size=len(rows) * row_cost)
+        return items, next_key
+
+    async def iter_dataset_raw_data(self, dataset_code: str, filters: Optional[DataFilters] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream raw series through a server-side cursor.
+
+        data_points is passed through as the JSON text produced by Postgres (RawJSON)
+        rather than being decoded.
+        """
+        sql, args = build_raw_data_query(dataset_code, filters)
+        async for row in self._iter_query(sql, *args):
+            yield raw_row_to_dict(row, decode=False)
+
+    async def iter_dataset_processed_data(self, dataset_code: str, filters: Optional[DataFilters] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream processed rows through a server-side cursor"""
+        sql, args = build_processed_data_query(dataset_code, filters)
+        fields = filters.fields if filters else None
+        labels = await self.get_reference_labels()
+        async for row in self._iter_query(sql, *args):
+            yield processed_row_to_dict(row, fields, labels)
+
+    async def iter_dataset_processed_records(self, dataset_code: str, filters: Optional[DataFilters] = None) -> AsyncIterator[asyncpg.Record]:
+        """Stream the processed query's records as-is: sort key columns included, dimension ids unresolved"""
+        sql, args = build_processed_data_query(dataset_code, filters)
+        async for row in self._iter_query(sql, *args):
+            yield row
+
+    async def _iter_query(self, query: str, *args) -> AsyncIterator[asyncpg.Record]:
+        """Run a query with a server-side cursor, holding one pooled connection while iterating"""
+        async with self.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(query, *args, prefetch=settings.DB_CURSOR_PREFETCH):
+                    yield row
+
+    async def dataset_has_series(self, dataset_code: str) -> bool:
+        """Whether any series is stored for a dataset"""
+        async with self.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM ine_metadata WHERE dataset_external_id = $1)", dataset_code
+            )
+
+    async def get_reference_labels(self) -> Labels:
+        """Unit, scale and frequency labels by id, from the in-memory reference data cache"""
+        return await reference_data.labels(self.acquire)
+
+    async def get_reference_labels_digest(self) -> str:
+        """Changes whenever the unit, scale or frequency labels do"""
+        return await reference_data.digest(self.acquire)
+
+    async def get_dataset_version(self, dataset_code: str) -> Optional[int]:
+        """Changes whenever the dataset's data does (epoch ms); None when no series is stored.
+
+        last_modified is set by collection runs; the latest series update covers writes
+        made outside of them.
+        """
+        async with self.acquire() as conn:
+            return await conn.fetchval("""
+                SELECT GREATEST(
+                    (SELECT MAX(last_modified) FROM ine_datasets WHERE external_id = $1),
+                    (EXTRACT(EPOCH FROM MAX(m.updated_at)) * 1000)::BIGINT
+                )
+                FROM ine_metadata m
                 WHERE m.dataset_external_id = $1
-                ORDER BY m.code, dp.year, dp.period_id;
+                HAVING COUNT(*) > 0
             """, dataset_code)
-            
-            result = []
-            for row in rows:
-                processed_item = {
-                    'code': row['code'],
-                    'indicator_name': row['indicator_name'],
-                    'unit_description': row['unit_description'],
-                    'scale_description': row['scale_description'],
-                    'frequency_name': row['period'],
-                    'year': row['year'],
-                    'value': row['value'],
-                    'data_confidentiality': row['data_confidentiality'],
-                }
-                result.append(processed_item)
-            
-            return result
-            
-            return result
-        finally:
-            await conn.close()
 
     async def get_dataset_metadata(self, dataset_code: str) -> List[Dict[str, Any]]:
         """Get just metadata information for a dataset"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             rows = await conn.fetch("""
                 SELECT 
                     m.code,
                     m.name,
-                    m.unit_id,
-                    m.scale_id,
+                    COALESCE(m.unit_id::text, '') AS unit_id,
+                    COALESCE(m.scale_id::text, '') AS scale_id,
                     m.created_at,
                     m.updated_at,
-                    COUNT(dp.id) as data_points_count
+                    COUNT(dp.metadata_id) as data_points_count
                 FROM ine_metadata m
                 LEFT JOIN ine_data_points dp ON m.id = dp.metadata_id
                 WHERE m.dataset_external_id = $1
@@ -277,7 +1187,7 @@ class DatabaseService:
             """, dataset_code)
             
             return [dict(row) for row in rows]
-        finally:
-            await conn.close()
 
-database_service = DatabaseService()
\ No newline at end of file
+database_service = DatabaseService()
+
+registry.gauge("db_pool_connections", "Pooled database connections by state", ("state",), collect=database_service._pool_gauge)
\ No newline at end of file
@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: indices of the `threshold` points that best keep the
+    shape of the series, and the bucket boundaries they were picked from.
+
+    The first and last points are always kept. Each point in between is the one of its
+    bucket forming the largest triangle with the previously kept point and the mean of the
+    next bucket. bounds[i]:bounds[i + 1] is the slice represented by the i-th kept point.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size), np.arange(size + 1)
+
+    # Interior points split into threshold - 2 buckets of (nearly) equal size
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else size
+        mean_x = x[next_start:next_end].mean()
+        mean_y = y[next_start:next_end].mean()
+        # Twice the triangle areas, for every candidate of the bucket at once
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    bounds = np.concatenate(([0], edges, [size]))
+    return selected, bounds
+
+
+def downsample_points(timestamps: Sequence[int], values: Sequence[float], threshold: int) -> List[Dict[str, Any]]:
+    """LTTB-downsampled points, each with the min/max of the points it stands for"""
+    if not timestamps:
+        return []
+    x = np.asarray(timestamps, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    selected, bounds = lttb_indices(x, y, threshold)
+
+    # Envelope of each kept point's bucket
+    mins = np.minimum.reduceat(y, bounds[:-1])
+    maxs = np.maximum.reduceat(y, bounds[:-1])
+    counts = np.diff(bounds)
+    return [
+        {"timestamp_ms": int(timestamps[i]), "value": float(y[i]), "min": float(low), "max": float(high), "count": int(count)}
+        for i, low, high, count in zip(selected, mins, maxs, counts)
+    ]
+
+
+def downsample_series(series: List[Tuple], threshold: int) -> List[Dict[str, Any]]:
+    """Downsample rows made by series_points_row_to_tuple into the series response items"""
+    return [
+        {
+            'code': code,
+            'name': name,
+            'unit_id': unit_id,
+            'scale_id': scale_id,
+            'data_points': downsample_points(timestamps, values, threshold),
+        }
+        for code, name, unit_id, scale_id, timestamps, values in series
+    ]
@@ -0,0 +1,117 @@
+import codecs
+import json
+from typing import Any, Callable, List, Optional
+
+# Don't retry decoding a partial item until at least this many characters are buffered
+_MIN_ATTEMPT_CHARS = 64 * 1024
+
+
+class JsonArrayStreamParser:
+    """Incremental parser yielding the elements of a top-level JSON array one at a time.
+
+    Bytes are fed as they arrive; each element is decoded with the C scanner as soon as
+    it is complete, so memory stays proportional to the largest element rather than the
+    whole document. A failed attempt on an incomplete element is only retried once the
+    buffer has doubled, which keeps the total work linear.
+
+    A document whose top level is not an array is buffered whole and returned by close();
+    `is_array` tells the two cases apart. `convert`, when given, is applied to each array
+    element as soon as it is decoded, so a compact form can replace the decoded objects
+    before the next element is read.
+    """
+
+    def __init__(self, convert: Optional[Callable[[Any], Any]] = None):
+        self._decoder = json.JSONDecoder()
+        self._convert = convert
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._chunks: List[str] = []
+        self._buffered = 0
+        self._attempt_at = 0
+        self._state = "start"  # start -> value <-> separator -> done
+        self.is_array = True
+
+    def __getstate__(self):
+        # The C scanner can't be pickled; rebuilt on the other side (process pool workers)
+        state = self.__dict__.copy()
+        del state['_decoder']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Add bytes and return the elements completed by them"""
+        text = self._text_decoder.decode(chunk)
+        if text:
+            self._chunks.append(text)
+            self._buffered += len(text)
+        if not self.is_array or self._buffered < self._attempt_at:
+            return []
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Signal the end of input and return the remaining elements"""
+        text = self._text_decoder.decode(b'', final=True)
+        if text:
+            self._chunks.append(text)
+            self._buffered += len(text)
+        if not self.is_array:
+            return [json.loads(''.join(self._chunks))]
+
+        items = self._drain(final=True)
+        if self._state != "done":
+            raise ValueError("Truncated JSON array")
+        return items
+
+    def _drain(self, final: bool) -> List[Any]:
+        buffer = ''.join(self._chunks)
+        pos = 0
+        items = []
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos >= len(buffer) or self._state == "done":
+                break
+
+            char = buffer[pos]
+            if self._state == "start":
+                if char != '[':
+                    self.is_array = False
+                    break
+                self._state = "value"
+                pos += 1
+            elif self._state == "separator":
+                if char == ',':
+                    self._state = "value"
+                elif char == ']':
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Unexpected character {char!r} between array elements")
+                pos += 1
+            elif char == ']':
+                self._state = "done"
+                pos += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    self._attempt_at = max(_MIN_ATTEMPT_CHARS, 2 * (len(buffer) - pos))
+                    break
+                if end == len(buffer) and not final:
+                    # A scalar such as a number may continue in the next chunk
+                    self._attempt_at = len(buffer) - pos + 1
+                    break
+                pos = end
+                items.append(item if self._convert is None else self._convert(item))
+                self._state = "separator"
+                self._attempt_at = 0
+
+        remainder = buffer[pos:]
+        self._chunks = [remainder] if remainder else []
+        self._buffered = len(remainder)
+        return items
+
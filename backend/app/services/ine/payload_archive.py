@@ -0,0 +1,246 @@
+import gzip
+import io
+import json
+import logging
+import mmap
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# codec -> object file suffix
+ARCHIVE_CODECS = {"zstd": ".json.zst", "gzip": ".json.gz", "none": ".json"}
+
+COPY_BLOCK = 1024 * 1024
+
+
+def _zstandard():
+    """The zstandard module, or None when it is not installed"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+class _MappedPayload(io.RawIOBase):
+    """Decompressed, read-only view of an archived payload; the object file is memory-mapped"""
+
+    def __init__(self, path: Path, codec: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if codec == "zstd":
+            zstandard = _zstandard()
+            if zstandard is None:
+                self.close()
+                raise RuntimeError(f"Archived payload {path.name} is zstd-compressed, which requires zstandard (pip install zstandard)")
+            self._reader = zstandard.ZstdDecompressor().stream_reader(self._map)
+        elif codec == "gzip":
+            self._reader = gzip.GzipFile(fileobj=self._map, mode='rb')
+        else:
+            self._reader = self._map
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._reader.read(size)
+
+    def readinto(self, buffer) -> int:
+        data = self._reader.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        for resource in (getattr(self, '_reader', None), getattr(self, '_map', None), self._file):
+            if resource is not None and not getattr(resource, 'closed', False):
+                resource.close()
+        super().close()
+
+
+class PayloadArchive:
+    """Raw INE responses kept under STORAGE_PATH/payloads, compressed and content-addressed.
+
+    Objects are named after the SHA-256 of the uncompressed body (the body_hash the
+    collector already computes), so a payload downloaded twice is stored once. index.jsonl
+    gets a line per archived download: dataset code, hash, sizes, codec, fetch headers and
+    whether it was a partial (?nult) download. Appends of one short line are atomic, so
+    several collector processes can share an archive.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, codec: Optional[str] = None):
+        self._root = Path(root) if root is not None else None
+        self._codec = codec
+        self._index: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._index_size = -1
+        self._warned_zstd = False
+
+    @property
+    def root(self) -> Path:
+        return self._root or Path(settings.STORAGE_PATH) / "payloads"
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.jsonl"
+
+    @property
+    def codec(self) -> str:
+        codec = self._codec or settings.PAYLOAD_ARCHIVE_CODEC
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown PAYLOAD_ARCHIVE_CODEC '{codec}', expected one of {tuple(ARCHIVE_CODECS)}")
+        if codec == "zstd" and _zstandard() is None:
+            if not self._warned_zstd:
+                logger.warning("zstandard is not installed, archiving payloads with gzip instead")
+                self._warned_zstd = True
+            return "gzip"
+        return codec
+
+    def object_path(self, body_hash: str, codec: str) -> Path:
+        return self.root / "objects" / body_hash[:2] / f"{body_hash}{ARCHIVE_CODECS[codec]}"
+
+    def store(self, dataset_code: str, source: Union[BinaryIO, bytes], fetched: Dict[str, Any]) -> Dict[str, Any]:
+        """Archive a payload (a file positioned at its start, or the body) and index it; returns the index entry.
+
+        A file source is left positioned at its start again.
+        """
+        codec = self.codec
+        body_hash = fetched['body_hash']
+        path = self._existing_object(body_hash)
+        if path is None:
+            path = self.object_path(body_hash, codec)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}")
+            try:
+                with open(temp_path, 'wb') as target:
+                    self._compress(source, target, codec)
+                os.replace(temp_path, path)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+            finally:
+                if not isinstance(source, bytes):
+                    source.seek(0)
+
+        entry = {
+            "dataset": dataset_code,
+            "sha256": body_hash,
+            "codec": self._codec_of(path),
+            "bytes": fetched['bytes'],
+            "stored_bytes": path.stat().st_size,
+            "partial": fetched['partial'],
+            "etag": fetched.get('etag'),
+            "last_modified": fetched.get('last_modified'),
+            "archived_at": time.time(),
+        }
+        with open(self.index_path, 'a') as index:
+            index.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        return entry
+
+    def _compress(self, source: Union[BinaryIO, bytes], target: BinaryIO, codec: str):
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        if codec == "zstd":
+            _zstandard().ZstdCompressor(level=settings.PAYLOAD_ARCHIVE_LEVEL or 3).copy_stream(source, target)
+        elif codec == "gzip":
+            with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=settings.PAYLOAD_ARCHIVE_LEVEL or 6, mtime=0) as compressed:
+                for block in iter(lambda: source.read(COPY_BLOCK), b''):
+                    compressed.write(block)
+        else:
+            for block in iter(lambda: source.read(COPY_BLOCK), b''):
+                target.write(block)
+
+    def _existing_object(self, body_hash: str) -> Optional[Path]:
+        for codec in ARCHIVE_CODECS:
+            path = self.object_path(body_hash, codec)
+            if path.exists():
+                return path
+        return None
+
+    def _codec_of(self, path: Path) -> str:
+        return next(codec for codec, suffix in ARCHIVE_CODECS.items() if path.name.endswith(suffix))
+
+    def codes(self):
+        """Codes of the datasets with an archived full payload"""
+        return sorted(self._chains())
+
+    def _chains(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Dataset code -> index entries of its most recent full download and of the partial
+        (?nult) ones archived after it, oldest first.
+
+        Partial downloads only hold the latest periods, so a rebuild starts from the last
+        complete table and merges the partials on top of it. The index is re-read only when
+        it has grown.
+        """
+        try:
+            size = self.index_path.stat().st_size
+        except FileNotFoundError:
+            return {}
+        if self._index is None or size != self._index_size:
+            chains = {}
+            with open(self.index_path) as index:
+                for line in index:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if not entry.get('partial'):
+                        chains[entry['dataset']] = [entry]
+                    elif entry['dataset'] in chains:
+                        chains[entry['dataset']].append(entry)
+            self._index, self._index_size = chains, size
+        return self._index
+
+    def replay_entries(self, dataset_code: str) -> List[Dict[str, Any]]:
+        """Index entries to write, in order, to rebuild a dataset (empty when it has no full payload)"""
+        return list(self._chains().get(dataset_code, ()))
+
+    def open_entry(self, entry: Dict[str, Any]) -> Optional[Tuple[BinaryIO, Dict[str, Any]]]:
+        """(decompressing reader over the memory-mapped object, index entry), or None when the object is gone"""
+        path = self.object_path(entry['sha256'], entry['codec'])
+        if not path.exists():
+            logger.warning(f"Archived payload {path} of dataset {entry['dataset']} is missing")
+            return None
+        if entry['bytes'] == 0:
+            # Empty files can't be mapped
+            return io.BytesIO(b""), entry
+        return _MappedPayload(path, entry['codec']), entry
+
+    def open_payload(self, dataset_code: str) -> Optional[Tuple[BinaryIO, Dict[str, Any]]]:
+        """Reader and index entry of a dataset's latest full payload"""
+        entries = self.replay_entries(dataset_code)
+        return self.open_entry(entries[0]) if entries else None
+
+
+class PayloadDirectory:
+    """Payloads saved as plain <code>.json files (collect --save-payloads), read like archived ones"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    def codes(self):
+        return sorted(path.name[:-len(".json")] for path in self.directory.glob("*.json"))
+
+    def replay_entries(self, dataset_code: str) -> List[Dict[str, Any]]:
+        path = self.directory / f"{dataset_code}.json"
+        if not path.is_file():
+            return []
+        return [{"dataset": dataset_code, "path": str(path), "bytes": path.stat().st_size, "partial": False}]
+
+    def open_entry(self, entry: Dict[str, Any]) -> Optional[Tuple[BinaryIO, Dict[str, Any]]]:
+        if entry['bytes'] == 0:
+            return io.BytesIO(b""), entry
+        return _MappedPayload(Path(entry['path']), "none"), entry
+
+    def open_payload(self, dataset_code: str) -> Optional[Tuple[BinaryIO, Dict[str, Any]]]:
+        entries = self.replay_entries(dataset_code)
+        return self.open_entry(entries[0]) if entries else None
+
+
+payload_archive = PayloadArchive()
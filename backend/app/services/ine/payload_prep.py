@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from app.services.ine.json_stream import JsonArrayStreamParser
+from app.services.ine.series_columns import SeriesColumns, copy_data, series_columns
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedChunk(NamedTuple):
+    """A chunk of series reduced to what the DB writer needs, cheap to pickle across processes.
+
+    Columns are aligned by position; duplicate codes are already collapsed (last one wins).
+    series[i] holds the data points of series i as NumPy columns, which copy_data_for
+    turns into binary COPY data without a Python object per point.
+    """
+    codes: List[str]
+    names: List[Optional[str]]
+    unit_ids: List[Optional[int]]
+    scale_ids: List[Optional[int]]
+    hashes: List[str]
+    point_counts: List[int]
+    series: List[SeriesColumns]
+    partial: bool = False
+
+    def copy_data_for(self, positions: Sequence[int], metadata_ids: Sequence[int]) -> bytes:
+        """Binary COPY data of the points of the series at `positions`, stored under `metadata_ids`"""
+        return copy_data([self.series[i] for i in positions], metadata_ids, self.partial)
+
+
+def extract_series(data: Any) -> Optional[List[Dict[str, Any]]]:
+    """Series list from a decoded DATOS_TABLA document; None for an unexpected shape"""
+    if isinstance(data, list):
+        return data
+    elif isinstance(data, dict):
+        return data.get('Data', data.get('datos', [data]))
+    return None
+
+
+def decode_series(body: bytes) -> Optional[List[SeriesColumns]]:
+    """A whole DATOS_TABLA body decoded and packed into columns; None for an unexpected shape"""
+    series = extract_series(json.loads(body))
+    return None if series is None else [series_columns(item) for item in series]
+
+
+def point_count(item: Union[Dict[str, Any], SeriesColumns]) -> int:
+    """Data points of a series, decoded or packed"""
+    return len(item) if isinstance(item, SeriesColumns) else len(item.get('Data') or [])
+
+
+def prepare_series(items: Iterable[Union[Dict[str, Any], SeriesColumns]], partial: bool = False) -> PreparedChunk:
+    """Pack the series into columns (unless the parser already did) and hash them"""
+    # Last occurrence of a series code wins, as with the former per-series upserts
+    series = {}
+    for item in items:
+        columns = item if isinstance(item, SeriesColumns) else series_columns(item)
+        if columns.code:
+            series[columns.code] = columns
+    chunk = PreparedChunk([], [], [], [], [], [], [], partial)
+    for cod, columns in series.items():
+        chunk.codes.append(cod)
+        chunk.names.append(columns.name)
+        chunk.unit_ids.append(columns.unit_id)
+        chunk.scale_ids.append(columns.scale_id)
+        chunk.hashes.append(columns.content_hash())
+        chunk.point_counts.append(len(columns))
+        chunk.series.append(columns)
+    return chunk
+
+
+def new_parser() -> JsonArrayStreamParser:
+    """Stream parser packing each series into columns as soon as it is decoded"""
+    return JsonArrayStreamParser(convert=series_columns)
+
+
+def parse_and_prepare(parser: JsonArrayStreamParser, data: bytes, final: bool, partial: bool = False) -> Tuple[JsonArrayStreamParser, PreparedChunk]:
+    """Feed a slice of a DATOS_TABLA body to the parser and prepare the completed series.
+
+    The parser (see new_parser) is returned because in a process pool it travels as a copy.
+    """
+    items = parser.feed(data) if data else []
+    if final:
+        remaining = parser.close()
+        if parser.is_array:
+            items += remaining
+        else:
+            series = extract_series(remaining[0])
+            if series is None:
+                logger.warning(f"Unexpected payload type: {type(remaining[0])}")
+            items += series or []
+    return parser, prepare_series(items, partial)
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+import asyncpg
+from app.core.config import settings
+from app.services.cache import LABELS_NAMESPACE, response_cache
+
+logger = logging.getLogger(__name__)
+
+# lookup -> (dimension table, type of the data column holding its ref_id)
+REFERENCE_TABLES = {
+    "units": ("ine_def_units", int),
+    "scales": ("ine_def_scales", int),
+    "frequencies": ("ine_def_frequencies", int),
+}
+
+# Notified by triggers on the dimension tables (see DatabaseService.initialize_tables)
+REFERENCE_CHANNEL = "ine_reference_data"
+
+Labels = Dict[str, Dict[Any, str]]
+
+
+class ReferenceDataCache:
+    """INE dimension tables held in memory as ref_id -> name dicts.
+
+    Loaded on first use and reloaded after REFERENCE_DATA_TTL, or as soon as a NOTIFY on
+    REFERENCE_CHANNEL arrives while the listener runs. Labels are keyed by the type of the
+    column they resolve (all INTEGER), so lookups need no casts. Either way, cached
+    responses that embed labels (LABELS_NAMESPACE) are invalidated when they change.
+    """
+
+    def __init__(self):
+        self._labels: Optional[Labels] = None
+        self._digest = ""
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncpg.Connection] = None
+        self._invalidation: Optional[asyncio.Task] = None
+
+    def _fresh(self) -> bool:
+        return self._labels is not None and time.monotonic() < self._expires_at
+
+    async def labels(self, acquire: Callable) -> Labels:
+        """Current labels, loading them through `acquire` (a pool's connection context) when stale"""
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    async with acquire() as conn:
+                        await self._load(conn)
+        return self._labels
+
+    async def digest(self, acquire: Callable) -> str:
+        """Digest of the current labels: unlike the LABELS_NAMESPACE generation it is the same
+        in every process and across restarts, so it can name files"""
+        await self.labels(acquire)
+        return self._digest
+
+    async def _load(self, conn: asyncpg.Connection):
+        version = self._version
+        labels: Labels = {}
+        for lookup, (table, key_type) in REFERENCE_TABLES.items():
+            try:
+                rows = await conn.fetch(f"SELECT ref_id, name FROM {table}")
+            except asyncpg.UndefinedTableError:
+                logger.warning(f"Reference table {table} does not exist; {lookup} labels will be empty")
+                rows = []
+            labels[lookup] = {key_type(row['ref_id']): row['name'] for row in rows if row['ref_id'] is not None}
+        if self._labels is not None and labels != self._labels:
+            # Changed without a NOTIFY reaching us (listener down): found on a TTL reload
+            await response_cache.invalidate(LABELS_NAMESPACE)
+        self._labels = labels
+        self._digest = hashlib.sha1(json.dumps(labels, sort_keys=True).encode()).hexdigest()[:12]
+        # A change notified while loading may not be in what was read: reload on next use
+        self._expires_at = time.monotonic() + settings.REFERENCE_DATA_TTL if version == self._version else 0.0
+        logger.info(f"Reference data loaded: {', '.join(f'{len(v)} {k}' for k, v in labels.items())}")
+
+    def invalidate(self):
+        """Reload on next use"""
+        self._version += 1
+        self._expires_at = 0.0
+
+    def _on_notify(self, connection, pid, channel, payload):
+        logger.info(f"Reference table {payload} changed, reloading labels")
+        self.invalidate()
+        self._invalidation = asyncio.get_running_loop().create_task(response_cache.invalidate(LABELS_NAMESPACE))
+
+    async def start_listener(self, dsn: str):
+        """Listen for dimension table changes on a dedicated connection; without it only the TTL applies"""
+        if self._listener is not None:
+            return
+        try:
+            self._listener = await asyncpg.connect(dsn)
+            await self._listener.add_listener(REFERENCE_CHANNEL, self._on_notify)
+        except Exception as e:
+            logger.warning(f"Reference data listener unavailable, relying on REFERENCE_DATA_TTL: {e}")
+            await self.stop_listener()
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            if not listener.is_closed():
+                await listener.close()
+
+
+reference_data = ReferenceDataCache()
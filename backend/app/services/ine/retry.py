@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Responses worth another attempt: throttling and server-side failures
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class RetryableHTTPError(Exception):
+    """A response that failed for reasons expected to pass (RETRYABLE_STATUS)"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """The host's circuit stayed open for longer than the caller was willing to wait"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header (delay-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, stretched to honour Retry-After"""
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds before retrying after failed attempt number `attempt` (1-based); None to give up"""
+        if attempt >= self.attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            # Never retry earlier than the server asked; give up rather than wait longer than max_delay
+            if retry_after > self.max_delay:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one host.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests wait;
+    once `reset_timeout` has passed a single probe request is let through (half-open),
+    closing the circuit on success and reopening it on failure.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def try_acquire(self) -> bool:
+        """Whether a request may be sent now; in half-open state only the first caller gets through"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    async def wait(self, max_wait: float) -> float:
+        """Wait until a request may be sent and return the time waited; CircuitOpenError past max_wait"""
+        waited = 0.0
+        while not self.try_acquire():
+            if self.opened_at is not None and not self.probing:
+                delay = max(0.05, self.opened_at + self.reset_timeout - time.monotonic())
+            else:
+                # Another request is probing the host
+                delay = 0.5
+            if waited + delay > max_wait:
+                raise CircuitOpenError(f"circuit open for more than {max_wait:g}s")
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def release(self):
+        """Give the probe slot back when a request ended without telling anything about the host"""
+        self.probing = False
+
+
+class HostCircuitBreakers:
+    """One circuit breaker per host"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[host]
@@ -0,0 +1,241 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.services.cache import SEARCH_NAMESPACE, response_cache
+from app.services.executor import run_local
+from app.services.ine.database_service import database_service
+
+# NumPy is imported where it is used: the API loads this module at startup, but the
+# indexes are only built on the first search
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Skipped in queries unless typed last, where they may be the start of a longer word
+STOPWORDS = frozenset({"a", "al", "de", "del", "e", "el", "en", "la", "las", "los", "o", "por", "u", "y"})
+
+# Match kinds, best first; multiplied by the field weight
+EXACT, PREFIX, SUBSTRING = 3.0, 2.0, 1.0
+
+
+def fold(text: Optional[str]) -> str:
+    """Lower-case, accent-free form used on both sides of a search ('Índice' -> 'indice')"""
+    # Tokens are [a-z0-9] anyway, so dropping whatever isn't ASCII after decomposition is enough
+    return unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(fold(text))
+
+
+def _trigrams(token: str) -> set:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """Accent-folded token index with exact, prefix (typeahead) and substring matching.
+
+    Documents are tuples and `fields` maps a tuple position to its weight. Every query
+    term has to match a token of the document; the score adds up the best match of each
+    term, ties going to shorter documents.
+
+    Postings are stored in vocabulary order in flat NumPy arrays, so all tokens sharing a
+    prefix are one contiguous slice found by binary search; substrings of 3+ characters
+    go through a trigram index of the vocabulary. Scoring is vectorized over documents.
+    """
+
+    def __init__(self, documents: Sequence[Tuple], fields: Dict[int, float]):
+        import numpy as np
+        self.documents = list(documents)
+        postings: Dict[str, Dict[int, float]] = {}
+        lengths = []
+        # Series names repeat a lot across datasets
+        tokenized: Dict[Optional[str], List[str]] = {}
+        for doc_id, document in enumerate(self.documents):
+            length = 0
+            for position, weight in fields.items():
+                text = document[position]
+                tokens = tokenized.get(text)
+                if tokens is None:
+                    tokens = tokenized[text] = tokenize(text)
+                for token in tokens:
+                    weights = postings.setdefault(token, {})
+                    if weights.get(doc_id, 0.0) < weight:
+                        weights[doc_id] = weight
+                    length += 1
+            lengths.append(length)
+        self._lengths = np.asarray(lengths, dtype=np.float64)
+
+        self._vocabulary = sorted(postings)
+        sizes = [len(postings[token]) for token in self._vocabulary]
+        self._offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self._offsets[1:])
+        self._doc_ids = np.fromiter(
+            (doc_id for token in self._vocabulary for doc_id in postings[token]), dtype=np.int64, count=self._offsets[-1]
+        )
+        self._weights = np.fromiter(
+            (weight for token in self._vocabulary for weight in postings[token].values()), dtype=np.float64, count=self._offsets[-1]
+        )
+
+        trigram_tokens: Dict[str, set] = {}
+        for index, token in enumerate(self._vocabulary):
+            for gram in _trigrams(token):
+                trigram_tokens.setdefault(gram, set()).add(index)
+        self._trigram_tokens = trigram_tokens
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _term_scores(self, term: str) -> "np.ndarray":
+        """Best match score of a query term for every document (0 = no match)"""
+        import numpy as np
+        scores = np.zeros(len(self.documents), dtype=np.float64)
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff", start)
+
+        # Substrings first, so better matches of the same document overwrite them
+        grams = _trigrams(term)
+        if grams:
+            candidate_sets = sorted((self._trigram_tokens.get(gram, set()) for gram in grams), key=len)
+            for index in set.intersection(*candidate_sets):
+                if not start <= index < end and term in self._vocabulary[index]:
+                    self._score_tokens(scores, index, index + 1, SUBSTRING)
+        exact = start < end and self._vocabulary[start] == term
+        self._score_tokens(scores, start + exact, end, PREFIX)
+        if exact:
+            self._score_tokens(scores, start, start + 1, EXACT)
+        return scores
+
+    def _score_tokens(self, scores: "np.ndarray", first: int, last: int, kind: float):
+        """Raise document scores to kind x field weight for the postings of tokens first..last-1"""
+        import numpy as np
+        low, high = self._offsets[first], self._offsets[last]
+        if low < high:
+            np.maximum.at(scores, self._doc_ids[low:high], self._weights[low:high] * kind)
+
+    def search(self, query: str, limit: int = 20, where: Optional[Callable[[Tuple], bool]] = None) -> List[Tuple[float, Tuple]]:
+        """(score, document) pairs, best first"""
+        import numpy as np
+        terms = tokenize(query)
+        terms = [term for term in terms[:-1] if term not in STOPWORDS] + terms[-1:]
+        if not terms or not self.documents:
+            return []
+
+        total = None
+        for term in dict.fromkeys(terms):
+            scores = self._term_scores(term)
+            total = scores if total is None else np.where((total > 0) & (scores > 0), total + scores, 0.0)
+
+        candidates = np.flatnonzero(total)
+        # Higher score first, then shorter document, then document order
+        keys = self._lengths[candidates] - total[candidates] * 1e6
+        if where is None and len(candidates) > limit:
+            # Everything tied with the limit-th key, so ties still go by document order
+            top = keys <= np.partition(keys, limit - 1)[limit - 1]
+            candidates, keys = candidates[top], keys[top]
+        ordered = candidates[np.lexsort((candidates, keys))]
+
+        results = []
+        for doc_id in ordered:
+            document = self.documents[doc_id]
+            if where is None or where(document):
+                results.append((float(total[doc_id]), document))
+                if len(results) == limit:
+                    break
+        return results
+
+
+class _BuiltIndex(NamedTuple):
+    index: SearchIndex
+    generation: int
+    built_at: float
+
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Search index rebuild failed: {task.exception()}")
+
+
+class CatalogueSearch:
+    """Dataset and series search served from in-memory indexes.
+
+    An index is rebuilt when SEARCH_NAMESPACE is invalidated, which saves do only when a
+    series is added or renamed (in every process), or after SEARCH_INDEX_MAX_AGE, which
+    picks up changes made outside the collector. The previous index keeps answering while
+    an age-triggered rebuild runs; after an invalidation searches wait for the new one so
+    stale hits are not cached under the new generation.
+    """
+
+    # name -> (loader, field weights: code over name)
+    INDEXES: Dict[str, Tuple[str, Dict[int, float]]] = {
+        "datasets": ("get_search_datasets", {0: 2.0, 1: 1.0}),
+        "series": ("get_search_series", {0: 2.0, 1: 1.0}),
+    }
+
+    def __init__(self):
+        self._built: Dict[str, _BuiltIndex] = {}
+        self._rebuilds: Dict[str, Tuple[int, asyncio.Task]] = {}
+
+    async def _index(self, name: str) -> SearchIndex:
+        generation = await response_cache.generation(SEARCH_NAMESPACE)
+        built = self._built.get(name)
+        if built is not None and built.generation == generation:
+            if time.monotonic() - built.built_at >= settings.SEARCH_INDEX_MAX_AGE:
+                self._rebuild(name, generation)
+            return built.index
+        return await asyncio.shield(self._rebuild(name, generation))
+
+    def _rebuild(self, name: str, generation: int) -> asyncio.Task:
+        """The rebuild of an index for a generation, started unless one is already running"""
+        running = self._rebuilds.get(name)
+        if running is not None and running[0] == generation and not running[1].done():
+            return running[1]
+        task = asyncio.create_task(self._build(name, generation))
+        task.add_done_callback(_log_failure)
+        self._rebuilds[name] = (generation, task)
+        return task
+
+    async def _build(self, name: str, generation: int) -> SearchIndex:
+        loader, fields = self.INDEXES[name]
+        started = time.perf_counter()
+        documents = await getattr(database_service, loader)()
+        index = await run_local(SearchIndex, documents, fields, size=len(documents))
+        built = self._built.get(name)
+        if built is not None and built.generation == generation and built.index.documents != index.documents:
+            # Changed outside the collector (found by an age-triggered rebuild): drop the
+            # cached results, and file the index under the generation that follows
+            await response_cache.invalidate(SEARCH_NAMESPACE)
+            generation = await response_cache.generation(SEARCH_NAMESPACE)
+        # A build for an older generation that finishes last must not replace a newer index
+        if built is None or built.generation <= generation:
+            self._built[name] = _BuiltIndex(index, generation, time.monotonic())
+        logger.info(f"Built {name} search index: {len(index)} documents in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return index
+
+    async def search_datasets(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Active datasets matching a (partial) query, best first"""
+        index = await self._index("datasets")
+        return [
+            {"external_id": external_id, "name": name, "id": dataset_id, "dataset_name": dataset_name, "score": score}
+            for score, (external_id, name, dataset_id, dataset_name) in index.search(query, limit)
+        ]
+
+    async def search_series(self, query: str, limit: int = 20, dataset_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Series matching a (partial) query by code or name, optionally within one dataset"""
+        index = await self._index("series")
+        where = (lambda document: document[2] == dataset_code) if dataset_code else None
+        return [
+            {"code": code, "name": name, "dataset_code": dataset, "score": score}
+            for score, (code, name, dataset) in index.search(query, limit, where)
+        ]
+
+
+catalogue_search = CatalogueSearch()
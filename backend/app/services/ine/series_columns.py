@@ -0,0 +1,159 @@
+import hashlib
+import struct
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+# NumPy is imported where it is used: this module is loaded by the API at startup
+if TYPE_CHECKING:
+    import numpy as np
+
+# Data point fields as (INE key, column attribute, dtype); little-endian so content hashes
+# do not depend on the platform
+POINT_FIELDS = (
+    ('Valor', 'values', '<f8'),
+    ('Secreto', 'secret', '<i1'),
+    ('FK_Periodo', 'period_ids', '<i4'),
+    ('Anyo', 'years', '<i4'),
+    ('FK_TipoDato', 'data_types', '<i4'),
+    ('Fecha', 'timestamps', '<i8'),
+)
+
+# Row of a binary COPY into ine_data_points_staging (see STAGING_COLUMNS): field count,
+# then length + value for each column
+COPY_ROW = [
+    ('fields', '>i2'),
+    ('metadata_id_len', '>i4'), ('metadata_id', '>i4'),
+    ('period_index_len', '>i4'), ('period_index', '>i4'),
+    ('value_len', '>i4'), ('value', '>f8'),
+    ('is_secret_len', '>i4'), ('is_secret', 'i1'),
+    ('period_id_len', '>i4'), ('period_id', '>i4'),
+    ('year_len', '>i4'), ('year', '>i4'),
+    ('data_type_id_len', '>i4'), ('data_type_id', '>i4'),
+    ('timestamp_ms_len', '>i4'), ('timestamp_ms', '>i8'),
+]
+# Staging column <- SeriesColumns attribute, in STAGING_COLUMNS order after metadata_id and period_index
+COPY_VALUE_COLUMNS = (
+    ('value', 'values'), ('is_secret', 'secret'), ('period_id', 'period_ids'),
+    ('year', 'years'), ('data_type_id', 'data_types'), ('timestamp_ms', 'timestamps'),
+)
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+_COPY_ROW_FORMATS = {'>i4': 'i', '>f8': 'd', 'i1': 'b', '>i8': 'q'}
+
+
+class SeriesColumns:
+    """One INE series with its data points held column by column in NumPy arrays.
+
+    About 30 bytes per point, against several hundred for the decoded JSON objects.
+    `nulls` has a bit per POINT_FIELDS entry (1 << position) set where the point lacks the
+    value or has it null; the column then holds 0.
+    """
+    __slots__ = ('code', 'name', 'unit_id', 'scale_id', 'values', 'secret', 'period_ids',
+                 'years', 'data_types', 'timestamps', 'nulls')
+
+    def __init__(self, code: str, name: Optional[str], unit_id: Optional[int], scale_id: Optional[int], **columns: "np.ndarray"):
+        self.code = code
+        self.name = name
+        self.unit_id = unit_id
+        self.scale_id = scale_id
+        for _, attribute, _ in POINT_FIELDS:
+            setattr(self, attribute, columns[attribute])
+        self.nulls = columns['nulls']
+
+    def __len__(self) -> int:
+        return len(self.nulls)
+
+    @property
+    def nbytes(self) -> int:
+        return self.nulls.nbytes + sum(getattr(self, attribute).nbytes for _, attribute, _ in POINT_FIELDS)
+
+    def content_hash(self) -> str:
+        """Stable digest of the data points, used to skip unchanged series"""
+        digest = hashlib.blake2b(digest_size=16)
+        for _, attribute, _ in POINT_FIELDS:
+            digest.update(getattr(self, attribute).data)
+        digest.update(self.nulls.data)
+        return digest.hexdigest()
+
+    def to_item(self) -> Dict[str, Any]:
+        """The series back in the DATOS_TABLA shape (for dumps and debugging, not the hot path)"""
+        data = []
+        for index in range(len(self)):
+            point = {}
+            for position, (key, attribute, _) in enumerate(POINT_FIELDS):
+                if not self.nulls[index] & (1 << position):
+                    value = getattr(self, attribute)[index].item()
+                    point[key] = bool(value) if key == 'Secreto' else value
+                else:
+                    point[key] = None
+            data.append(point)
+        return {"COD": self.code, "Nombre": self.name, "FK_Unidad": self.unit_id, "FK_Escala": self.scale_id, "Data": data}
+
+
+def _ref_id(value: Any) -> Optional[int]:
+    """Integer dimension id (FK_Unidad, FK_Escala) or None when missing or not numeric"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def series_columns(item: Dict[str, Any]) -> SeriesColumns:
+    """Pack a decoded DATOS_TABLA series into columns; its point objects can be dropped right after"""
+    import numpy as np
+    data = item.get('Data') or []
+    columns = {}
+    nulls = np.zeros(len(data), dtype=np.uint8)
+    for position, (key, attribute, dtype) in enumerate(POINT_FIELDS):
+        default = False if key == 'Secreto' else None
+        # None becomes NaN in a float array, which marks the nulls
+        raw = np.array([point.get(key, default) for point in data], dtype=np.float64)
+        missing = np.isnan(raw)
+        if missing.any():
+            nulls |= missing.astype(np.uint8) << position
+            raw[missing] = 0
+        columns[attribute] = raw.astype(dtype)
+    return SeriesColumns(item.get('COD'), item.get('Nombre'), _ref_id(item.get('FK_Unidad')), _ref_id(item.get('FK_Escala')), nulls=nulls, **columns)
+
+
+def copy_data(series: Sequence[SeriesColumns], metadata_ids: Sequence[int], partial: bool = False) -> bytes:
+    """Binary COPY data (header to trailer) of the points of `series`, for ine_data_points_staging.
+
+    Rows without nulls are laid out by NumPy in one go; the rare rows with a null are
+    packed one by one. With `partial`, period indexes are the negative placeholders that
+    DatabaseService._align_partial_staging resolves.
+    """
+    import numpy as np
+    counts = [len(columns) for columns in series]
+    total = sum(counts)
+    row_type = np.dtype(COPY_ROW)
+    rows = np.empty(total, dtype=row_type)
+    rows['fields'] = len(COPY_VALUE_COLUMNS) + 2
+    for name, dtype in COPY_ROW[1::2]:
+        rows[name] = np.dtype(row_type[name.replace('_len', '')]).itemsize
+    rows['metadata_id'] = np.repeat(np.asarray(metadata_ids, dtype=np.int32), counts)
+    indexes = np.concatenate([np.arange(count, dtype=np.int32) for count in counts]) if series else np.empty(0, np.int32)
+    rows['period_index'] = -indexes - 1 if partial else indexes
+    nulls = np.concatenate([columns.nulls for columns in series]) if series else np.empty(0, np.uint8)
+    for name, attribute in COPY_VALUE_COLUMNS:
+        rows[name] = np.concatenate([getattr(columns, attribute) for columns in series]) if series else 0
+
+    has_null = nulls != 0
+    if not has_null.any():
+        return COPY_HEADER + rows.tobytes() + COPY_TRAILER
+    parts = [COPY_HEADER, rows[~has_null].tobytes()]
+    for row, row_nulls in zip(rows[has_null], nulls[has_null]):
+        parts.append(_copy_row_with_nulls(row, int(row_nulls)))
+    parts.append(COPY_TRAILER)
+    return b"".join(parts)
+
+
+def _copy_row_with_nulls(row, nulls: int) -> bytes:
+    fields = [struct.pack(">hii", len(COPY_VALUE_COLUMNS) + 2, 4, int(row['metadata_id'])), struct.pack(">ii", 4, int(row['period_index']))]
+    for position, (name, _) in enumerate(COPY_VALUE_COLUMNS):
+        if nulls & (1 << position):
+            fields.append(struct.pack(">i", -1))
+        else:
+            code = _COPY_ROW_FORMATS[dict(COPY_ROW)[name]]
+            size = struct.calcsize(">" + code)
+            fields.append(struct.pack(">i" + code, size, row[name].item()))
+    return b"".join(fields)
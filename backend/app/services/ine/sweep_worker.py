@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from app.core.config import settings
+from app.services.ine.data_collector_service import DEFAULT_CHECKPOINT, data_collector_service
+from app.services.ine.database_service import database_service
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class SweepWorker:
+    """One of several processes collecting the datasets of a sharded collection job.
+
+    Datasets are claimed one at a time as leases in collection_sweep_items. A heartbeat
+    renews the leases while datasets are fetched and written; leases of a worker that
+    died or stalled expire and are claimed again by the others. Before writing, the
+    worker renews the lease once more and drops the dataset if it was lost, and the
+    save transaction itself serializes on a per-dataset advisory lock, so no dataset is
+    ever written by two workers at once.
+    """
+
+    def __init__(self, job_id: str, worker_id: Optional[str] = None, wait_for_others: bool = False):
+        self.job_id = job_id
+        self.worker_id = worker_id or default_worker_id()
+        # The coordinator stays until every item is finished, reclaiming expired leases
+        self.wait_for_others = wait_for_others
+        self.lease_seconds = settings.COLLECTOR_LEASE_SECONDS
+        self.held: Set[int] = set()
+        self.cancelled = False
+
+    async def run(self) -> List[Dict[str, Any]]:
+        """Collect claimed datasets until the sweep has nothing left for this worker"""
+        logger.info(f"Sweep worker {self.worker_id} joining job {self.job_id}")
+        heartbeat = asyncio.create_task(self._heartbeat())
+        results = []
+        try:
+            while True:
+                results += await data_collector_service.collect_claimed(
+                    self._claim,
+                    on_result=self._on_result,
+                    should_stop=lambda: self.cancelled,
+                    can_write=self._still_leased,
+                    rate_share=1 / max(1, settings.COLLECTOR_WORKERS),
+                    checkpoint=DEFAULT_CHECKPOINT,
+                )
+                if not self.wait_for_others:
+                    break
+                
+                status = await database_service.get_sweep_status(self.job_id)
+                self.cancelled = self.cancelled or bool(status['cancel_requested'])
+                if not status['leased'] and (self.cancelled or not status['claimable']):
+                    break
+                await asyncio.sleep(min(5.0, self.lease_seconds / 3))
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        
+        logger.info(f"Sweep worker {self.worker_id} finished {len(results)} datasets of job {self.job_id}")
+        return results
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        dataset = await database_service.claim_sweep_item(
+            self.job_id, self.worker_id, self.lease_seconds, settings.COLLECTOR_LEASE_MAX_ATTEMPTS
+        )
+        if dataset is not None:
+            self.held.add(dataset['id'])
+        return dataset
+
+    async def _still_leased(self, dataset: Dict[str, Any]) -> bool:
+        owned = await database_service.renew_sweep_leases(self.job_id, self.worker_id, [dataset['id']], self.lease_seconds)
+        if not owned:
+            self.held.discard(dataset['id'])
+        return bool(owned)
+
+    async def _on_result(self, dataset: Dict[str, Any], result: Dict[str, Any]):
+        self.held.discard(dataset['id'])
+        if result.get('status') == "lease_lost":
+            return
+        if not await database_service.complete_sweep_item(self.job_id, dataset['id'], self.worker_id, result):
+            logger.warning(f"Lease on dataset {dataset['external_id']} expired before its result was stored")
+            return
+        if await database_service.record_collection_job_progress(self.job_id, dataset['external_id'], result):
+            self.cancelled = True
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.held:
+                continue
+            try:
+                held = list(self.held)
+                owned = set(await database_service.renew_sweep_leases(self.job_id, self.worker_id, held, self.lease_seconds))
+                for dataset_id in set(held) - owned:
+                    logger.warning(f"Sweep worker {self.worker_id} lost its lease on dataset {dataset_id}")
+                    self.held.discard(dataset_id)
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed for {self.worker_id}: {e}")
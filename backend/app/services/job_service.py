@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.ine.database_service import database_service
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE_INE_COLLECTION = "ine_collection"
+
+JobHandler = Callable[[str], Awaitable[None]]
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+class AsyncioJobRunner:
+    """Runs jobs as tasks on the API process' event loop"""
+    name = "asyncio"
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._processes: List[asyncio.subprocess.Process] = []
+
+    async def dispatch(self, job_id: str, handler: JobHandler):
+        task = asyncio.create_task(handler(job_id), name=f"job-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def spawn_sweep_workers(self, job_id: str, count: int):
+        """Start extra sweep workers as local processes, so parsing runs on more than one core"""
+        self._processes = [process for process in self._processes if process.returncode is None]
+        for _ in range(count):
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "app.sweep_worker", job_id, cwd=str(BACKEND_ROOT)
+            )
+            self._processes.append(process)
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Leases of terminated workers simply expire
+        for process in self._processes:
+            if process.returncode is None:
+                process.terminate()
+
+
+class CeleryJobRunner:
+    """Hands jobs to Celery workers (see app/worker.py); the job row in Postgres carries the state"""
+    name = "celery"
+
+    async def dispatch(self, job_id: str, handler: JobHandler):
+        from app.worker import run_collection_job
+        # Publishing talks to the broker synchronously
+        await asyncio.to_thread(run_collection_job.delay, job_id)
+
+    async def spawn_sweep_workers(self, job_id: str, count: int):
+        from app.worker import run_sweep_worker
+        for _ in range(count):
+            await asyncio.to_thread(run_sweep_worker.delay, job_id)
+
+    async def shutdown(self):
+        pass
+
+
+JOB_RUNNERS = {
+    AsyncioJobRunner.name: AsyncioJobRunner,
+    CeleryJobRunner.name: CeleryJobRunner,
+}
+
+
+class JobService:
+    """Background INE collection jobs with persisted status, progress and cooperative cancellation"""
+
+    def __init__(self):
+        self._runner = None
+
+    @property
+    def runner(self):
+        if self._runner is None:
+            if settings.JOB_RUNNER not in JOB_RUNNERS:
+                raise ValueError(f"Unknown JOB_RUNNER '{settings.JOB_RUNNER}', expected one of {sorted(JOB_RUNNERS)}")
+            self._runner = JOB_RUNNERS[settings.JOB_RUNNER]()
+        return self._runner
+
+    async def submit_collection(self) -> Tuple[Dict[str, Any], bool]:
+        """Queue a collection run; returns (job, created), reusing the active job when one exists"""
+        await database_service.ensure_schema()
+        job, created = await database_service.create_collection_job(
+            uuid.uuid4().hex, JOB_TYPE_INE_COLLECTION, self.runner.name
+        )
+        if not created:
+            logger.info(f"INE data collection already active as job {job['id']}")
+            return job, False
+
+        try:
+            await self.runner.dispatch(job['id'], self.run_collection_job)
+        except Exception as error:
+            await database_service.finish_collection_job(job['id'], "failed", error=f"Could not dispatch job: {error}")
+            raise
+        logger.info(f"Queued INE data collection job {job['id']} ({self.runner.name})")
+        return job, True
+
+    async def run_collection_job(self, job_id: str):
+        """Execute a queued collection job and persist its outcome (called by the runners)"""
+        await database_service.ensure_schema()
+        job = await database_service.start_collection_job(job_id)
+        if job is None:
+            logger.info(f"Job {job_id} is no longer queued, not running it")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id), name=f"job-{job_id}-heartbeat")
+        try:
+            if settings.COLLECTOR_WORKERS > 1:
+                result, cancelled = await self._run_sharded(job_id)
+            else:
+                result, cancelled = await self._run_in_process(job_id)
+        except asyncio.CancelledError:
+            await self._finish(job_id, "failed", error="Interrupted by shutdown")
+            raise
+        except Exception as error:
+            logger.error(f"Job {job_id} failed: {error}")
+            await self._finish(job_id, "failed", error=str(error))
+            return
+        finally:
+            heartbeat.cancel()
+
+        status = "cancelled" if cancelled else "succeeded"
+        logger.info(f"Job {job_id} {status}")
+        await self._finish(job_id, status, result=result)
+
+    async def _heartbeat(self, job_id: str):
+        """Touch the job well within JOB_STALE_AFTER while it runs, however long one dataset takes"""
+        while True:
+            await asyncio.sleep(settings.JOB_STALE_AFTER / 4)
+            try:
+                await database_service.touch_collection_job(job_id)
+            except Exception as e:
+                logger.error(f"Heartbeat of job {job_id} failed: {e}")
+
+    async def _run_in_process(self, job_id: str) -> Tuple[Dict[str, Any], bool]:
+        # The collector (and httpx with it) is only loaded once a job actually runs
+        from app.services.ine.data_collector_service import data_collector_service
+        cancelled = False
+
+        async def on_start(datasets: List[Dict[str, Any]]):
+            await database_service.set_collection_job_total(job_id, len(datasets))
+
+        async def on_result(dataset: Dict[str, Any], result: Dict[str, Any]):
+            nonlocal cancelled
+            if await database_service.record_collection_job_progress(job_id, dataset['external_id'], result):
+                cancelled = True
+
+        result = await data_collector_service.collect_ine_data(
+            on_start=on_start, on_result=on_result, should_stop=lambda: cancelled
+        )
+        return result, cancelled
+
+    async def _run_sharded(self, job_id: str) -> Tuple[Dict[str, Any], bool]:
+        """Split the sweep over COLLECTOR_WORKERS processes; this one coordinates and collects too"""
+        from app.services.ine.data_collector_service import DEFAULT_CHECKPOINT, data_collector_service
+        from app.services.ine.sweep_worker import SweepWorker
+        started = time.perf_counter()
+        datasets = await database_service.get_ine_datasets()
+        pending = await data_collector_service.pending_datasets(datasets, DEFAULT_CHECKPOINT)
+        await database_service.set_collection_job_total(job_id, len(pending))
+        await database_service.create_sweep_items(job_id, pending)
+        
+        workers = settings.COLLECTOR_WORKERS
+        logger.info(f"Job {job_id}: sharding {len(pending)} datasets over {workers} workers")
+        await self.runner.spawn_sweep_workers(job_id, workers - 1)
+        
+        coordinator = SweepWorker(job_id, wait_for_others=True)
+        await coordinator.run()
+        
+        results = await database_service.get_sweep_results(job_id)
+        if not any(result['status'] == "cancelled" for result in results):
+            await database_service.clear_collection_checkpoint(DEFAULT_CHECKPOINT)
+        elapsed = round(time.perf_counter() - started, 2)
+        return {
+            "success": True,
+            "total_datasets": len(datasets),
+            "resumed_datasets": len(datasets) - len(pending),
+            "elapsed_seconds": elapsed,
+            "workers": workers,
+            "results": results
+        }, coordinator.cancelled
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        try:
+            await database_service.finish_collection_job(job_id, status, result=result, error=error)
+        except Exception as e:
+            logger.error(f"Could not store final status of job {job_id}: {e}")
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        await database_service.ensure_schema()
+        return await database_service.get_collection_job(job_id)
+
+    async def cancel_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation; None when the job does not exist or has already finished"""
+        await database_service.ensure_schema()
+        return await database_service.cancel_collection_job(job_id)
+
+    async def shutdown(self):
+        if self._runner is not None:
+            await self._runner.shutdown()
+
+
+job_service = JobService()
@@ -0,0 +1,344 @@
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; from a cached page (~1ms) to a full sweep step (minutes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = tuple(float(4 ** exponent) for exponent in range(5, 16))  # 1 KiB .. 1 GiB
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """A named family of time series told apart by label values"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_text(self, values: LabelValues, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = [*zip(self.labels, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """A value that goes up and down; `collect` (returning {label values: value}) is read at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), collect: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.collect is not None:
+            try:
+                values.update(self.collect())
+            except Exception as error:
+                logger.warning(f"Collecting gauge {self.name} failed: {error}")
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format.
+
+    Each process (API, Celery worker, sweep worker) keeps its own; /metrics exposes
+    the API process'.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, collect))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "API request latency until the last body byte is sent", ("method", "route", "status")
+)
+HTTP_RESPONSE_BYTES = registry.histogram(
+    "http_response_size_bytes", "API response body size", ("method", "route"), SIZE_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge("http_requests_in_progress", "API requests being served")
+
+DB_CALL_SECONDS = registry.histogram("db_call_duration_seconds", "DatabaseService method latency", ("method",))
+DB_CALL_ERRORS = registry.counter("db_call_errors_total", "DatabaseService calls that raised", ("method",))
+DB_ROWS = registry.counter("db_rows_returned_total", "Rows (or series) returned by DatabaseService methods", ("method",))
+DB_ACQUIRE_SECONDS = registry.histogram("db_pool_acquire_wait_seconds", "Time spent waiting for a pooled connection")
+
+COLLECTOR_DATASETS = registry.counter("collector_datasets_total", "Datasets processed by the collector", ("status",))
+COLLECTOR_STAGE_SECONDS = registry.histogram(
+    "collector_stage_duration_seconds", "Per-dataset time in each collector stage (parse overlaps write when streaming)", ("stage",)
+)
+COLLECTOR_BYTES = registry.counter("collector_downloaded_bytes_total", "Response body bytes downloaded from INE")
+COLLECTOR_PAYLOAD_BYTES = registry.histogram("collector_payload_size_bytes", "Size of each downloaded table", buckets=SIZE_BUCKETS)
+COLLECTOR_RETRIES = registry.counter("collector_fetch_retries_total", "Retried INE downloads", ("reason",))
+COLLECTOR_QUEUE_DEPTH = registry.gauge("collector_queue_depth", "Fetched datasets waiting for a DB writer")
+COLLECTOR_FETCHES_IN_PROGRESS = registry.gauge("collector_fetches_in_progress", "INE downloads in flight")
+
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "Delay of a periodic event loop callback past its due time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_LAG_LAST = registry.gauge("event_loop_lag_last_seconds", "Most recent event loop lag measurement")
+
+
+def _row_count(result: Any) -> Optional[int]:
+    """Rows in what a DatabaseService method returned: lists, and (items, next_key) pages"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])
+    return None
+
+
+def _timed_coroutine(name: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            DB_CALL_ERRORS.inc(method=name)
+            raise
+        finally:
+            DB_CALL_SECONDS.observe(time.perf_counter() - started, method=name)
+        rows = _row_count(result)
+        if rows:
+            DB_ROWS.inc(rows, method=name)
+        return result
+    return wrapper
+
+
+def _timed_generator(name: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            async for item in func(*args, **kwargs):
+                rows += 1
+                yield item
+        except Exception:
+            DB_CALL_ERRORS.inc(method=name)
+            raise
+        finally:
+            # Includes the time the consumer spent between rows
+            DB_CALL_SECONDS.observe(time.perf_counter() - started, method=name)
+            DB_ROWS.inc(rows, method=name)
+    return wrapper
+
+
+def instrument_methods(cls):
+    """Class decorator timing every public coroutine and async generator method (DB_CALL_SECONDS)"""
+    for name, member in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        if inspect.isasyncgenfunction(member):
+            setattr(cls, name, _timed_generator(name, member))
+        elif inspect.iscoroutinefunction(member):
+            setattr(cls, name, _timed_coroutine(name, member))
+    return cls
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and response size per route template.
+
+    Unmatched paths are reported as route="unmatched" so scanners can't blow up the
+    label set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None and "app" in scope:
+            self._routes = {}
+            for route in scope["app"].routes:
+                if hasattr(route, "endpoint"):
+                    self._routes.setdefault(route.endpoint, route.path)
+        return (self._routes or {}).get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_observed(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = self._route(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
+            HTTP_RESPONSE_BYTES.observe(size, method=scope["method"], route=route)
+
+
+class EventLoopMonitor:
+    """Measures how late a callback scheduled every `interval` seconds actually runs"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, interval: Optional[float] = None):
+        interval = interval or settings.METRICS_LOOP_LAG_INTERVAL
+        if interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(interval), name="event-loop-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - due)
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
+
+
+event_loop_monitor = EventLoopMonitor()
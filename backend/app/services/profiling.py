@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import shutil
+import signal
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ("", "cprofile", "py-spy")
+
+# cProfile can only be active once per process; py-spy samples the whole process anyway
+_active = asyncio.Lock()
+
+
+def profile_dir() -> Path:
+    return Path(settings.STORAGE_PATH) / "profiles"
+
+
+def _output_path(label: str, suffix: str) -> Path:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "section"
+    return directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}-{os.getpid()}{suffix}"
+
+
+@asynccontextmanager
+async def profiled(label: str, sample_rate: float = 1.0) -> AsyncIterator[None]:
+    """Profile the enclosed section with settings.PROFILER, writing a file under STORAGE_PATH/profiles.
+
+    cProfile writes a .prof file (snakeviz, pstats); py-spy samples the process from
+    outside and writes a speedscope JSON. Sections overlapping one already being
+    profiled, or left out by `sample_rate`, run unprofiled.
+    """
+    profiler = settings.PROFILER
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown PROFILER '{profiler}', expected one of {PROFILERS}")
+    if not profiler or _active.locked() or random.random() >= sample_rate:
+        yield
+        return
+
+    async with _active:
+        if profiler == "cprofile":
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                path = _output_path(label, ".prof")
+                profile.dump_stats(str(path))
+                logger.info(f"Profile of {label} written to {path}")
+            return
+
+        executable = shutil.which("py-spy")
+        if executable is None:
+            logger.warning("PROFILER=py-spy but py-spy is not installed, not profiling")
+            yield
+            return
+        path = _output_path(label, ".speedscope.json")
+        process = await asyncio.create_subprocess_exec(
+            executable, "record", "--pid", str(os.getpid()), "--rate", str(settings.PROFILE_PY_SPY_RATE),
+            "--format", "speedscope", "--output", str(path), "--nonblocking",
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            yield
+        finally:
+            # py-spy writes its output when interrupted
+            if process.returncode is None:
+                process.send_signal(signal.SIGINT)
+            if await process.wait() == 0:
+                logger.info(f"Profile of {label} written to {path}")
+            else:
+                logger.warning(f"py-spy exited with {process.returncode} profiling {label} (it needs ptrace permission)")
+
+
+class ProfilingMiddleware:
+    """Profiles a PROFILE_REQUEST_SAMPLE_RATE fraction of API requests when PROFILER is set"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILER or settings.PROFILE_REQUEST_SAMPLE_RATE <= 0:
+            await self.app(scope, receive, send)
+            return
+        async with profiled(f"{scope['method']} {scope['path']}", settings.PROFILE_REQUEST_SAMPLE_RATE):
+            await self.app(scope, receive, send)
@@ -0,0 +1,28 @@
+"""
+Join a sharded INE collection job (COLLECTOR_WORKERS > 1) as an extra worker. Any number
+of these may run, on any node that reaches the database. From backend/:
+    python -m app.sweep_worker <job_id>
+"""
+import argparse
+import asyncio
+import logging
+
+from app.services.ine.database_service import database_service
+from app.services.ine.sweep_worker import SweepWorker
+
+
+async def main(job_id: str):
+    await database_service.connect()
+    try:
+        await database_service.ensure_schema()
+        await SweepWorker(job_id).run()
+    finally:
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join a sharded INE collection job")
+    parser.add_argument("job_id")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.job_id))
@@ -0,0 +1,51 @@
+"""
+Celery worker for background jobs, used when JOB_RUNNER=celery. Start it (from backend/) with:
+    celery -A app.worker worker --loglevel=info
+
+Job state lives in the collection_jobs table, so no result backend is configured. Set
+REDIS_URL as well so response-cache invalidations from the worker reach the API processes.
+"""
+import asyncio
+
+from celery import Celery
+from celery.signals import worker_process_shutdown
+
+from app.core.config import settings
+from app.services.ine.database_service import database_service
+from app.services.ine.sweep_worker import SweepWorker
+from app.services.job_service import job_service
+
+celery_app = Celery("data_collector", broker=settings.CELERY_BROKER_URL or settings.REDIS_URL)
+celery_app.conf.update(
+    task_ignore_result=True,
+    worker_prefetch_multiplier=1,
+)
+
+# One event loop per worker process, so the connection pool outlives single tasks
+_loop = None
+
+
+def _run(coroutine):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coroutine)
+
+
+@celery_app.task(name="jobs.run_ine_data_collection")
+def run_collection_job(job_id: str):
+    """Run a queued INE data collection job"""
+    _run(job_service.run_collection_job(job_id))
+
+
+@celery_app.task(name="jobs.run_sweep_worker")
+def run_sweep_worker(job_id: str):
+    """Join a sharded collection job as an extra sweep worker"""
+    _run(SweepWorker(job_id).run())
+
+
+@worker_process_shutdown.connect
+def _close_pool(**kwargs):
+    if _loop is not None:
+        _loop.run_until_complete(database_service.close())
+        _loop.close()
@@ -0,0 +1,116 @@
+"""
+Compare the former per-series INSERT/DELETE/executemany ingestion with the COPY-based
+bulk writer on a synthetic payload (default: 1000 series x 100 points = 100k points).
+
+Writes into ine_metadata / ine_data_points under a scratch dataset id which is removed
+afterwards. Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_bulk_ingest --series 1000 --points 100
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.ine.database_service import database_service
+
+DATASET_ID = "BENCH_BULK_INGEST"
+
+
+def synthetic_payload(series_count, points):
+    payload = []
+    for s in range(series_count):
+        payload.append({
+            "COD": f"BENCH{s:06d}",
+            "Nombre": f"Benchmark series {s}",
+            "FK_Unidad": 1,
+            "FK_Escala": 1,
+            "Data": [
+                {
+                    "Fecha": 946681200000 + p * 2678400000,
+                    "FK_TipoDato": 1,
+                    "FK_Periodo": p % 12 + 1,
+                    "Anyo": 2000 + p // 12,
+                    "Valor": round(random.uniform(0, 1000), 4),
+                    "Secreto": False,
+                }
+                for p in range(points)
+            ],
+        })
+    return payload
+
+
+async def legacy_save(dataset_external_id, data):
+    """The original per-series write path"""
+    async with database_service.acquire() as conn:
+        async with conn.transaction():
+            for item in data:
+                metadata_id = await conn.fetchval("""
+                    INSERT INTO ine_metadata (dataset_external_id, code, name, unit_id, scale_id, updated_at)
+                    VALUES ($1, $2, $3, $4, $5, CURRENT_TIMESTAMP)
+                    ON CONFLICT (dataset_external_id, code)
+                    DO UPDATE SET name = EXCLUDED.name, unit_id = EXCLUDED.unit_id,
+                                 scale_id = EXCLUDED.scale_id, updated_at = CURRENT_TIMESTAMP
+                    RETURNING id
+                """, dataset_external_id, item['COD'], item.get('Nombre'),
+                    item.get('FK_Unidad'), item.get('FK_Escala'))
+                await conn.execute("DELETE FROM ine_data_points WHERE metadata_id = $1", metadata_id)
+                await conn.executemany("""
+                    INSERT INTO ine_data_points
+                    (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                """, [
+                    (metadata_id, index, dp.get('Valor'), dp.get('Secreto', False),
+                     dp.get('FK_Periodo'), dp.get('Anyo'), dp.get('FK_TipoDato'), dp.get('Fecha'))
+                    for index, dp in enumerate(item['Data'])
+                ])
+
+
+async def snapshot():
+    async with database_service.acquire() as conn:
+        return await conn.fetch("""
+            SELECT m.code, dp.period_index, dp.value, dp.is_secret, dp.period_id, dp.year, dp.data_type_id, dp.timestamp_ms
+            FROM ine_data_points dp JOIN ine_metadata m ON m.id = dp.metadata_id
+            WHERE m.dataset_external_id = $1
+            ORDER BY m.code, dp.period_index
+        """, DATASET_ID)
+
+
+async def cleanup():
+    async with database_service.acquire() as conn:
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET_ID)
+
+
+async def timed(name, func, payload, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await func(DATASET_ID, payload)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    points = sum(len(item['Data']) for item in payload)
+    print(f"{name:<8} best={best:7.3f}s  ({points / best:,.0f} points/s over {rounds} rounds)")
+    return await snapshot()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.series, args.points)
+    await database_service.connect()
+    try:
+        await database_service.initialize_tables()
+        await cleanup()
+        legacy_rows = await timed("legacy", legacy_save, payload, args.rounds)
+        bulk_rows = await timed("bulk", database_service.save_dataset_data, payload, args.rounds)
+        print(f"identical table contents: {[tuple(r) for r in legacy_rows] == [tuple(r) for r in bulk_rows]}")
+    finally:
+        await cleanup()
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Download tables from the local INE stand-in while it fails on purpose, and report how the
+collector's retries and circuit breaker cope: requests sent, time taken and outcomes.
+
+Runs in-process (no network, no database); delays are scaled down so a run takes seconds.
+Usage (from backend/):
+    python -m benchmarks.bench_collector_faults --datasets 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+import httpx
+
+from app.core.config import settings
+from app.services.ine.data_collector_service import data_collector_service
+from app.services.ine.rate_limiter import HostRateLimiter
+from app.services.ine.retry import HostCircuitBreakers
+from benchmarks.ine_standin import StandinTransport, create_standin_app, synthetic_table
+
+BASE_URL = "http://ine-standin"
+
+# name -> (datasets fetched, faults injected before the first request)
+SCENARIOS = {
+    "two 503s": (1, [dict(times=2, status=503)]),
+    "429 Retry-After: 1": (1, [dict(times=1, status=429, retry_after="1")]),
+    "two dropped connections": (1, [dict(times=2, drop=True)]),
+    "404": (1, [dict(times=1, status=404)]),
+    "outage, all 503": (None, [dict(times=10**6, status=503)]),
+    "outage, then recovery": (None, [dict(times=12, status=502)]),
+}
+
+
+async def fetch_all(client, datasets, concurrency):
+    rate_limiter = HostRateLimiter(settings.INE_RATE_LIMIT_PER_SECOND, settings.INE_RATE_LIMIT_BURST)
+    breakers = HostCircuitBreakers(settings.INE_CIRCUIT_FAILURE_THRESHOLD, settings.INE_CIRCUIT_RESET_SECONDS)
+    queue = list(datasets)
+    outcomes = Counter()
+
+    async def worker():
+        while queue:
+            dataset = queue.pop(0)
+            try:
+                await data_collector_service._fetch_with_retries(
+                    client, rate_limiter, breakers, f"{BASE_URL}/DATOS_TABLA/{dataset['external_id']}", dataset, {}
+                )
+                outcomes["ok"] += 1
+            except Exception as error:
+                outcomes[type(error).__name__] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return outcomes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--datasets", type=int, default=20, help="datasets fetched in the outage scenarios")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--no-breaker", action="store_true", help="never open the circuit, for comparison")
+    args = parser.parse_args()
+
+    settings.INE_RATE_LIMIT_PER_SECOND = 0
+    settings.INE_RETRY_ATTEMPTS = 4
+    settings.INE_RETRY_BASE_DELAY = 0.05
+    settings.INE_RETRY_MAX_DELAY = 2.0
+    settings.INE_CIRCUIT_FAILURE_THRESHOLD = 10**9 if args.no_breaker else 5
+    settings.INE_CIRCUIT_RESET_SECONDS = 0.5
+    settings.INE_CIRCUIT_MAX_WAIT = 5.0
+    # Retry warnings would drown the report
+    logging.basicConfig(level=logging.ERROR)
+
+    table = synthetic_table(args.series, 24)
+    for name, (count, faults) in SCENARIOS.items():
+        count = count or args.datasets
+        app = create_standin_app({f"T{i}": table for i in range(count)})
+        state = app.state.standin
+        for fault in faults:
+            state.fail(**fault)
+
+        datasets = [{"id": i, "external_id": f"T{i}"} for i in range(count)]
+        async with httpx.AsyncClient(transport=StandinTransport(app=app), base_url=BASE_URL) as client:
+            started = time.perf_counter()
+            outcomes = await fetch_all(client, datasets, args.concurrency)
+            elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{outcome}={n}" for outcome, n in sorted(outcomes.items()))
+        print(f"{name:<26} datasets={count:<4} requests={state.requests:<5} {elapsed:6.2f}s  {summary}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
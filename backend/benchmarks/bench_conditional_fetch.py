@@ -0,0 +1,51 @@
+"""
+Measure bandwidth and CPU spent re-fetching an unchanged table against the local INE stand-in.
+
+Runs in-process (no network, no database). Usage (from backend/):
+    python -m benchmarks.bench_conditional_fetch --series 500 --points 240
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.services.ine.data_collector_service import data_collector_service
+from benchmarks.ine_standin import create_standin_app, synthetic_table
+
+BASE_URL = "http://ine-standin"
+
+
+async def fetch(client, dataset, label):
+    app_state = client._transport.app.state.standin
+    bytes_before = app_state.bytes_sent
+    cpu_started = time.process_time()
+    fetched = await data_collector_service._fetch_dataset_data(
+        client, f"{BASE_URL}/DATOS_TABLA/{dataset['external_id']}", dataset
+    )
+    cpu = (time.process_time() - cpu_started) * 1000
+    print(f"{label:<28} status={fetched['status']:<13} bytes={app_state.bytes_sent - bytes_before:>11,}  cpu={cpu:8.2f}ms")
+    return fetched
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--points", type=int, default=240)
+    args = parser.parse_args()
+
+    app = create_standin_app({"STANDIN": synthetic_table(args.series, args.points)})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL) as client:
+        dataset = {"id": 1, "external_id": "STANDIN"}
+        first = await fetch(client, dataset, "initial download")
+
+        dataset.update(fetch_etag=first['etag'], fetch_last_modified=first['last_modified'],
+                       fetch_body_hash=first['body_hash'])
+        await fetch(client, dataset, "conditional (ETag)")
+
+        app.state.standin.send_validators = False
+        await fetch(client, dataset, "no validators (body hash)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
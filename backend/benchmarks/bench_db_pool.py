@@ -0,0 +1,74 @@
+"""
+Compare request latency of connect-per-call against the shared asyncpg pool.
+
+Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_db_pool --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import asyncpg
+
+from app.core.config import settings
+from app.services.ine.database_service import database_service
+
+QUERY = "SELECT * FROM ine_datasets ORDER BY id LIMIT 50"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def connect_per_call():
+    conn = await asyncpg.connect(settings.DB_CONNECTION_STRING)
+    try:
+        await conn.fetch(QUERY)
+    finally:
+        await conn.close()
+
+
+async def pooled():
+    async with database_service.acquire() as conn:
+        await conn.fetch(QUERY)
+
+
+async def run(name, func, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await func()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<18} p50={percentile(latencies, 50):8.2f}ms  p99={percentile(latencies, 99):8.2f}ms  "
+        f"mean={statistics.mean(latencies):8.2f}ms  throughput={requests / elapsed:8.1f} req/s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    await run("connect-per-call", connect_per_call, args.requests, args.concurrency)
+    await database_service.connect()
+    try:
+        await run("pooled", pooled, args.requests, args.concurrency)
+        print(f"pool stats: {database_service.get_pool_stats()}")
+    finally:
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Measure event-loop lag while a large dataset is ingested, for each CPU_EXECUTOR mode
+(default: 2000 series x 240 points = 480k points, streamed from a JSON body as in a
+collection run).
+
+A probe task sleeps in short intervals and records how late it wakes up; that delay is
+what every other request on the worker would see. Writes a scratch dataset which is
+removed afterwards. Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_event_loop_lag --series 2000 --points 240
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+
+from app.core.config import settings
+from app.services.executor import shutdown_executor
+from app.services.ine.data_collector_service import data_collector_service
+from app.services.ine.database_service import database_service
+from benchmarks.bench_bulk_ingest import synthetic_payload
+
+DATASET_ID = "BENCH_EVENT_LOOP_LAG"
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def ingest(body):
+    chunks = data_collector_service._iter_prepared_chunks(io.BytesIO(body), partial=False)
+    await database_service.save_dataset_chunks(DATASET_ID, chunks, mode="replace")
+
+
+async def timed(mode, body):
+    settings.CPU_EXECUTOR = mode
+    shutdown_executor()
+    # Warm the pool up so process start-up isn't measured
+    await ingest(b"[]")
+
+    lags, stop = [], asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    started = time.perf_counter()
+    await ingest(body)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    print(f"{mode:<8} ingest={elapsed:6.2f}s  loop lag p99={p99 * 1000:7.1f}ms  max={lags[-1] * 1000 if lags else 0:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=240)
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    body = json.dumps(synthetic_payload(args.series, args.points)).encode()
+    print(f"payload: {len(body) / 1e6:.1f} MB, {args.series * args.points:,} points")
+    await database_service.connect()
+    try:
+        await database_service.initialize_tables()
+        for mode in args.modes.split(","):
+            await timed(mode, body)
+    finally:
+        async with database_service.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET_ID)
+        await database_service.close()
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Cold import time of the process entry points, measured with `python -X importtime` in
+fresh interpreters, checked against a budget and a list of modules each entry point must
+not load at startup. Exits non-zero when a check fails, so it can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import_time --budget 700 --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# entry point -> top-level packages it must not import eagerly
+ENTRY_POINTS = {
+    "main": ("numpy", "pandas", "pyarrow", "httpx", "celery", "sqlalchemy", "alembic", "requests"),
+    "app.cli": ("numpy", "pandas", "pyarrow", "httpx", "celery", "sqlalchemy", "alembic", "requests"),
+    "app.sweep_worker": ("numpy", "pandas", "pyarrow", "celery", "sqlalchemy", "alembic", "requests", "fastapi"),
+}
+
+
+def import_times(module):
+    """(module, self µs, cumulative µs) for everything importing `module` loads"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr}")
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    # Modules finished before `site` are interpreter startup, not this import
+    names = [row[0] for row in rows]
+    return rows[names.index("site") + 1:] if "site" in names else rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS), help="entry points to measure")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point; the median counts")
+    parser.add_argument("--budget", type=float, default=700.0, help="ms each entry point may take to import")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports shown per entry point")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.runs)]
+        total = statistics.median(next(row[2] for row in rows if row[0] == module) for rows in runs) / 1000
+        loaded = {row[0] for row in runs[-1]}
+        print(f"{module:<18} {total:7.1f}ms (median of {args.runs}, budget {args.budget:.0f}ms)")
+
+        # Packages imported directly by the entry point or by app code, with their cumulative time
+        packages = {}
+        for name, _, cumulative in runs[-1]:
+            top = name.split(".")[0]
+            if top != "app" and top != module and "." not in name:
+                packages[top] = max(packages.get(top, 0), cumulative)
+        for name, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<24} {cumulative / 1000:7.1f}ms")
+
+        if total > args.budget:
+            failures.append(f"{module} imports in {total:.0f}ms, over the {args.budget:.0f}ms budget")
+        eager = [name for name in ENTRY_POINTS.get(module, ()) if name in loaded]
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at startup")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Payload archive cost and replay speed per codec: time to archive synthetic DATOS_TABLA
+payloads, compression ratio, and how fast they come back through the memory-mapped
+reader, decompressed only and decompressed + parsed + prepared for the DB writer (what
+`collect --from-archive` does before writing).
+
+Runs against a scratch archive in a temp directory; no network, no database.
+Usage (from backend/):
+    python -m benchmarks.bench_payload_archive --tables 20 --series 200 --points 240
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import tempfile
+import time
+
+from app.services.ine.data_collector_service import data_collector_service
+from app.services.ine.payload_archive import ARCHIVE_CODECS, PayloadArchive, _zstandard
+from benchmarks.ine_standin import synthetic_table
+
+
+async def replay(archive, codes, parse):
+    started = time.perf_counter()
+    points = 0
+    for code in codes:
+        payload_file, _ = archive.open_payload(code)
+        try:
+            if parse:
+                fetched = {}
+                async for _ in data_collector_service._iter_prepared_chunks(payload_file, False, fetched):
+                    pass
+                points += fetched.get('points', 0)
+            else:
+                while payload_file.read(1024 * 1024):
+                    pass
+        finally:
+            payload_file.close()
+    return time.perf_counter() - started, points
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--points", type=int, default=240)
+    args = parser.parse_args()
+
+    bodies = {f"T{i}": json.dumps(synthetic_table(args.series, args.points, seed=i)).encode() for i in range(args.tables)}
+    megabytes = sum(len(body) for body in bodies.values()) / 1e6
+    print(f"{args.tables} payloads, {megabytes:.1f} MB uncompressed")
+
+    for codec in ARCHIVE_CODECS:
+        if codec == "zstd" and _zstandard() is None:
+            print(f"{codec:<5} skipped, zstandard is not installed")
+            continue
+        with tempfile.TemporaryDirectory() as root:
+            archive = PayloadArchive(root, codec)
+            started = time.perf_counter()
+            stored = 0
+            for code, body in bodies.items():
+                fetched = {"body_hash": hashlib.sha256(body).hexdigest(), "bytes": len(body), "partial": False}
+                stored += archive.store(code, body, fetched)['stored_bytes']
+            archive_seconds = time.perf_counter() - started
+
+            read_seconds, _ = await replay(archive, bodies, parse=False)
+            parse_seconds, points = await replay(archive, bodies, parse=True)
+            print(
+                f"{codec:<5} ratio {megabytes * 1e6 / stored:5.1f}x  archive {megabytes / archive_seconds:7.1f} MB/s  "
+                f"read {megabytes / read_seconds:7.1f} MB/s  read+parse {megabytes / parse_seconds:6.1f} MB/s "
+                f"({points / parse_seconds:,.0f} points/s)"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
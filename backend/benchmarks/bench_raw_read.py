@@ -0,0 +1,69 @@
+"""
+Compare /data/raw read latency when data_points is aggregated with json_agg at query
+time against reading the JSON precomputed in ine_series_store (default: 2000 series x
+240 points).
+
+Writes a scratch dataset which is removed afterwards. Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_raw_read --series 2000 --points 240
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.services.ine.database_service import database_service
+from benchmarks.bench_bulk_ingest import synthetic_payload
+
+DATASET_ID = "BENCH_RAW_READ"
+
+
+async def read_all():
+    return await database_service.get_dataset_raw_data(DATASET_ID)
+
+
+async def timed(name, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        data = await read_all()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{name:<10} best={best * 1000:8.1f}ms  median={sorted(timings)[len(timings) // 2] * 1000:8.1f}ms  ({len(data)} series)")
+    return data
+
+
+def normalized(data):
+    return json.dumps(data, sort_keys=True, default=str)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=240)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    await database_service.connect()
+    try:
+        await database_service.initialize_tables()
+        await database_service.save_dataset_data(DATASET_ID, synthetic_payload(args.series, args.points), mode="replace")
+
+        stored = await timed("store", args.rounds)
+
+        # Without store rows the query falls back to per-series aggregation
+        async with database_service.acquire() as conn:
+            await conn.execute("""
+                DELETE FROM ine_series_store
+                WHERE metadata_id IN (SELECT id FROM ine_metadata WHERE dataset_external_id = $1)
+            """, DATASET_ID)
+        aggregated = await timed("json_agg", args.rounds)
+
+        print(f"identical payloads: {normalized(stored) == normalized(aggregated)}")
+    finally:
+        async with database_service.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET_ID)
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,215 @@
+"""
+Read/write timings and on-disk size of ine_data_points layouts: before migration 0002
+(NUMERIC values, surrogate id, four indexes), after it (DOUBLE PRECISION values keyed by
+(metadata_id, period_index), one covering index), and two variants 0002 does not adopt:
+the typed table with a BRIN index on (metadata_id, timestamp_ms), and the typed table
+hash-partitioned on metadata_id.
+
+Every layout is built with identical synthetic data in its own scratch schema, dropped
+afterwards, and queried with the application's own query builders through search_path.
+Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_schema --datasets 10 --series 1000 --points 240
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.models.schemas import DataFilters
+from app.services.ine.data_queries import build_processed_data_query, build_raw_data_query, build_series_aggregate_query
+from app.services.ine.database_service import database_service
+
+LEGACY, TYPED, BRIN, PARTITIONED = "bench_schema_legacy", "bench_schema_typed", "bench_schema_brin", "bench_schema_partitioned"
+PARTITIONS = 16
+DATASET_ID = "BENCH0"
+
+METADATA = """
+    CREATE TABLE {schema}.ine_metadata (
+        id SERIAL PRIMARY KEY,
+        dataset_external_id TEXT NOT NULL,
+        code TEXT NOT NULL,
+        name TEXT,
+        unit_id {id_type},
+        scale_id {id_type},
+        UNIQUE(dataset_external_id, code)
+    )
+"""
+
+LEGACY_POINTS = [
+    f"""CREATE TABLE {LEGACY}.ine_data_points (
+        id SERIAL PRIMARY KEY,
+        metadata_id INTEGER REFERENCES {LEGACY}.ine_metadata(id) ON DELETE CASCADE,
+        period_index INTEGER,
+        value NUMERIC,
+        is_secret BOOLEAN DEFAULT FALSE,
+        period_id INTEGER,
+        year INTEGER,
+        data_type_id INTEGER,
+        timestamp_ms BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    f"CREATE INDEX ON {LEGACY}.ine_data_points(metadata_id)",
+    f"CREATE INDEX ON {LEGACY}.ine_data_points(year, period_id)",
+    f"CREATE UNIQUE INDEX ON {LEGACY}.ine_data_points(metadata_id, period_index)",
+    f"CREATE INDEX ON {LEGACY}.ine_data_points(metadata_id, year, period_id) INCLUDE (value, is_secret)",
+]
+
+
+def typed_points(schema, partitioned=False, brin=False):
+    statements = [
+        f"""CREATE TABLE {schema}.ine_data_points (
+            metadata_id INTEGER NOT NULL REFERENCES {schema}.ine_metadata(id) ON DELETE CASCADE,
+            period_index INTEGER NOT NULL,
+            value DOUBLE PRECISION,
+            is_secret BOOLEAN DEFAULT FALSE,
+            period_id INTEGER,
+            year INTEGER,
+            data_type_id INTEGER,
+            timestamp_ms BIGINT,
+            PRIMARY KEY (metadata_id, period_index)
+        ){" PARTITION BY HASH (metadata_id)" if partitioned else ""}""",
+        f"CREATE INDEX ON {schema}.ine_data_points(metadata_id, year, period_id) INCLUDE (value, is_secret)",
+    ]
+    if brin:
+        statements.append(f"CREATE INDEX ON {schema}.ine_data_points USING brin (metadata_id, timestamp_ms)")
+    if partitioned:
+        statements[1:1] = [
+            f"""CREATE TABLE {schema}.ine_data_points_p{remainder} PARTITION OF {schema}.ine_data_points
+            FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"""
+            for remainder in range(PARTITIONS)
+        ]
+    return statements
+
+
+# schema -> (type of the metadata dimension ids, data points DDL, value expression loaded)
+LAYOUTS = {
+    LEGACY: ("TEXT", LEGACY_POINTS, "value"),
+    TYPED: ("INTEGER", typed_points(TYPED), "value::float8"),
+    BRIN: ("INTEGER", typed_points(BRIN, brin=True), "value::float8"),
+    PARTITIONED: ("INTEGER", typed_points(PARTITIONED, partitioned=True), "value::float8"),
+}
+
+# name -> query builder call, run against DATASET_ID
+QUERIES = {
+    "processed page": lambda: build_processed_data_query(DATASET_ID, DataFilters(limit=1000)),
+    "processed deep page": lambda: build_processed_data_query(DATASET_ID, DataFilters(limit=1000, after=["S00500", 2005, 6])),
+    "processed last_n=12": lambda: build_processed_data_query(DATASET_ID, DataFilters(last_n=12, limit=5000)),
+    "raw since 2010": lambda: build_raw_data_query(DATASET_ID, DataFilters(start=[2010], limit=200)),
+    "series annual": lambda: build_series_aggregate_query(DATASET_ID, DataFilters(limit=200), "annual"),
+}
+
+
+async def build(conn, datasets, series, points):
+    for schema, (id_type, statements, _) in LAYOUTS.items():
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {schema}")
+        await conn.execute(METADATA.format(schema=schema, id_type=id_type))
+        for statement in statements:
+            await conn.execute(statement)
+        await conn.execute(f"""
+            INSERT INTO {schema}.ine_metadata (dataset_external_id, code, name, unit_id, scale_id)
+            SELECT 'BENCH' || d, 'S' || lpad(s::text, 5, '0'), 'Synthetic series ' || s, 1, 1
+            FROM generate_series(0, {datasets - 1}) d, generate_series(0, {series - 1}) s
+        """)
+    # Same values in both layouts: random 1-4 decimal numbers, as INE publishes them
+    await conn.execute("SELECT setseed($1)", random.Random(42).random())
+    await conn.execute(f"""
+        CREATE TEMP TABLE bench_points AS
+        SELECT m.id AS metadata_id, i AS period_index,
+               round((random() * 10000)::numeric, (1 + floor(random() * 4))::int) AS value,
+               random() < 0.01 AS is_secret, i % 12 + 1 AS period_id, 2000 + i / 12 AS year, 1 AS data_type_id,
+               946684800000 + i::bigint * 2629800000 AS timestamp_ms
+        FROM {LEGACY}.ine_metadata m, generate_series(0, {points - 1}) i
+    """)
+    for schema, (_, _, value) in LAYOUTS.items():
+        started = time.perf_counter()
+        await conn.execute(f"""
+            INSERT INTO {schema}.ine_data_points (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+            SELECT metadata_id, period_index, {value}, is_secret, period_id, year, data_type_id, timestamp_ms
+            FROM bench_points ORDER BY metadata_id, period_index
+        """)
+        print(f"{schema}: loaded in {time.perf_counter() - started:.2f}s")
+        await conn.execute(f"VACUUM ANALYZE {schema}.ine_data_points")
+    await conn.execute("DROP TABLE bench_points")
+
+
+async def sizes(conn, schema):
+    row = await conn.fetchrow("""
+        SELECT SUM(pg_table_size(relid)) AS heap, SUM(pg_indexes_size(relid)) AS indexes
+        FROM (SELECT relid FROM pg_partition_tree($1::regclass) UNION SELECT $1::regclass) tree
+    """, f"{schema}.ine_data_points")
+    return row['heap'], row['indexes']
+
+
+async def timed_query(conn, schema, sql, args, rounds):
+    await conn.execute(f"SET search_path TO {schema}, public")
+    # Statements are cached by text: without the tag the layouts would share one plan.
+    # As in the application, executions after the fifth may run a generic plan
+    sql = f"/* {schema} */ {sql}"
+    await conn.fetch(sql, *args)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        rows = await conn.fetch(sql, *args)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2], len(rows)
+
+
+async def timed_replace(conn, schema, rounds, batch):
+    """Delete and rewrite `batch` whole series, as _apply_replace does, rolled back each round"""
+    await conn.execute(f"SET search_path TO {schema}, public")
+    ids = [row['id'] for row in await conn.fetch(
+        f"/* {schema} */ SELECT id FROM ine_metadata WHERE dataset_external_id = $1 ORDER BY code LIMIT $2", DATASET_ID, batch
+    )]
+    records = [tuple(row) for row in await conn.fetch(f"""
+        /* {schema} */ SELECT metadata_id, period_index, value::float8, is_secret, period_id, year, data_type_id, timestamp_ms
+        FROM ine_data_points WHERE metadata_id = ANY($1::int[])
+    """, ids)]
+    columns = ["metadata_id", "period_index", "value", "is_secret", "period_id", "year", "data_type_id", "timestamp_ms"]
+    timings = []
+    for _ in range(rounds):
+        transaction = conn.transaction()
+        await transaction.start()
+        started = time.perf_counter()
+        await conn.execute(f"/* {schema} */ DELETE FROM ine_data_points WHERE metadata_id = ANY($1::int[])", ids)
+        await conn.copy_records_to_table("ine_data_points", records=records, columns=columns, schema_name=schema)
+        timings.append(time.perf_counter() - started)
+        await transaction.rollback()
+    timings.sort()
+    return timings[len(timings) // 2], len(records)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--datasets", type=int, default=10)
+    parser.add_argument("--series", type=int, default=1000, help="series per dataset")
+    parser.add_argument("--points", type=int, default=240, help="points per series")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--replace-series", type=int, default=200)
+    args = parser.parse_args()
+
+    await database_service.connect()
+    try:
+        async with database_service.acquire() as conn:
+            await build(conn, args.datasets, args.series, args.points)
+            for schema in LAYOUTS:
+                heap, indexes = await sizes(conn, schema)
+                print(f"{schema:<26} table {heap / 2**20:8.1f} MiB  indexes {indexes / 2**20:8.1f} MiB")
+
+            print(f"{'':<22}" + "".join(f"{schema.rsplit('_', 1)[1]:>14}" for schema in LAYOUTS))
+            for name, build_query in QUERIES.items():
+                sql, query_args = build_query()
+                timings = [await timed_query(conn, schema, sql, query_args, args.rounds) for schema in LAYOUTS]
+                print(f"{name:<22}" + "".join(f"{median * 1000:12.2f}ms" for median, _ in timings) + f"  {timings[0][1]} rows")
+            timings = [await timed_replace(conn, schema, args.rounds, args.replace_series) for schema in LAYOUTS]
+            print(f"{'replace series':<22}" + "".join(f"{median * 1000:12.2f}ms" for median, _ in timings) + f"  {timings[0][1]} points")
+    finally:
+        async with database_service.acquire() as conn:
+            for schema in LAYOUTS:
+                await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
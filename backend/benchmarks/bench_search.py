@@ -0,0 +1,69 @@
+"""
+Latency of typeahead queries against the in-memory search index, over a synthetic
+catalogue of Spanish-style dataset and series names (default: 5000 datasets and 200k
+series, above the size of the full INE catalogue).
+
+No database is needed. Usage (from backend/):
+    python -m benchmarks.bench_search --datasets 5000 --series 200000
+"""
+import argparse
+import random
+import time
+
+from app.services.ine.search_index import SearchIndex
+
+WORDS = (
+    "Índice Índices Precios Consumo Producción Industrial Encuesta Población Activa Tasa Tasas "
+    "paro empleo comunidades autónomas provincias sexo edad grupos general anual mensual "
+    "trimestral variación media Total Nacional hogares viviendas turismo pernoctaciones "
+    "coyuntura salarios coste laboral exportaciones importaciones demografía nacimientos "
+    "defunciones migraciones economía servicios comercio minorista construcción energía"
+).split()
+CONNECTORS = ("de", "por", "y", "del", "en")
+
+QUERIES = ("í", "ind", "indice prec", "tasa de par", "poblacion activa", "comunidades autonomas sexo", "ipc25", "trimestral var")
+
+
+def synthetic_name(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(WORDS))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(CONNECTORS))
+    return " ".join(parts)
+
+
+def timed(name, index, rounds):
+    for query in QUERIES:
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            results = index.search(query, 20)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"{name:<9} {query!r:<30} median={timings[len(timings) // 2] * 1e6:8.0f}us  "
+            f"p99={timings[int(len(timings) * 0.99)] * 1e6:8.0f}us  ({len(results)} results)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--datasets", type=int, default=5000)
+    parser.add_argument("--series", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    datasets = [(f"IPC{n}", synthetic_name(rng, 8), str(n), "INE") for n in range(args.datasets)]
+    series = [(f"IPC{n}", synthetic_name(rng, 10), f"T{n % args.datasets}") for n in range(args.series)]
+
+    for name, documents in (("datasets", datasets), ("series", series)):
+        started = time.perf_counter()
+        index = SearchIndex(documents, {0: 2.0, 1: 1.0})
+        print(f"{name}: {len(documents):,} documents indexed in {time.perf_counter() - started:.2f}s")
+        timed(name, index, args.rounds if name == "datasets" else max(1, args.rounds // 10))
+
+
+if __name__ == "__main__":
+    main()
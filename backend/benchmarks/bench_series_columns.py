@@ -0,0 +1,90 @@
+"""
+Memory per million data points and ingest throughput of the column-packed series
+(SeriesColumns) against the decoded JSON objects they replace, on a synthetic
+DATOS_TABLA payload.
+
+Measures, without a database: memory held by the decoded payload and by the packed
+columns (tracemalloc), then the time to decode + pack, hash and render binary COPY
+data. With --db it also times save_dataset_data end to end (replace mode) under a
+scratch dataset id, which is removed afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.bench_series_columns --series 1000 --points 1000 [--db]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from app.services.ine.payload_prep import decode_series, prepare_series
+from benchmarks.ine_standin import synthetic_table
+
+DATASET_ID = "BENCH_SERIES_COLUMNS"
+
+
+def held_bytes(build):
+    """Bytes still allocated once build() has returned (its result alive), and the peak on the way"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, peak
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+async def save(payload):
+    from app.services.ine.database_service import database_service
+
+    await database_service.connect()
+    try:
+        await database_service.ensure_schema()
+        started = time.perf_counter()
+        await database_service.save_dataset_data(DATASET_ID, payload, mode="replace")
+        return time.perf_counter() - started
+    finally:
+        async with database_service.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET_ID)
+        await database_service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=1000, help="points per series")
+    parser.add_argument("--db", action="store_true", help="also time save_dataset_data (needs DB_CONNECTION_STRING)")
+    args = parser.parse_args()
+
+    body = json.dumps(synthetic_table(args.series, args.points)).encode()
+    points = args.series * args.points
+    per_million = 1e6 / points
+    print(f"{args.series} series x {args.points} points = {points:,} points, {len(body) / 1e6:.1f} MB of JSON")
+
+    decoded, decoded_held, decoded_peak = held_bytes(lambda: json.loads(body))
+    columns, columns_held, columns_peak = held_bytes(lambda: decode_series(body))
+    print(f"decoded JSON objects  {decoded_held * per_million / 1e6:7.1f} MB per million points (peak {decoded_peak * per_million / 1e6:.1f} MB)")
+    print(f"SeriesColumns         {columns_held * per_million / 1e6:7.1f} MB per million points (peak {columns_peak * per_million / 1e6:.1f} MB)")
+    print(f"                      {columns_held / points:7.1f} bytes per point against {decoded_held / points:.1f}")
+    del decoded, columns
+
+    columns, decode_seconds = timed(decode_series, body)
+    chunk, prepare_seconds = timed(prepare_series, columns)
+    copy_data, copy_seconds = timed(chunk.copy_data_for, range(len(chunk.codes)), list(range(len(chunk.codes))))
+    print(f"decode + pack         {points / decode_seconds:12,.0f} points/s")
+    print(f"hash (prepare_series) {points / prepare_seconds:12,.0f} points/s")
+    print(f"binary COPY data      {points / copy_seconds:12,.0f} points/s ({len(copy_data) / points:.0f} bytes per point)")
+
+    if args.db:
+        seconds = asyncio.run(save(columns))
+        print(f"save_dataset_data     {points / seconds:12,.0f} points/s (replace mode, packed series)")
+
+
+if __name__ == "__main__":
+    main()
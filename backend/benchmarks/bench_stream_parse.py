@@ -0,0 +1,81 @@
+"""
+Compare peak RSS of preparing a large DATOS_TABLA payload for the DB writer from a whole
+body (decode_series, what small responses go through) against the streaming path the
+collector runs on spooled downloads (new_parser + parse_and_prepare, fed
+INE_STREAM_CHUNK_BYTES at a time). Each mode runs in its own subprocess.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_parse --series 2000 --points 600
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, path):
+    from app.core.config import settings
+    from app.services.ine.payload_prep import decode_series, new_parser, parse_and_prepare, prepare_series
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    points = 0
+    if mode == "full":
+        with open(path, 'rb') as payload:
+            body = payload.read()
+        points = sum(prepare_series(decode_series(body)).point_counts)
+    else:
+        parser = new_parser()
+        with open(path, 'rb') as payload:
+            while True:
+                data = payload.read(settings.INE_STREAM_CHUNK_BYTES)
+                final = len(data) < settings.INE_STREAM_CHUNK_BYTES
+                parser, chunk = parse_and_prepare(parser, data, final)
+                points += sum(chunk.point_counts)
+                if final:
+                    break
+    elapsed = time.perf_counter() - started
+    print(f"{mode:<7} points={points:,}  time={elapsed:6.2f}s  peak RSS={peak_rss_mb():8.1f} MB  "
+          f"(+{peak_rss_mb() - baseline:.1f} MB over interpreter baseline)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=600)
+    parser.add_argument("--mode", choices=["full", "stream"])
+    parser.add_argument("--payload")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.payload)
+        return
+
+    from benchmarks.ine_standin import synthetic_table
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as payload:
+        for index, series in enumerate(synthetic_table(args.series, args.points)):
+            payload.write(b'[' if index == 0 else b',')
+            payload.write(json.dumps(series).encode())
+        payload.write(b']')
+    try:
+        print(f"payload: {os.path.getsize(payload.name) / 1024 / 1024:.1f} MB")
+        for mode in ("full", "stream"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_stream_parse", "--mode", mode, "--payload", payload.name],
+                check=True
+            )
+    finally:
+        os.unlink(payload.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-dataset write latency with the schema DDL run before every save (as save_dataset_data
+used to do) against the schema bootstrapped once per process, sequentially and with
+concurrent writers, plus the cost of the one-time bootstrap itself.
+
+Writes small synthetic datasets into ine_metadata / ine_data_points under scratch ids
+which are removed afterwards. Usage (from backend/):
+    DB_CONNECTION_STRING=postgres://... python -m benchmarks.bench_write_overhead --datasets 200 --writers 4
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.ine.database_service import database_service
+from benchmarks.bench_bulk_ingest import synthetic_payload
+
+DATASET_PREFIX = "BENCH_WRITE_OVERHEAD"
+
+
+async def cleanup():
+    async with database_service.acquire() as conn:
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id LIKE $1", f"{DATASET_PREFIX}%")
+
+
+async def write_all(datasets, writers, ddl_per_save):
+    """Save every (dataset id, payload) with `writers` concurrent writers; per-save latencies and errors"""
+    queue = list(datasets)
+    latencies = []
+    errors = []
+
+    async def writer():
+        while queue:
+            dataset_id, payload = queue.pop()
+            started = time.perf_counter()
+            try:
+                if ddl_per_save:
+                    await database_service.initialize_tables()
+                await database_service.save_dataset_data(dataset_id, payload)
+            except Exception as error:
+                errors.append(str(error))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(writers)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--datasets", type=int, default=200)
+    parser.add_argument("--series", type=int, default=5, help="series per dataset")
+    parser.add_argument("--points", type=int, default=12, help="points per series")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writers in the concurrent runs")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    await database_service.connect()
+    connected = time.perf_counter()
+    await database_service.ensure_schema()
+    print(f"startup: connect {(connected - started) * 1000:.1f}ms, schema bootstrap {(time.perf_counter() - connected) * 1000:.1f}ms")
+
+    try:
+        timings = []
+        for _ in range(20):
+            ddl_started = time.perf_counter()
+            await database_service.initialize_tables()
+            timings.append(time.perf_counter() - ddl_started)
+        print(f"schema DDL on an up-to-date database: median {percentile(timings, 0.5) * 1000:.2f}ms")
+
+        payload = synthetic_payload(args.series, args.points)
+        datasets = [(f"{DATASET_PREFIX}_{i}", payload) for i in range(args.datasets)]
+        for writers in (1, args.writers):
+            for ddl_per_save in (True, False):
+                await cleanup()
+                latencies, errors, elapsed = await write_all(datasets, writers, ddl_per_save)
+                label = "DDL before each save" if ddl_per_save else "bootstrapped once"
+                print(
+                    f"{writers} writer(s), {label:<21} median {percentile(latencies, 0.5) * 1000:7.2f}ms  "
+                    f"p95 {percentile(latencies, 0.95) * 1000:7.2f}ms  {len(datasets) / elapsed:7.1f} datasets/s  "
+                    f"errors {len(errors)}{f' ({errors[0]})' if errors else ''}"
+                )
+    finally:
+        await cleanup()
+        await database_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Local stand-in for the INE `DATOS_TABLA` endpoint, serving synthetic tables.
+
+It honours If-None-Match / If-Modified-Since and `nult`, counts the bytes it sends and
+can be told to fail (StandinState.fail). Mount it in-process with StandinTransport or run
+it with uvicorn:
+    uvicorn benchmarks.ine_standin:app --port 8100
+"""
+import hashlib
+import json
+import random
+from collections import deque
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+
+def synthetic_table(series_count: int = 200, points: int = 240, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "COD": f"STANDIN{s:05d}",
+            "Nombre": f"Synthetic series {s}",
+            "FK_Unidad": 1,
+            "FK_Escala": 1,
+            "Data": [
+                {
+                    "Fecha": 946681200000 + p * 2678400000,
+                    "FK_TipoDato": 1,
+                    "FK_Periodo": p % 12 + 1,
+                    "Anyo": 2000 + p // 12,
+                    "Valor": round(rng.uniform(0, 1000), 3),
+                    "Secreto": False,
+                }
+                for p in range(points)
+            ],
+        }
+        for s in range(series_count)
+    ]
+
+
+def modified_since(last_modified: str, if_modified_since: str) -> bool:
+    """Whether Last-Modified is later than an If-Modified-Since date; an unparsable date counts as modified"""
+    try:
+        return parsedate_to_datetime(last_modified) > parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+
+
+class StandinState:
+    def __init__(self, tables: Dict[str, List[dict]]):
+        self.tables = tables
+        self.last_modified = formatdate(usegmt=True)
+        self.send_validators = True
+        self.requests = 0
+        self.bytes_sent = 0
+        # (status, Retry-After, drop) answers for the next requests, in order
+        self.faults = deque()
+
+    def touch(self):
+        self.last_modified = formatdate(usegmt=True)
+
+    def fail(self, times: int = 1, status: int = 503, retry_after: Optional[str] = None, drop: bool = False):
+        """Answer the next `times` requests with `status`, or drop their connection"""
+        self.faults.extend([(status, retry_after, drop)] * times)
+
+
+class StandinTransport(httpx.ASGITransport):
+    """In-process transport that turns dropped connections into the error httpx raises for them"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await super().handle_async_request(request)
+        except ConnectionResetError as error:
+            raise httpx.RemoteProtocolError(str(error), request=request) from error
+
+
+def create_standin_app(tables: Optional[Dict[str, List[dict]]] = None) -> FastAPI:
+    application = FastAPI()
+    application.state.standin = StandinState(tables or {"STANDIN": synthetic_table()})
+
+    # Any prefix, so a data source's base_url such as https://servicios.ine.es/wstempus/js/ES works too
+    @application.get("/DATOS_TABLA/{external_id}")
+    @application.get("/{prefix:path}/DATOS_TABLA/{external_id}")
+    async def datos_tabla(external_id: str, request: Request, nult: Optional[int] = None):
+        state: StandinState = application.state.standin
+        state.requests += 1
+        if state.faults:
+            status, retry_after, drop = state.faults.popleft()
+            if drop:
+                raise ConnectionResetError("connection dropped by the stand-in")
+            return Response(status_code=status, headers={"Retry-After": retry_after} if retry_after else {})
+
+        table = state.tables.get(external_id)
+        if table is None:
+            return Response(status_code=404)
+
+        if nult:
+            table = [{**series, "Data": series["Data"][-nult:]} for series in table]
+        body = json.dumps(table).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        headers = {}
+        if state.send_validators:
+            headers = {"ETag": etag, "Last-Modified": state.last_modified}
+            if_none_match = request.headers.get("if-none-match")
+            if_modified_since = request.headers.get("if-modified-since")
+            # If-Modified-Since only counts without If-None-Match (RFC 9110, 13.1.3)
+            if if_none_match is not None:
+                not_modified = if_none_match == etag
+            else:
+                not_modified = if_modified_since is not None and not modified_since(state.last_modified, if_modified_since)
+            if not_modified:
+                return Response(status_code=304, headers=headers)
+
+        state.bytes_sent += len(body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    return application
+
+
+app = create_standin_app()
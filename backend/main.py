@@ -1,7 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
+from app.services.ine.database_service import database_service
+from app.services.ine.reference_data import reference_data
+from app.services.cache import response_cache
+from app.services.executor import shutdown_executor
+from app.services.job_service import job_service
+from app.services.metrics import CONTENT_TYPE, MetricsMiddleware, event_loop_monitor, registry
+from app.services.profiling import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """Open shared resources on startup and release them on shutdown"""
+    await database_service.connect()
+    await database_service.ensure_schema()
+    await reference_data.start_listener(database_service.connection_url)
+    await response_cache.start_listener(database_service.connection_url)
+    if settings.METRICS_ENABLED:
+        event_loop_monitor.start()
+    try:
+        yield
+    finally:
+        await event_loop_monitor.stop()
+        await job_service.shutdown()
+        await reference_data.stop_listener()
+        await response_cache.stop_listener()
+        await database_service.close()
+        shutdown_executor()
 
 
 def create_application() -> FastAPI:
@@ -13,7 +41,8 @@ def create_application() -> FastAPI:
         description="API for collecting and processing Spanish statistical data from INE",
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
 
     # CORS Middleware
@@ -25,6 +54,11 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Added last, metrics wrap everything else: latency covers all the client waits for
+    application.add_middleware(ProfilingMiddleware)
+    if settings.METRICS_ENABLED:
+        application.add_middleware(MetricsMiddleware)
+
     # Include API router
     application.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -45,6 +79,14 @@ async def root():
         "api": settings.API_V1_STR
     }
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics of this process in the Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
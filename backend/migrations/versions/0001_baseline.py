@@ -0,0 +1,80 @@
+"""Baseline: the data tables as DatabaseService.initialize_tables created them
+
+Everything is IF NOT EXISTS, so databases created by the application before migrations
+existed are upgraded in place without `alembic stamp`. An ine_data_points without NUMERIC
+values was created by the application in the current layout (see 0002) and is left alone.
+Points stored twice in the legacy layout are reduced to their latest row before the
+unique (metadata_id, period_index) index is built.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+from sqlalchemy import text
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ine_metadata (
+            id SERIAL PRIMARY KEY,
+            dataset_external_id TEXT NOT NULL,
+            code TEXT NOT NULL,
+            name TEXT,
+            unit_id TEXT,
+            scale_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(dataset_external_id, code)
+        )
+    """)
+    op.execute("ALTER TABLE ine_metadata ADD COLUMN IF NOT EXISTS content_hash TEXT")
+    current_layout = op.get_bind().execute(text("""
+        SELECT data_type <> 'numeric' FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'ine_data_points' AND column_name = 'value'
+    """)).scalar()
+    if not current_layout:
+        op.execute("""
+            CREATE TABLE IF NOT EXISTS ine_data_points (
+                id SERIAL PRIMARY KEY,
+                metadata_id INTEGER REFERENCES ine_metadata(id) ON DELETE CASCADE,
+                period_index INTEGER,
+                value NUMERIC,
+                is_secret BOOLEAN DEFAULT FALSE,
+                period_id INTEGER,
+                year INTEGER,
+                data_type_id INTEGER,
+                timestamp_ms BIGINT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_metadata_id ON ine_data_points(metadata_id)")
+        op.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_year_period ON ine_data_points(year, period_id)")
+        if op.get_bind().execute(text("SELECT to_regclass('idx_ine_data_points_series_period') IS NULL")).scalar():
+            # Older writers could store a period twice; the latest row (highest id) is the one kept
+            op.execute("""
+                DELETE FROM ine_data_points d
+                USING ine_data_points newer
+                WHERE newer.metadata_id = d.metadata_id AND newer.period_index = d.period_index AND newer.id > d.id
+            """)
+        op.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ine_data_points_series_period ON ine_data_points(metadata_id, period_index)")
+        op.execute("CREATE INDEX IF NOT EXISTS idx_ine_data_points_series_year_period ON ine_data_points(metadata_id, year, period_id) INCLUDE (value, is_secret)")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ine_series_store (
+            metadata_id INTEGER PRIMARY KEY REFERENCES ine_metadata(id) ON DELETE CASCADE,
+            data_points JSONB NOT NULL,
+            point_count INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS ine_series_store")
+    op.execute("DROP TABLE IF EXISTS ine_data_points")
+    op.execute("DROP TABLE IF EXISTS ine_metadata")
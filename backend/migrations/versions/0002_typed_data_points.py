@@ -0,0 +1,249 @@
+"""Typed ine_data_points keyed by series and period, backfilled online
+
+ine_data_points becomes:
+  - keyed by (metadata_id, period_index), without the surrogate id and created_at
+  - value DOUBLE PRECISION instead of NUMERIC
+  - indexed by the primary key and the covering (metadata_id, year, period_id)
+    INCLUDE (value, is_secret) index only; the standalone metadata_id and
+    (year, period_id) indexes are dropped, every query reaches points through a series
+and ine_metadata.unit_id / scale_id become INTEGER.
+
+The table is neither partitioned nor BRIN-indexed; benchmarks/bench_schema.py measures
+both variants. The application's reads go through a series and filter on (year,
+period_id), which the covering index serves, so a BRIN on (metadata_id, timestamp_ms)
+made no difference, and hash partitioning on metadata_id made them slower.
+
+The new table is filled beside the old one while the application keeps running: statement
+triggers on the old table record the series written meanwhile, which are copied again in
+catch-up rounds. Only the final swap (last changed series, dropping the old table, the
+ine_metadata type change) runs under an exclusive lock. The series store is rebuilt from
+the new values as series are copied, so both read paths round the same doubles.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+"""
+import logging
+from alembic import op
+from sqlalchemy import text
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+BATCH_SERIES = 2000
+# Catch-up rounds stop once this few series are left for the locked final copy
+FINAL_SERIES = 500
+CATCH_UP_ROUNDS = 10
+LOCK_TIMEOUT = "30s"
+
+TYPED = "ine_data_points_typed"
+CHANGED = "ine_data_points_backfill_changed"
+
+
+def _create_typed_table():
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TYPED} (
+            metadata_id INTEGER NOT NULL REFERENCES ine_metadata(id) ON DELETE CASCADE,
+            period_index INTEGER NOT NULL,
+            value DOUBLE PRECISION,
+            is_secret BOOLEAN DEFAULT FALSE,
+            period_id INTEGER,
+            year INTEGER,
+            data_type_id INTEGER,
+            timestamp_ms BIGINT,
+            PRIMARY KEY (metadata_id, period_index)
+        )
+    """)
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{TYPED}_series_year_period
+        ON {TYPED}(metadata_id, year, period_id) INCLUDE (value, is_secret)
+    """)
+
+
+def _capture_changes():
+    """Record the series touched on the old table from now on, one row per series"""
+    op.execute(f"CREATE UNLOGGED TABLE IF NOT EXISTS {CHANGED} (metadata_id INTEGER PRIMARY KEY)")
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {CHANGED}_record() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {CHANGED} SELECT DISTINCT metadata_id FROM changed_new WHERE metadata_id IS NOT NULL
+                ON CONFLICT DO NOTHING;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO {CHANGED} SELECT DISTINCT metadata_id FROM changed_old WHERE metadata_id IS NOT NULL
+                ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Transition tables allow a single event per trigger; statement level keeps bulk writes cheap
+    for event, referencing in (
+        ("INSERT", "NEW TABLE AS changed_new"),
+        ("UPDATE", "OLD TABLE AS changed_old NEW TABLE AS changed_new"),
+        ("DELETE", "OLD TABLE AS changed_old"),
+    ):
+        op.execute(f"DROP TRIGGER IF EXISTS {CHANGED}_{event.lower()} ON ine_data_points")
+        op.execute(f"""
+            CREATE TRIGGER {CHANGED}_{event.lower()} AFTER {event} ON ine_data_points
+            REFERENCING {referencing}
+            FOR EACH STATEMENT EXECUTE FUNCTION {CHANGED}_record()
+        """)
+
+
+def _copy_series(bind, metadata_ids):
+    """(Re)copy whole series from the old table and rebuild their series store documents"""
+    params = {"ids": metadata_ids}
+    bind.execute(text(f"DELETE FROM {TYPED} WHERE metadata_id = ANY(CAST(:ids AS int[]))"), params)
+    bind.execute(text(f"""
+        INSERT INTO {TYPED} (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+        SELECT metadata_id, period_index, value::float8, is_secret, period_id, year, data_type_id, timestamp_ms
+        FROM ine_data_points
+        WHERE metadata_id = ANY(CAST(:ids AS int[])) AND period_index IS NOT NULL
+        ORDER BY metadata_id, period_index
+    """), params)
+    bind.execute(text(f"""
+        INSERT INTO ine_series_store (metadata_id, data_points, point_count, updated_at)
+        SELECT
+            m.id,
+            COALESCE(
+                jsonb_agg(
+                    jsonb_build_object(
+                        'value', ROUND(dp.value::numeric, 2),
+                        'is_secret', dp.is_secret,
+                        'period_id', dp.period_id,
+                        'year', dp.year,
+                        'data_type_id', dp.data_type_id,
+                        'timestamp_ms', dp.timestamp_ms
+                    ) ORDER BY dp.period_index
+                ) FILTER (WHERE dp.metadata_id IS NOT NULL),
+                '[]'::jsonb
+            ),
+            COUNT(dp.metadata_id),
+            CURRENT_TIMESTAMP
+        FROM ine_metadata m
+        LEFT JOIN {TYPED} dp ON dp.metadata_id = m.id
+        WHERE m.id = ANY(CAST(:ids AS int[]))
+        GROUP BY m.id
+        ON CONFLICT (metadata_id) DO UPDATE
+        SET data_points = EXCLUDED.data_points, point_count = EXCLUDED.point_count, updated_at = EXCLUDED.updated_at
+    """), params)
+
+
+def _take_changed(bind):
+    return [row[0] for row in bind.execute(text(f"DELETE FROM {CHANGED} RETURNING metadata_id"))]
+
+
+def _backfill(bind):
+    after, copied = 0, 0
+    while True:
+        metadata_ids = [
+            row[0] for row in bind.execute(
+                text("SELECT id FROM ine_metadata WHERE id > :after ORDER BY id LIMIT :limit"),
+                {"after": after, "limit": BATCH_SERIES},
+            )
+        ]
+        if not metadata_ids:
+            break
+        _copy_series(bind, metadata_ids)
+        after = metadata_ids[-1]
+        copied += len(metadata_ids)
+        logger.info(f"Backfilled {copied} series")
+
+    for round_number in range(CATCH_UP_ROUNDS):
+        pending = bind.execute(text(f"SELECT COUNT(*) FROM {CHANGED}")).scalar()
+        if pending <= FINAL_SERIES:
+            break
+        changed = _take_changed(bind)
+        for start in range(0, len(changed), BATCH_SERIES):
+            _copy_series(bind, changed[start:start + BATCH_SERIES])
+        logger.info(f"Catch-up round {round_number + 1}: {len(changed)} series written meanwhile copied again")
+
+
+def _rename_table(old: str, new: str):
+    op.execute(f"ALTER TABLE {old} RENAME TO {new}")
+    op.execute(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey")
+    op.execute(f"ALTER TABLE {new} RENAME CONSTRAINT {old}_metadata_id_fkey TO {new}_metadata_id_fkey")
+    op.execute(f"ALTER INDEX idx_{old}_series_year_period RENAME TO idx_{new}_series_year_period")
+
+
+def _numeric_values(bind) -> bool:
+    return bool(bind.execute(text("""
+        SELECT data_type = 'numeric' FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'ine_data_points' AND column_name = 'value'
+    """)).scalar())
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Already in this layout when DatabaseService.initialize_tables created the tables
+    if not _numeric_values(bind):
+        return
+
+    with op.get_context().autocommit_block():
+        _create_typed_table()
+        _capture_changes()
+        _backfill(bind)
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    # Same order as the writers: metadata upsert first, then the data points
+    op.execute("LOCK TABLE ine_metadata, ine_data_points IN ACCESS EXCLUSIVE MODE")
+    changed = _take_changed(bind)
+    for start in range(0, len(changed), BATCH_SERIES):
+        _copy_series(bind, changed[start:start + BATCH_SERIES])
+    logger.info(f"Final copy of {len(changed)} series, swapping tables")
+
+    op.execute("DROP TABLE ine_data_points")
+    op.execute(f"DROP TABLE {CHANGED}")
+    op.execute(f"DROP FUNCTION {CHANGED}_record()")
+    _rename_table(TYPED, "ine_data_points")
+    op.execute("""
+        ALTER TABLE ine_metadata
+            ALTER COLUMN unit_id TYPE INTEGER USING CASE WHEN unit_id ~ '^-?[0-9]+$' THEN unit_id::integer END,
+            ALTER COLUMN scale_id TYPE INTEGER USING CASE WHEN scale_id ~ '^-?[0-9]+$' THEN scale_id::integer END
+    """)
+    op.execute("ANALYZE ine_data_points")
+
+
+def downgrade():
+    """Back to the NUMERIC layout, copied in one transaction (not online)"""
+    op.execute("""
+        CREATE TABLE ine_data_points_legacy (
+            id SERIAL PRIMARY KEY,
+            metadata_id INTEGER REFERENCES ine_metadata(id) ON DELETE CASCADE,
+            period_index INTEGER,
+            value NUMERIC,
+            is_secret BOOLEAN DEFAULT FALSE,
+            period_id INTEGER,
+            year INTEGER,
+            data_type_id INTEGER,
+            timestamp_ms BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    op.execute("""
+        INSERT INTO ine_data_points_legacy (metadata_id, period_index, value, is_secret, period_id, year, data_type_id, timestamp_ms)
+        SELECT metadata_id, period_index, value::numeric, is_secret, period_id, year, data_type_id, timestamp_ms
+        FROM ine_data_points
+        ORDER BY metadata_id, period_index
+    """)
+    op.execute("DROP TABLE ine_data_points")
+    op.execute("ALTER TABLE ine_data_points_legacy RENAME TO ine_data_points")
+    op.execute("ALTER SEQUENCE ine_data_points_legacy_id_seq RENAME TO ine_data_points_id_seq")
+    op.execute("ALTER TABLE ine_data_points RENAME CONSTRAINT ine_data_points_legacy_pkey TO ine_data_points_pkey")
+    op.execute("ALTER TABLE ine_data_points RENAME CONSTRAINT ine_data_points_legacy_metadata_id_fkey TO ine_data_points_metadata_id_fkey")
+    op.execute("CREATE INDEX idx_ine_data_points_metadata_id ON ine_data_points(metadata_id)")
+    op.execute("CREATE INDEX idx_ine_data_points_year_period ON ine_data_points(year, period_id)")
+    op.execute("CREATE UNIQUE INDEX idx_ine_data_points_series_period ON ine_data_points(metadata_id, period_index)")
+    op.execute("CREATE INDEX idx_ine_data_points_series_year_period ON ine_data_points(metadata_id, year, period_id) INCLUDE (value, is_secret)")
+    # Missing ids were stored as '' before
+    op.execute("""
+        ALTER TABLE ine_metadata
+            ALTER COLUMN unit_id TYPE TEXT USING COALESCE(unit_id::text, ''),
+            ALTER COLUMN scale_id TYPE TEXT USING COALESCE(scale_id::text, '')
+    """)
@@ -0,0 +1,46 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+# Settings require a connection string; tests needing a database skip when it is unusable
+os.environ.setdefault("DB_CONNECTION_STRING", "postgresql://localhost/unset")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+
+
+@pytest.fixture
+def collector_settings(monkeypatch):
+    """Collector settings for runs against the stand-in: no rate limit, short delays, no archive"""
+    overrides = {
+        "INE_RATE_LIMIT_PER_SECOND": 0,
+        "INE_RETRY_ATTEMPTS": 4,
+        "INE_RETRY_BASE_DELAY": 0.01,
+        "INE_RETRY_MAX_DELAY": 2.0,
+        "INE_CIRCUIT_FAILURE_THRESHOLD": 3,
+        "INE_CIRCUIT_RESET_SECONDS": 0.3,
+        "INE_CIRCUIT_MAX_WAIT": 5.0,
+        "INE_INCREMENTAL_PERIODS": 0,
+        "PAYLOAD_ARCHIVE_ENABLED": False,
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def database():
+    """The shared database service with its schema in place; skips without a usable database"""
+    from app.services.ine.database_service import database_service
+    try:
+        await database_service.connect()
+    except Exception as error:
+        pytest.skip(f"database unavailable: {error}")
+    try:
+        await database_service.ensure_schema()
+        yield database_service
+    finally:
+        await database_service.close()
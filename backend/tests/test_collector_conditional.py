@@ -0,0 +1,154 @@
+"""Conditional fetching and incremental (?nult) refreshes, collected from the in-process INE
+stand-in into the database. Skipped without a usable DB_CONNECTION_STRING."""
+import copy
+
+import pytest
+import pytest_asyncio
+
+from app.services.ine.data_collector_service import data_collector_service
+from app.services.ine.database_service import database_service
+from benchmarks.ine_standin import StandinTransport, create_standin_app, synthetic_table
+
+DATASET = "PYTEST_STANDIN"
+SERIES = 5
+POINTS = 24
+
+
+@pytest_asyncio.fixture
+async def dataset(database):
+    """A scratch ine_datasets row, removed with its series afterwards.
+
+    data_sources and ine_datasets belong to the wider platform, not to this service's schema:
+    on a database without them they are created with the columns the collector uses.
+    """
+    async with database.acquire() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS data_sources (
+                id SERIAL PRIMARY KEY,
+                name TEXT,
+                adapter TEXT,
+                base_url TEXT
+            );
+            CREATE TABLE IF NOT EXISTS ine_datasets (
+                id SERIAL PRIMARY KEY,
+                external_id TEXT,
+                name TEXT,
+                data_source_id TEXT,
+                active BOOLEAN DEFAULT TRUE,
+                last_modified BIGINT,
+                fetch_etag TEXT,
+                fetch_last_modified TEXT,
+                fetch_body_hash TEXT,
+                fetch_full_at TIMESTAMPTZ
+            );
+        """)
+    source = await database.get_ine_data_source()
+    async with database.acquire() as conn:
+        if source is None:
+            source_id = await conn.fetchval(
+                "INSERT INTO data_sources (name, adapter, base_url) VALUES ('INE', 'ine', 'http://ine-standin') RETURNING id"
+            )
+        else:
+            source_id = source['id']
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+        await conn.execute("DELETE FROM ine_datasets WHERE external_id = $1", DATASET)
+        await conn.execute(
+            "INSERT INTO ine_datasets (external_id, name, data_source_id) VALUES ($1, $1, $2)",
+            DATASET, str(source_id)
+        )
+    try:
+        yield DATASET
+    finally:
+        async with database.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+            await conn.execute("DELETE FROM ine_datasets WHERE external_id = $1", DATASET)
+
+
+@pytest.fixture
+def standin(monkeypatch, collector_settings):
+    app = create_standin_app({DATASET: synthetic_table(SERIES, POINTS)})
+    monkeypatch.setattr(data_collector_service, "transport", StandinTransport(app=app))
+    return app.state.standin
+
+
+async def sweep(code):
+    """Collect one dataset as the sweep does, with its current fetch state; returns its result"""
+    datasets = [row for row in await database_service.get_ine_datasets() if row['external_id'] == code]
+    result = await data_collector_service.collect_datasets(datasets)
+    return result['results'][0]
+
+
+async def stored_points(code):
+    async with database_service.acquire() as conn:
+        return await conn.fetchval("""
+            SELECT COUNT(*) FROM ine_data_points p JOIN ine_metadata m ON m.id = p.metadata_id
+            WHERE m.dataset_external_id = $1
+        """, code)
+
+
+def add_periods(table, count):
+    """The table one or more months later: `count` new points at the end of every series"""
+    table = copy.deepcopy(table)
+    for series in table:
+        last = series['Data'][-1]
+        for step in range(1, count + 1):
+            month = last['FK_Periodo'] - 1 + step
+            series['Data'].append({
+                **last, "Fecha": last['Fecha'] + step * 2678400000, "Anyo": last['Anyo'] + month // 12,
+                "FK_Periodo": month % 12 + 1, "Valor": last['Valor'] + step,
+            })
+    return table
+
+
+@pytest.mark.asyncio
+async def test_second_sweep_is_not_modified(dataset, standin):
+    first = await sweep(dataset)
+    assert first['status'] == "success"
+    bytes_sent = standin.bytes_sent
+
+    second = await sweep(dataset)
+    assert second['status'] == "not_modified"
+    assert standin.bytes_sent == bytes_sent
+    assert await stored_points(dataset) == SERIES * POINTS
+
+
+@pytest.mark.asyncio
+async def test_unchanged_body_without_validators_is_skipped(dataset, standin):
+    standin.send_validators = False
+    assert (await sweep(dataset))['status'] == "success"
+    assert (await sweep(dataset))['status'] == "unchanged"
+
+
+@pytest.mark.asyncio
+async def test_nult_refresh_merges_without_deleting(dataset, standin, collector_settings, monkeypatch):
+    monkeypatch.setattr(collector_settings, "INE_INCREMENTAL_PERIODS", 3)
+    assert (await sweep(dataset))['status'] == "success"
+
+    standin.tables[dataset] = add_periods(standin.tables[dataset], 2)
+    standin.touch()
+    refresh = await sweep(dataset)
+
+    assert refresh['status'] == "success"
+    # Only the last 3 periods were sent: 1 already stored, 2 new
+    assert refresh['points'] == SERIES * 3
+    assert refresh['changes']['records_inserted'] == SERIES * 2
+    assert refresh['changes']['records_deleted'] == 0
+    assert await stored_points(dataset) == SERIES * (POINTS + 2)
+
+
+@pytest.mark.asyncio
+async def test_nult_refreshes_turn_full_after_max_age(dataset, standin, collector_settings, monkeypatch):
+    monkeypatch.setattr(collector_settings, "INE_INCREMENTAL_PERIODS", 3)
+    assert (await sweep(dataset))['status'] == "success"
+
+    # A revision of the first period, outside the nult window
+    standin.tables[dataset][0]['Data'][0]['Valor'] = -1.0
+    standin.touch()
+    refresh = await sweep(dataset)
+    assert refresh['points'] == SERIES * 3
+    assert refresh['changes']['records_updated'] == 0
+
+    monkeypatch.setattr(collector_settings, "INE_FULL_REFRESH_MAX_AGE", 0)
+    full = await sweep(dataset)
+    assert full['points'] == SERIES * POINTS
+    assert full['changes']['records_updated'] == 1
@@ -0,0 +1,112 @@
+"""Retries, Retry-After and the circuit breaker of the collector's fetches, against the
+in-process INE stand-in (no network, no database)."""
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.services.ine.data_collector_service import data_collector_service
+from app.services.ine.rate_limiter import HostRateLimiter
+from app.services.ine.retry import CircuitOpenError, HostCircuitBreakers, RetryableHTTPError
+from benchmarks.ine_standin import StandinTransport, create_standin_app, synthetic_table
+
+BASE_URL = "http://ine-standin"
+DATASET = {"id": 1, "external_id": "T1"}
+
+
+@pytest.fixture
+def standin(collector_settings):
+    return create_standin_app({"T1": synthetic_table(5, 24)})
+
+
+@pytest_asyncio.fixture
+async def client(standin):
+    async with httpx.AsyncClient(transport=StandinTransport(app=standin), base_url=BASE_URL) as client:
+        yield client
+
+
+@pytest.fixture
+def breakers(collector_settings):
+    return HostCircuitBreakers(collector_settings.INE_CIRCUIT_FAILURE_THRESHOLD, collector_settings.INE_CIRCUIT_RESET_SECONDS)
+
+
+async def fetch(client, breakers, rate_limiter=None):
+    return await data_collector_service._fetch_with_retries(
+        client, rate_limiter or HostRateLimiter(0, 1), breakers, f"{BASE_URL}/DATOS_TABLA/T1", DATASET, {}
+    )
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_and_dropped_connections(client, breakers, standin):
+    state = standin.state.standin
+    state.fail(times=2, status=503)
+    state.fail(times=1, drop=True)
+
+    fetched = await fetch(client, breakers)
+
+    assert fetched['status'] == "ok"
+    assert state.requests == 4
+    assert breakers.breaker_for(BASE_URL).state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured(client, breakers, standin):
+    state = standin.state.standin
+    state.fail(times=1, status=429, retry_after="1")
+    rate_limiter = HostRateLimiter(0, 1)
+
+    started = time.monotonic()
+    fetched = await fetch(client, breakers, rate_limiter)
+
+    assert fetched['status'] == "ok"
+    assert state.requests == 2
+    assert time.monotonic() - started >= 1.0
+    # Throttling is not a failure of the host
+    assert breakers.breaker_for(BASE_URL).failures == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_after_beyond_max_delay_gives_up(client, breakers, standin, collector_settings):
+    state = standin.state.standin
+    state.fail(times=1, status=429, retry_after=str(int(collector_settings.INE_RETRY_MAX_DELAY) + 60))
+
+    with pytest.raises(RetryableHTTPError):
+        await fetch(client, breakers)
+    assert state.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_then_half_opens(client, breakers, standin, collector_settings, monkeypatch):
+    state = standin.state.standin
+    breaker = breakers.breaker_for(BASE_URL)
+    monkeypatch.setattr(collector_settings, "INE_RETRY_ATTEMPTS", collector_settings.INE_CIRCUIT_FAILURE_THRESHOLD)
+    monkeypatch.setattr(collector_settings, "INE_CIRCUIT_MAX_WAIT", 0.0)
+    state.fail(times=10**6, status=503)
+
+    with pytest.raises(RetryableHTTPError):
+        await fetch(client, breakers)
+    assert breaker.state == "open"
+
+    # Open: requests fail fast without reaching the host
+    requests = state.requests
+    with pytest.raises(CircuitOpenError):
+        await fetch(client, breakers)
+    assert state.requests == requests
+
+    await asyncio.sleep(collector_settings.INE_CIRCUIT_RESET_SECONDS)
+    assert breaker.state == "half_open"
+
+    # A failed probe reopens the circuit
+    monkeypatch.setattr(collector_settings, "INE_RETRY_ATTEMPTS", 1)
+    with pytest.raises(RetryableHTTPError):
+        await fetch(client, breakers)
+    assert state.requests == requests + 1
+    assert breaker.state == "open"
+
+    # A successful probe closes it
+    await asyncio.sleep(collector_settings.INE_CIRCUIT_RESET_SECONDS)
+    state.faults.clear()
+    assert (await fetch(client, breakers))['status'] == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,60 @@
+"""Keyset paging of the data queries against the database. Skipped without a usable
+DB_CONNECTION_STRING."""
+from collections import Counter
+
+import pytest
+import pytest_asyncio
+
+from app.models.schemas import DataFilters
+from benchmarks.ine_standin import synthetic_table
+
+DATASET = "PYTEST_QUERIES"
+
+
+@pytest_asyncio.fixture
+async def dataset(database):
+    """Three series of six points; the second one has points without a year or period"""
+    table = synthetic_table(3, 6)
+    table[1]['Data'][2].pop('Anyo')
+    table[1]['Data'][2].pop('FK_Periodo')
+    table[1]['Data'][4].pop('FK_Periodo')
+    async with database.acquire() as conn:
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+    await database.save_dataset_data(DATASET, table, mode="replace")
+    try:
+        yield table
+    finally:
+        async with database.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2, 5])
+async def test_processed_pages_cover_null_periods_once(database, dataset, limit):
+    rows, after = [], None
+    while True:
+        page, after = await database.get_dataset_processed_page(DATASET, DataFilters(limit=limit, after=after))
+        rows += page
+        if after is None:
+            break
+        after = list(after)
+
+    expected = Counter((series['COD'], point.get('Anyo')) for series in dataset for point in series['Data'])
+    assert Counter((row['code'], row['year']) for row in rows) == expected
+
+
+@pytest.mark.asyncio
+async def test_raw_json_is_the_same_from_store_and_aggregation(database, dataset):
+    # A period filter leaves out points without a year, so the series has none
+    code = dataset[0]['COD']
+    filters = DataFilters(codes=[code])
+    stored, _ = await database.get_dataset_raw_page(DATASET, filters, decode=False)
+    aggregated, _ = await database.get_dataset_raw_page(DATASET, filters.model_copy(update={"start": [1900]}), decode=False)
+    async with database.acquire() as conn:
+        await conn.execute("""
+            DELETE FROM ine_series_store
+            WHERE metadata_id = (SELECT id FROM ine_metadata WHERE dataset_external_id = $1 AND code = $2)
+        """, DATASET, code)
+    fallback, _ = await database.get_dataset_raw_page(DATASET, filters, decode=False)
+
+    assert stored[0]['data_points'] == aggregated[0]['data_points'] == fallback[0]['data_points']
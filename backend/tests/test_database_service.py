@@ -0,0 +1,126 @@
+"""Diff and partial (?nult) writes of DatabaseService against the database. Skipped without
+a usable DB_CONNECTION_STRING."""
+import copy
+
+import pytest
+import pytest_asyncio
+
+from benchmarks.ine_standin import synthetic_table
+
+DATASET = "PYTEST_WRITES"
+SERIES = 3
+POINTS = 12
+
+
+@pytest_asyncio.fixture
+async def stored(database):
+    """The dataset written in full; its series are removed afterwards"""
+    table = synthetic_table(SERIES, POINTS)
+    async with database.acquire() as conn:
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+    await database.save_dataset_data(DATASET, table, mode="diff")
+    try:
+        yield table
+    finally:
+        async with database.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+
+
+async def points(database, code):
+    """(period_index, year, period_id, value) of one stored series in index order"""
+    async with database.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT p.period_index, p.year, p.period_id, p.value
+            FROM ine_data_points p JOIN ine_metadata m ON m.id = p.metadata_id
+            WHERE m.dataset_external_id = $1 AND m.code = $2
+            ORDER BY p.period_index
+        """, DATASET, code)
+    return [tuple(row) for row in rows]
+
+
+def latest(table, count):
+    """A nult payload: the last `count` points of every series"""
+    table = copy.deepcopy(table)
+    for series in table:
+        series['Data'] = series['Data'][-count:]
+    return table
+
+
+@pytest.mark.asyncio
+async def test_diff_of_unchanged_table_writes_nothing(database, stored):
+    result = await database.save_dataset_data(DATASET, stored, mode="diff")
+    assert result['series_unchanged'] == SERIES
+    assert result['records_inserted'] == result['records_updated'] == result['records_deleted'] == 0
+
+
+@pytest.mark.asyncio
+async def test_diff_updates_deletes_and_empties(database, stored):
+    table = copy.deepcopy(stored)
+    code = table[0]['COD']
+    table[0]['Data'][3]['Valor'] = -1.0
+    del table[1]['Data'][-2:]
+    table[2]['Data'] = []
+
+    result = await database.save_dataset_data(DATASET, table, mode="diff")
+
+    assert result['series_changed'] == SERIES
+    assert result['records_updated'] == 1
+    assert result['records_deleted'] == 2 + POINTS
+    assert result['records_inserted'] == 0
+    assert (await points(database, code))[3][3] == -1.0
+    assert len(await points(database, table[1]['COD'])) == POINTS - 2
+    assert await points(database, table[2]['COD']) == []
+
+
+@pytest.mark.asyncio
+async def test_partial_matches_stored_points_by_period(database, stored):
+    code = stored[0]['COD']
+    before = await points(database, code)
+    refresh = latest(stored, 3)
+    for series in refresh:
+        # A point INE sends without a timestamp still matches its period
+        del series['Data'][0]['Fecha']
+        series['Data'][-1]['Valor'] = -1.0
+
+    for _ in range(2):
+        result = await database.save_dataset_data(DATASET, refresh, partial=True)
+        assert result['records_inserted'] == 0
+
+    after = await points(database, code)
+    assert len(after) == POINTS
+    assert after[:-1] == before[:-1]
+    assert after[-1] == (*before[-1][:3], -1.0)
+
+
+@pytest.mark.asyncio
+async def test_partial_places_new_points_in_order(database, stored):
+    code = stored[0]['COD']
+    series = copy.deepcopy(stored[0])
+    first = series['Data'][0]
+    # One period before the stored ones and one after them
+    earlier = {**first, "Fecha": first['Fecha'] - 2678400000, "Anyo": 1999, "FK_Periodo": 12, "Valor": -2.0}
+    last = series['Data'][-1]
+    later = {**last, "Fecha": last['Fecha'] + 2678400000, "FK_Periodo": last['FK_Periodo'] + 1, "Valor": -3.0}
+    series['Data'] = [later, earlier]
+
+    result = await database.save_dataset_data(DATASET, [series], partial=True)
+
+    assert result['records_inserted'] == 2
+    after = await points(database, code)
+    assert [row[0] for row in after] == list(range(POINTS + 2))
+    assert after[0][1:] == (1999, 12, -2.0)
+    assert after[-1][3] == -3.0
+    assert [row[3] for row in after[1:-1]] == [point['Valor'] for point in stored[0]['Data']]
+
+
+@pytest.mark.asyncio
+async def test_partial_skips_points_without_timestamp_or_period(database, stored):
+    code = stored[0]['COD']
+    series = copy.deepcopy(stored[0])
+    series['Data'] = [{"FK_TipoDato": 1, "Valor": 1.0, "Secreto": False}]
+
+    result = await database.save_dataset_data(DATASET, [series], partial=True)
+
+    assert result['records_skipped'] == 1
+    assert result['records_inserted'] == 0
+    assert len(await points(database, code)) == POINTS
@@ -0,0 +1,44 @@
+"""Export files against the database. Skipped without a usable DB_CONNECTION_STRING."""
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.services.export_service import export_service
+from app.services.ine.reference_data import reference_data
+from benchmarks.ine_standin import synthetic_table
+
+DATASET = "PYTEST_EXPORTS"
+UNIT_ID = 987654
+
+
+@pytest_asyncio.fixture
+async def dataset(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    async with database.acquire() as conn:
+        if await conn.fetchval("SELECT to_regclass('ine_def_units')") is None:
+            pytest.skip("no ine_def_units table")
+        await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+    await database.save_dataset_data(DATASET, synthetic_table(2, 6), mode="replace")
+    try:
+        yield DATASET
+    finally:
+        async with database.acquire() as conn:
+            await conn.execute("DELETE FROM ine_metadata WHERE dataset_external_id = $1", DATASET)
+            await conn.execute("DELETE FROM ine_def_units WHERE ref_id = $1", UNIT_ID)
+        reference_data.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_label_change_rebuilds_export(database, dataset):
+    first = await export_service.get_export(dataset)
+    assert (await export_service.get_export(dataset)).etag == first.etag
+
+    async with database.acquire() as conn:
+        await conn.execute("INSERT INTO ine_def_units (ref_id, name) VALUES ($1, 'Pytest unit')", UNIT_ID)
+    # What the NOTIFY from the dimension table does when the listener runs
+    reference_data.invalidate()
+    second = await export_service.get_export(dataset)
+
+    assert second.etag != first.etag
+    assert second.path != first.path
+    assert second.path.exists() and not first.path.exists()
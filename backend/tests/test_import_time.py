@@ -0,0 +1,21 @@
+"""Import-time budget of the entry points (benchmarks/bench_import_time.py), in fresh interpreters"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.bench_import_time import ENTRY_POINTS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BUDGET_MS = 700
+
+
+@pytest.mark.parametrize("module", list(ENTRY_POINTS))
+def test_entry_point_imports_within_budget(module):
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_import_time", module, "--budget", str(BUDGET_MS), "--runs", "3"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=os.environ.copy()
+    )
+    assert process.returncode == 0, process.stdout + process.stderr
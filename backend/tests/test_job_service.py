@@ -0,0 +1,37 @@
+"""Collection job lifecycle against the database. Skipped without a usable DB_CONNECTION_STRING."""
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services.job_service import job_service
+
+JOB_TYPE = "pytest_job"
+
+
+@pytest.mark.asyncio
+async def test_long_running_job_is_not_taken_for_abandoned(database, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_STALE_AFTER", 0.4)
+    monkeypatch.setattr(settings, "COLLECTOR_WORKERS", 1)
+    job, created = await database.create_collection_job(uuid.uuid4().hex, JOB_TYPE, "asyncio")
+    assert created
+    duplicates = []
+
+    async def one_slow_dataset(job_id):
+        # Three times JOB_STALE_AFTER without reporting progress
+        await asyncio.sleep(1.2)
+        duplicates.append(await database.create_collection_job(uuid.uuid4().hex, JOB_TYPE, "asyncio"))
+        return {"success": True}, False
+
+    monkeypatch.setattr(job_service, "_run_in_process", one_slow_dataset)
+    try:
+        await job_service.run_collection_job(job['id'])
+
+        (active, duplicate_created), = duplicates
+        assert not duplicate_created
+        assert active['id'] == job['id']
+        assert (await database.get_collection_job(job['id']))['status'] == "succeeded"
+    finally:
+        async with database.acquire() as conn:
+            await conn.execute("DELETE FROM collection_jobs WHERE job_type = $1", JOB_TYPE)
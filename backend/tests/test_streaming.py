@@ -0,0 +1,20 @@
+import pytest
+
+from app.api.streaming import etag_matches
+
+ETAG = '"0123abcd"'
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ("", False),
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"other", {ETAG}', True),
+    (f'"other",W/{ETAG} ,"third"', True),
+    ("*", True),
+    ('"other"', False),
+    ('"0123abcd', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, ETAG) is matches